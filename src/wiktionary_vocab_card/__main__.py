@@ -0,0 +1,6 @@
+"""Allow ``python -m wiktionary_vocab_card`` (used for background work)."""
+
+from .cli import cli
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,159 @@
+"""
+Batch Generation Module
+
+This module generates many wordcards in one run. Pages are fetched and parsed
+concurrently by a thread pool (the shared session and per-host rate limit keep
+the load on Wiktionary polite), while cards are written one at a time through
+the regular MarkdownGenerator/FileManager path.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .config import is_vault_configured
+from .entries import create_parser
+from .generator import MarkdownGenerator
+from .keys import SingleFlight, canonical_key, canonical_url
+from .processor import ContentProcessor
+from .revisions import record_revision
+from .sources import PageSource
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of generating one wordcard."""
+
+    item: str
+    url: str
+    word: Optional[str] = None
+    path: Optional[Path] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def to_url(item: str) -> str:
+    """Turn a URL or bare word into the canonical Wiktionary URL."""
+    return canonical_url(item)
+
+
+def read_items(lines: Iterable[str]) -> List[str]:
+    """Collect URLs or words from lines, skipping blanks and # comments."""
+    items = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            items.append(line)
+    return items
+
+
+def _parse(
+    url: str,
+    config: Dict[str, Any],
+    source: PageSource,
+    engine: Optional[str],
+    flights: SingleFlight,
+):
+    def parse():
+        return create_parser(url, config, source=source, engine=engine).parse()
+
+    # Duplicate items (in any spelling) running at the same time share one parse
+    return flights.do(canonical_key(url), parse)
+
+
+def write_card(
+    parser,
+    config: Dict[str, Any],
+    article: str,
+    output_dir: Optional[Path] = None,
+    output_path: Optional[Path] = None,
+) -> Path:
+    """Write the card for a parsed page and record its revision.
+
+    Args:
+        parser: ParseResult of the page
+        config: Configuration dictionary
+        article: Article content for the card
+        output_dir: Write <word>.md here instead of using vault file management
+        output_path: Write to exactly this file (takes precedence)
+
+    Returns:
+        Path of the written card
+    """
+    record_revision(parser)
+    content = ContentProcessor(parser, config).process_content()
+    generator = MarkdownGenerator(parser, content, config)
+
+    if output_path is None and output_dir is not None:
+        output_path = output_dir / f"{parser.word}.md"
+    if output_path is not None:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(generator.generate_card(article), encoding="utf-8")
+        return output_path
+
+    _, file_path = generator.generate_wordcard_with_file_management(article)
+    if file_path is None:
+        raise RuntimeError("File management is disabled; pass an output directory")
+    return file_path
+
+
+def run_batch(
+    items: List[str],
+    config: Dict[str, Any],
+    source: PageSource,
+    workers: int = 4,
+    article: str = "",
+    output_dir: Optional[Path] = None,
+    on_result: Optional[Callable[[BatchResult], None]] = None,
+    engine: Optional[str] = None,
+) -> List[BatchResult]:
+    """Generate a wordcard for every item.
+
+    Args:
+        items: Wiktionary URLs or bare words
+        config: Configuration dictionary
+        source: Page source shared by all workers
+        workers: Number of pages fetched and parsed at the same time
+        article: Article content added to every card
+        output_dir: Write cards here instead of using vault file management
+        on_result: Called with each result as soon as it is known
+        engine: Extraction engine ("html" or "store"); defaults to the config
+
+    Returns:
+        One BatchResult per item, in input order
+    """
+    if output_dir is None and not is_vault_configured():
+        raise ValueError("Vault not configured. Pass an output directory instead.")
+
+    results = [BatchResult(item=item, url=to_url(item)) for item in items]
+    flights = SingleFlight()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(_parse, result.url, config, source, engine, flights): result
+            for result in results
+        }
+
+        # Cards are written from this thread only, so FileManager never sees
+        # two writers at once
+        for future in as_completed(futures):
+            result = futures[future]
+            try:
+                parser = future.result()
+                result.word = parser.word
+                result.path = write_card(parser, config, article, output_dir)
+            except Exception as e:
+                logger.warning(f"Failed to generate '{result.item}': {e}")
+                result.error = str(e) or type(e).__name__
+
+            if on_result:
+                on_result(result)
+
+    return results
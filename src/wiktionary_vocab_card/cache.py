@@ -0,0 +1,431 @@
+"""
+Page Cache Module for Downloaded Wiktionary Pages
+
+This module keeps downloaded page bodies on disk together with their HTTP
+validators (ETag / Last-Modified). Fresh entries are served without touching the
+network; stale entries are revalidated with a conditional GET by the fetcher.
+PageCache stores one file pair per page; PackedPageCache keeps every page in a
+few compressed segment files behind a memory-mapped index.
+
+ResultCache is a second tier holding what the parser extracted from a page,
+keyed by the hash of the page bytes and the parser version. A changed page or
+a parser upgrade misses on its own, and a hit skips HTML parsing.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from appdirs import user_cache_dir
+
+from .config import load_config
+from .keys import canonical_url
+from .packed import PackedStore
+from .result import ParseResult
+from .utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(user_cache_dir("wiktionary_vocab_card"))
+
+
+@dataclass
+class CacheEntry:
+    """A cached response body plus the metadata needed to revalidate it."""
+
+    url: str
+    body: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = field(default_factory=time.time)
+
+    def age(self, now: Optional[float] = None) -> float:
+        """Seconds since the entry was last fetched or revalidated."""
+        return (now or time.time()) - self.fetched_at
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """On-disk cache of page bodies keyed by canonical URL."""
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        ttl: float = 7 * 24 * 3600,
+        max_size: int = 200 * 1024 * 1024,
+    ):
+        """Initialize PageCache.
+
+        Args:
+            directory: Cache root. Defaults to the user cache directory.
+            ttl: Seconds an entry is served without revalidation
+            max_size: Upper bound in bytes for stored page bodies
+        """
+        self.directory = Path(directory) if directory else CACHE_DIR
+        self.pages_dir = self.directory / "pages"
+        self.ttl = ttl
+        self.max_size = max_size
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        """Map a URL to its cache key (every spelling of a page shares one key)."""
+        return hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
+
+    def _paths(self, url: str):
+        key = self.key_for(url)
+        base = self.pages_dir / key[:2] / key
+        return base.with_suffix(".body"), base.with_suffix(".json")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Return the cached entry for url, or None if it is not cached."""
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+
+        if len(body) != meta.get("size", len(body)):
+            # Metadata and body belong to different writes; treat as a miss
+            return None
+
+        return CacheEntry(
+            url=meta["url"],
+            body=body,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            fetched_at=meta.get("fetched_at", 0.0),
+        )
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """Check whether an entry can be served without revalidation."""
+        return entry.age() < self.ttl
+
+    def put(self, url: str, body: bytes, headers: Optional[Any] = None) -> CacheEntry:
+        """Store a response body with the validators found in its headers."""
+        headers = headers or {}
+        entry = CacheEntry(
+            url=canonical_url(url),
+            body=body,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        )
+        self._write(entry)
+        self.enforce_size_limit()
+        return entry
+
+    def refresh(self, entry: CacheEntry, headers: Optional[Any] = None) -> CacheEntry:
+        """Mark an entry as freshly revalidated (after a 304 response)."""
+        headers = headers or {}
+        entry.fetched_at = time.time()
+        entry.etag = headers.get("ETag", entry.etag)
+        entry.last_modified = headers.get("Last-Modified", entry.last_modified)
+        self._write(entry, body_changed=False)
+        return entry
+
+    def add(self, entry: CacheEntry, enforce_limit: bool = True) -> None:
+        """Store a complete entry as is, keeping its validators and fetch time."""
+        self._write(entry)
+        if enforce_limit:
+            self.enforce_size_limit()
+
+    def iter_entries(self) -> Iterator[CacheEntry]:
+        """Yield every readable cached entry."""
+        for meta_path in self.pages_dir.glob("*/*.json"):
+            try:
+                url = json.loads(meta_path.read_text(encoding="utf-8"))["url"]
+            except (OSError, ValueError, KeyError):
+                continue
+            entry = self.get(url)
+            if entry is not None:
+                yield entry
+
+    def _write(self, entry: CacheEntry, body_changed: bool = True) -> None:
+        body_path, meta_path = self._paths(entry.url)
+        meta = {
+            "url": entry.url,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "fetched_at": entry.fetched_at,
+            "size": len(entry.body),
+        }
+        if body_changed:
+            write_atomic(body_path, entry.body)
+        else:
+            # Eviction goes by the body's mtime, so a revalidation counts as a fetch
+            try:
+                os.utime(body_path)
+            except OSError:
+                pass
+        write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def enforce_size_limit(self) -> None:
+        """Evict the least recently fetched entries until under max_size."""
+        entries = []
+        total = 0
+        for body_path in self.pages_dir.glob("*/*.body"):
+            try:
+                stat = body_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, body_path))
+            total += stat.st_size
+
+        if total <= self.max_size:
+            return
+
+        for _, size, body_path in sorted(entries):
+            if total <= self.max_size:
+                break
+            for path in (body_path, body_path.with_suffix(".json")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
+            logger.info(f"Evicted cached page: {body_path.stem}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and size of the cache."""
+        sizes = [path.stat().st_size for path in self.pages_dir.glob("*/*.body")]
+        return {"entries": len(sizes), "stored_bytes": sum(sizes)}
+
+    def clear(self) -> None:
+        """Remove every cached page."""
+        for path in self.pages_dir.glob("*/*"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+class PackedPageCache(PageCache):
+    """Page cache backed by a PackedStore instead of one file per page.
+
+    Pages are compressed with the benchmarked (or configured) codec, and the
+    byte budget is enforced by LRU or LFU eviction.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        ttl: float = 7 * 24 * 3600,
+        max_size: int = 200 * 1024 * 1024,
+        eviction: str = "lru",
+        compression: str = "auto",
+    ):
+        """Initialize PackedPageCache.
+
+        Args:
+            directory: Cache root. Defaults to the user cache directory.
+            ttl: Seconds an entry is served without revalidation
+            max_size: Upper bound in bytes for stored (compressed) pages
+            eviction: "lru" or "lfu"
+            compression: "auto", "zlib", "lzma" or "none"
+        """
+        super().__init__(directory, ttl, max_size)
+        self.eviction = eviction
+        self.store = PackedStore(self.directory / "packed", compression=compression)
+
+    @staticmethod
+    def _encode(entry: CacheEntry) -> bytes:
+        meta = {
+            "url": entry.url,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "fetched_at": entry.fetched_at,
+        }
+        return json.dumps(meta).encode("utf-8") + b"\n" + entry.body
+
+    @staticmethod
+    def _decode(value: bytes) -> CacheEntry:
+        meta, body = value.split(b"\n", 1)
+        meta = json.loads(meta)
+        return CacheEntry(
+            url=meta["url"],
+            body=body,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            fetched_at=meta.get("fetched_at", 0.0),
+        )
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        value = self.store.get(canonical_url(url))
+        return self._decode(value) if value is not None else None
+
+    def iter_entries(self) -> Iterator[CacheEntry]:
+        for _, value in self.store.items():
+            yield self._decode(value)
+
+    def _write(self, entry: CacheEntry, body_changed: bool = True) -> None:
+        # Records are immutable; a revalidated entry is appended again
+        self.store.put(canonical_url(entry.url), self._encode(entry))
+
+    def enforce_size_limit(self) -> None:
+        """Evict pages by the configured policy until under max_size."""
+        self.store.evict(self.max_size, self.eviction)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.store.stats(), eviction=self.eviction)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+class ResultCache:
+    """Parse results keyed by page content and parser version.
+
+    Results are stored as JSON in a PackedStore under the cache root, and
+    evicted by the configured policy once they pass max_size.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_size: int = 50 * 1024 * 1024,
+        eviction: str = "lru",
+        compression: str = "auto",
+    ):
+        """Initialize ResultCache.
+
+        Args:
+            directory: Cache root. Defaults to the user cache directory.
+            max_size: Upper bound in bytes for stored (compressed) results
+            eviction: "lru" or "lfu"
+            compression: "auto", "zlib", "lzma" or "none"
+        """
+        self.directory = Path(directory) if directory else CACHE_DIR
+        self.max_size = max_size
+        self.eviction = eviction
+        self.store = PackedStore(self.directory / "results", compression=compression)
+
+    @staticmethod
+    def key_for(content: bytes, version: int) -> str:
+        """Map page bytes and a parser version to a cache key."""
+        return f"{hashlib.sha256(content).hexdigest()}:{version}"
+
+    @staticmethod
+    def _decode(value: bytes) -> Optional[ParseResult]:
+        try:
+            return ParseResult.from_dict(json.loads(value))
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def get(self, content: bytes, version: int) -> Optional[ParseResult]:
+        """Return the result parsed from content by this parser version, or None."""
+        return self.get_key(self.key_for(content, version))
+
+    def get_key(self, key: str) -> Optional[ParseResult]:
+        """Return the result stored under a key from key_for(), or None."""
+        value = self.store.get(key)
+        return self._decode(value) if value is not None else None
+
+    def contains(self, key: str) -> bool:
+        """Whether a result is stored under key; not counted as a hit or miss."""
+        return self.store.contains(key)
+
+    def put(self, content: bytes, version: int, result: ParseResult) -> None:
+        """Store the result parsed from content."""
+        self.add(self.key_for(content, version), result)
+
+    def add(self, key: str, result: ParseResult, enforce_limit: bool = True) -> None:
+        """Store a result under a key from key_for()."""
+        value = json.dumps(result.to_dict(), ensure_ascii=False).encode("utf-8")
+        self.store.put(key, value)
+        if enforce_limit:
+            self.enforce_size_limit()
+
+    def items(self) -> Iterator[Tuple[str, ParseResult]]:
+        """Yield (key, result) for every readable stored result."""
+        for key, value in self.store.items():
+            result = self._decode(value)
+            if result is not None:
+                yield key, result
+
+    def enforce_size_limit(self) -> None:
+        """Evict results by the configured policy until under max_size."""
+        self.store.evict(self.max_size, self.eviction)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.store.stats(), eviction=self.eviction)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+CACHE_BACKENDS = {"files": PageCache, "packed": PackedPageCache}
+
+_default_cache: Optional[PageCache] = None
+
+
+def get_page_cache(config: Optional[Dict[str, Any]] = None) -> Optional[PageCache]:
+    """Get the page cache configured in config.yaml, or None if disabled."""
+    global _default_cache
+
+    if _default_cache is None:
+        if config is None:
+            config = load_config()
+        settings = config.get("cache", {})
+        if not settings.get("enabled", True):
+            return None
+        options = {
+            "directory": settings.get("path") or None,
+            "ttl": settings.get("ttl_seconds", 7 * 24 * 3600),
+            "max_size": int(settings.get("max_size_mb", 200) * 1024 * 1024),
+        }
+        if settings.get("backend", "packed") == "packed":
+            _default_cache = PackedPageCache(
+                eviction=settings.get("eviction", "lru"),
+                compression=settings.get("compression", "auto"),
+                **options,
+            )
+        else:
+            _default_cache = PageCache(**options)
+    return _default_cache
+
+
+def set_page_cache(cache: Optional[PageCache]) -> None:
+    """Replace the default page cache (None re-reads the configuration)."""
+    global _default_cache
+    _default_cache = cache
+
+
+_default_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache(config: Optional[Dict[str, Any]] = None) -> Optional[ResultCache]:
+    """Get the parse-result cache configured in config.yaml, or None if disabled."""
+    global _default_result_cache
+
+    if _default_result_cache is None:
+        if config is None:
+            config = load_config()
+        settings = config.get("cache", {})
+        if not (settings.get("enabled", True) and settings.get("results", True)):
+            return None
+        _default_result_cache = ResultCache(
+            directory=settings.get("path") or None,
+            max_size=int(settings.get("results_max_size_mb", 50) * 1024 * 1024),
+            eviction=settings.get("eviction", "lru"),
+            compression=settings.get("compression", "auto"),
+        )
+    return _default_result_cache
+
+
+def set_result_cache(cache: Optional[ResultCache]) -> None:
+    """Replace the default parse-result cache (None re-reads the configuration)."""
+    global _default_result_cache
+    _default_result_cache = cache
@@ -1,13 +1,41 @@
+import sys
+import tarfile
+import time
 from pathlib import Path
 
 import click
 
-from .config import (get_vault_name, get_vault_path, is_vault_configured,
-                     load_config, update_config)
+from .batch import read_items, run_batch
+from .cache import CACHE_DIR, get_page_cache, get_result_cache
+from .config import (
+    get_vault_name,
+    get_vault_path,
+    is_vault_configured,
+    load_config,
+    update_config,
+)
+from .deferred import drain_queue, get_queue, pending_count
+from .dump import ingest_dump
+from .entries import ENTRIES_FILE, create_parser, get_entry_store
+from .fetcher import is_transient, set_max_retries, set_rate_limit
+from .file_manager import FileManager
 from .generator import MarkdownGenerator
-from .parser import WiktionaryParser
+from .html_backends import available_backends
+from .kaikki import KaikkiSource
+from .keys import canonical_key
+from .packed import benchmark_codecs, pick_codec
+from .packs import export_pack, import_pack
 from .processor import ContentProcessor
-from .utils import open_in_obsidian
+from .revisions import (
+    RevisionStore,
+    check_cards,
+    record_revision,
+    regenerate_card,
+    revalidate_card,
+    revalidate_in_background,
+)
+from .sources import get_page_source
+from .utils import open_in_obsidian, parse_duration
 
 
 @click.group()
@@ -15,6 +43,15 @@ def cli():
     """Wiktionary Vocabulary Card Generator"""
 
 
+def _duration_option(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_duration(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
 @cli.command()
 @click.argument("url")
 @click.option("-o", "--output", help="Output file path (overrides configuration)")
@@ -28,22 +65,46 @@ def cli():
     is_flag=True,
     help="Don't open the generated file in Obsidian (opening is enabled by default)",
 )
-def generate(url, output, custom_text, no_open):
+@click.option(
+    "--snapshots",
+    type=click.Path(exists=True),
+    help="Parse from stored HTML snapshots (directory or archive) instead of "
+    "the network",
+)
+@click.option(
+    "--fetch-mode",
+    type=click.Choice(["page", "stream", "section"]),
+    help="Download the full page, stream it up to the end of the Finnish section, "
+    "or fetch only the Finnish section via the API",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["html", "store", "kaikki"]),
+    help="Parse the page HTML, read the local entry store filled by ingest-dump, "
+    "or read the configured wiktextract JSONL file",
+)
+@click.option(
+    "--defer",
+    is_flag=True,
+    help="Queue the request for 'wikt-vocab drain' instead of fetching now",
+)
+@click.option(
+    "--max-stale",
+    callback=_duration_option,
+    help="Use a cached page up to this long past its TTL (e.g. 30d) and "
+    "revalidate it in the background, updating the card if the page changed",
+)
+def generate(
+    url, output, custom_text, no_open, snapshots, fetch_mode, engine, defer, max_stale
+):
     """Generate vocabulary card from Wiktionary URL
 
     Uses intelligent file management when vault is configured, otherwise falls back
-    to file output or clipboard based on configuration.
+    to file output or clipboard based on configuration. When Wiktionary cannot be
+    reached, the request is queued for 'wikt-vocab drain'.
     """
     config = load_config()
-
-    # Parse the Wiktionary page
-    parser = WiktionaryParser(url)
-    parser.parse()
-
-    processor = ContentProcessor(parser, config)
-    content = processor.process_content()
-
-    generator = MarkdownGenerator(parser, content, config)
+    queue_config = config.get("queue", {})
 
     # Handle article content (custom_text becomes article content)
     # If no -t option provided, use configured custom_text as article content
@@ -52,6 +113,41 @@ def generate(url, output, custom_text, no_open):
         configured_custom_text = ""  # Ignore placeholder
     article_content = custom_text or configured_custom_text
 
+    def enqueue():
+        queue = get_queue(config)
+        queue.add(url, article_content, output, engine, fetch_mode)
+        click.echo(
+            f"Queued {url} ({len(queue)} waiting); run 'wikt-vocab drain' to "
+            "generate it"
+        )
+
+    if defer:
+        enqueue()
+        return
+
+    # Parse the Wiktionary page
+    source = get_page_source(config, snapshots, fetch_mode, max_stale=max_stale or 0.0)
+    can_queue = queue_config.get("enabled", True) and not snapshots
+    if can_queue:
+        # Fail fast; drain retries with backoff
+        set_max_retries(queue_config.get("interactive_retries", 1))
+    parser = create_parser(url, config, source=source, engine=engine)
+    try:
+        parser = parser.parse()
+    except Exception as e:
+        if not (can_queue and is_transient(e)):
+            raise
+        click.echo(f"Could not reach Wiktionary: {e}", err=True)
+        enqueue()
+        return
+    record_revision(parser)
+
+    processor = ContentProcessor(parser, config)
+    content = processor.process_content()
+
+    generator = MarkdownGenerator(parser, content, config)
+    card_path = None
+
     # Determine if we should open in Obsidian
     should_open = not no_open and config.get("output", {}).get("open_in_obsidian", True)
 
@@ -64,6 +160,7 @@ def generate(url, output, custom_text, no_open):
             output_path.parent.mkdir(parents=True, exist_ok=True)
             with open(output_path, "w", encoding="utf-8") as f:
                 f.write(card)
+            card_path = output_path
             click.echo(f"Wordcard saved to: {output_path}")
 
             # Open in Obsidian if requested and vault is configured
@@ -94,6 +191,7 @@ def generate(url, output, custom_text, no_open):
             )
 
             if file_path:
+                card_path = file_path
                 click.echo(f"Wordcard processed and saved to: {file_path}")
 
                 # Open in Obsidian if requested
@@ -145,6 +243,7 @@ def generate(url, output, custom_text, no_open):
                 output_path.parent.mkdir(parents=True, exist_ok=True)
                 with open(output_path, "w", encoding="utf-8") as f:
                     f.write(card)
+                card_path = output_path
                 click.echo(f"Wordcard saved to: {output_path}")
 
                 # Open in Obsidian if requested and a basic vault is configured
@@ -175,6 +274,458 @@ def generate(url, output, custom_text, no_open):
             if output_mode == "clipboard":
                 click.echo("Content copied to clipboard.")
 
+    if getattr(source, "served_stale", False):
+        # The card came from a page past its TTL; check for changes afterwards
+        revalidate_in_background(url, card_path, fetch_mode)
+        click.echo("Used a stale cached page; revalidating in the background")
+
+
+@cli.command("generate-batch")
+@click.argument("items", nargs=-1)
+@click.option(
+    "-f",
+    "--file",
+    "input_file",
+    type=click.File("r", encoding="utf-8"),
+    help="Read URLs or words from a file, one per line ('-' for stdin)",
+)
+@click.option(
+    "-d",
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    help="Write cards to this directory instead of the configured vault",
+)
+@click.option("-t", "--custom-text", help="Article content added to every wordcard")
+@click.option("-w", "--workers", type=int, help="Number of pages fetched concurrently")
+@click.option("--rate", type=float, help="Maximum requests per second per host")
+@click.option(
+    "--snapshots",
+    type=click.Path(exists=True),
+    help="Parse from stored HTML snapshots (directory or archive) instead of "
+    "the network",
+)
+@click.option(
+    "--fetch-mode",
+    type=click.Choice(["page", "stream", "section"]),
+    help="How pages are downloaded (see generate --help)",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["html", "store", "kaikki"]),
+    help="Parse the page HTML, read the local entry store filled by ingest-dump, "
+    "or read the configured wiktextract JSONL file",
+)
+def generate_batch(
+    items,
+    input_file,
+    output_dir,
+    custom_text,
+    workers,
+    rate,
+    snapshots,
+    fetch_mode,
+    engine,
+):
+    """Generate vocabulary cards for many URLs or words
+
+    Items are taken from the arguments, from --file, or from stdin when neither
+    is given. Pages are fetched concurrently; a summary of every item is printed
+    at the end.
+    """
+    config = load_config()
+
+    items = list(items)
+    if input_file:
+        items.extend(read_items(input_file))
+    elif not items and not sys.stdin.isatty():
+        items = read_items(sys.stdin)
+
+    if not items:
+        raise click.UsageError("No URLs or words given")
+
+    if rate is not None:
+        set_rate_limit(rate)
+
+    configured_custom_text = config.get("custom_text", "")
+    if configured_custom_text == "{custom text}":
+        configured_custom_text = ""  # Ignore placeholder
+    article_content = custom_text or configured_custom_text
+
+    def report(result):
+        if result.ok:
+            click.echo(f"✓ {result.word} -> {result.path}")
+        else:
+            click.echo(f"✗ {result.item}: {result.error}", err=True)
+
+    try:
+        results = run_batch(
+            items,
+            config,
+            source=get_page_source(config, snapshots, fetch_mode),
+            workers=workers or config.get("batch", {}).get("workers", 8),
+            article=article_content,
+            output_dir=Path(output_dir) if output_dir else None,
+            on_result=report,
+            engine=engine,
+        )
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    failed = [result for result in results if not result.ok]
+    click.echo()
+    click.echo(f"Generated {len(results) - len(failed)} of {len(results)} wordcards")
+    for result in failed:
+        click.echo(f"  failed: {result.item} ({result.error})")
+
+    if failed:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option("-w", "--workers", type=int, help="Number of pages fetched concurrently")
+@click.option(
+    "-d",
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    help="Write cards queued without -o here instead of the configured vault",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help="Keep running, waiting out backoff, until the queue is empty",
+)
+@click.option(
+    "--list", "list_only", is_flag=True, help="Show the queue without generating"
+)
+@click.option("--retry-failed", is_flag=True, help="Queue given-up requests again")
+def drain(workers, output_dir, watch, list_only, retry_failed):
+    """Generate the cards queued while Wiktionary was unreachable
+
+    Requests that still fail for network reasons stay queued and are retried
+    with exponential backoff; other failures are given up on and listed.
+    """
+    config = load_config()
+    queue = get_queue(config)
+
+    if retry_failed:
+        click.echo(f"Queued {queue.retry_failed()} failed requests again")
+
+    if list_only:
+        now = time.time()
+        for request in queue.all_requests():
+            line = f"{request.status:8} {request.url}"
+            if request.output:
+                line += f" -> {request.output}"
+            if request.status == "pending" and request.next_attempt_at > now:
+                line += f" (retry in {request.next_attempt_at - now:.0f}s)"
+            if request.last_error:
+                line += f" [{request.attempts} attempts: {request.last_error}]"
+            click.echo(line)
+        click.echo(f"{len(queue)} pending")
+        return
+
+    if (
+        output_dir is None
+        and not is_vault_configured()
+        and any(not request.output for request in queue.all_requests())
+    ):
+        raise click.UsageError("Vault not configured. Pass --output-dir instead.")
+
+    def report(request, result, outcome):
+        if outcome == "generated":
+            click.echo(f"✓ {result.word} -> {result.path}")
+        elif outcome == "deferred":
+            click.echo(f"… {request.url}: {result.error} (will retry)", err=True)
+        else:
+            click.echo(f"✗ {request.url}: {result.error}", err=True)
+
+    counts = {"generated": 0, "deferred": 0, "failed": 0}
+    while True:
+        stats = drain_queue(
+            queue,
+            config,
+            workers=workers or config.get("batch", {}).get("workers", 8),
+            output_dir=Path(output_dir) if output_dir else None,
+            on_result=report,
+        )
+        for outcome in counts:
+            counts[outcome] += len(getattr(stats, outcome))
+
+        next_attempt_at = queue.next_attempt_at()
+        if not watch or next_attempt_at is None:
+            break
+        wait = max(0.0, next_attempt_at - time.time())
+        if wait:
+            click.echo(f"Waiting {wait:.0f}s for the next retry ({len(queue)} queued)")
+            time.sleep(wait)
+
+    click.echo()
+    click.echo(
+        f"Generated {counts['generated']}, deferred {counts['deferred']}, "
+        f"failed {counts['failed']}; {len(queue)} still queued"
+    )
+    if counts["failed"]:
+        sys.exit(1)
+
+
+@cli.command("ingest-dump")
+@click.argument("dump", type=click.Path(exists=True, dir_okay=False))
+@click.option("--limit", type=int, help="Stop after this many pages (for trial runs)")
+def ingest_dump_command(dump, limit):
+    """Fill the local entry store from a Wiktionary XML dump
+
+    DUMP is an enwiktionary-*-pages-articles.xml(.bz2) file. It is read once,
+    front to back; pages with a Finnish section are stored for use with
+    --engine store.
+    """
+    config = load_config()
+    store = get_entry_store(config)
+
+    def progress(stats):
+        click.echo(f"  {stats.pages} pages read, {stats.entries} entries stored")
+
+    stats = ingest_dump(Path(dump), store, limit=limit, on_progress=progress)
+    click.echo(
+        f"Ingested {stats.entries} Finnish entries from {stats.pages} pages "
+        f"into {store.path}"
+    )
+
+
+@cli.command("index-kaikki")
+@click.argument("jsonl", type=click.Path(exists=True, dir_okay=False), required=False)
+def index_kaikki(jsonl):
+    """Index a wiktextract JSONL file for instant lookups
+
+    JSONL defaults to extraction.kaikki_path. The index is written next to the
+    file and used automatically by --engine kaikki until the file changes.
+    """
+    config = load_config()
+    jsonl = jsonl or config.get("extraction", {}).get("kaikki_path")
+    if not jsonl:
+        raise click.UsageError("No JSONL file given or configured")
+
+    source = KaikkiSource(Path(jsonl))
+    try:
+        count = source.build_index()
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    click.echo(f"Indexed {count} Finnish records into {source.index_path}")
+
+
+@cli.command()
+@click.argument("urls", nargs=-1)
+@click.option("--dry-run", is_flag=True, help="Only report which cards have changed")
+@click.option(
+    "--baseline",
+    is_flag=True,
+    help="Record the current revisions without regenerating (for cards created "
+    "before revisions were tracked)",
+)
+@click.option(
+    "--fetch-mode",
+    type=click.Choice(["page", "stream", "section"]),
+    help="How changed pages are downloaded (see generate --help)",
+)
+def refresh(urls, dry_run, baseline, fetch_mode):
+    """Regenerate cards whose Wiktionary page has changed
+
+    Looks up the current revision of every card's page in batches of up to 50
+    titles per API request and regenerates only the cards whose revision differs
+    from the one they were generated from. Pass URLs or words to limit the check
+    to those cards. Cards keep their learning stage and articles.
+    """
+    config = load_config()
+
+    if not is_vault_configured():
+        raise click.UsageError("Vault not configured. Run 'wikt-vocab configure'.")
+
+    file_manager = FileManager(config)
+    store = RevisionStore()
+    only = {canonical_key(url) for url in urls} if urls else None
+
+    card_paths = [path for path, _ in file_manager.list_wordcards()]
+    cards = check_cards(card_paths, file_manager, store, only=only)
+    changed = [card for card in cards if card.changed]
+
+    click.echo(f"Checked {len(cards)} wordcards, {len(changed)} changed on Wiktionary")
+
+    if dry_run:
+        for card in changed:
+            click.echo(f"  {card.path.stem}: {card.recorded} -> {card.current}")
+        return
+
+    if baseline:
+        for card in changed:
+            store.set(card.url, card.current)
+        click.echo(f"Recorded current revisions for {len(changed)} wordcards")
+        return
+
+    # Changed pages must not be served from the page cache
+    source = get_page_source(config, fetch_mode=fetch_mode, revalidate=True)
+    failed = 0
+    for card in changed:
+        try:
+            regenerate_card(card, source, config, file_manager, store)
+            click.echo(f"✓ {card.path.stem} (revision {card.current})")
+        except Exception as e:
+            failed += 1
+            click.echo(f"✗ {card.path.stem}: {e}", err=True)
+
+    click.echo(
+        f"Regenerated {len(changed) - failed} of {len(changed)} changed wordcards"
+    )
+    if failed:
+        sys.exit(1)
+
+
+@cli.command(hidden=True)
+@click.argument("url")
+@click.option("--card", type=click.Path(dir_okay=False), help="Card built from url")
+@click.option("--fetch-mode", type=click.Choice(["page", "stream", "section"]))
+def revalidate(url, card, fetch_mode):
+    """Revalidate a page that generate served stale and update its card
+
+    Started in the background by 'generate --max-stale'.
+    """
+    config = load_config()
+    source = get_page_source(config, fetch_mode=fetch_mode, revalidate=True)
+    if revalidate_card(
+        url, Path(card) if card else None, source, config, FileManager(config)
+    ):
+        click.echo(f"Updated {card}: the page changed on Wiktionary")
+
+
+@cli.group("cache")
+def cache_group():
+    """Export, import and inspect the local page cache"""
+
+
+def _require_page_cache(config):
+    page_cache = get_page_cache(config)
+    if page_cache is None:
+        raise click.UsageError("The page cache is disabled (cache.enabled)")
+    return page_cache
+
+
+@cache_group.command("export")
+@click.argument("pack", type=click.Path(dir_okay=False))
+@click.option(
+    "-f",
+    "--words",
+    "words_file",
+    type=click.File("r", encoding="utf-8"),
+    help="Only export these URLs or words, one per line",
+)
+@click.option("--no-entries", is_flag=True, help="Leave out the local entry store")
+def cache_export(pack, words_file, no_entries):
+    """Bundle cached pages, stored entries and parse results into a portable pack
+
+    PACK is written as a gzip-compressed tar archive with a checksummed
+    manifest; load it elsewhere with `wikt-vocab cache import`.
+    """
+    config = load_config()
+    stats = export_pack(
+        Path(pack),
+        _require_page_cache(config),
+        entry_store=None if no_entries else get_entry_store(config),
+        words=read_items(words_file) if words_file else None,
+        result_cache=get_result_cache(config),
+    )
+    click.echo(f"Exported {stats.pages} pages and {stats.entries} entries to {pack}")
+    if stats.results:
+        click.echo(f"Included {stats.results} parse results")
+
+
+@cache_group.command("import")
+@click.argument("pack", type=click.Path(exists=True, dir_okay=False))
+@click.option("--no-entries", is_flag=True, help="Only import cached pages")
+def cache_import(pack, no_entries):
+    """Merge a cache pack into the local cache
+
+    Pages already cached locally at least as recently are kept. Importing the
+    same pack again changes nothing.
+    """
+    config = load_config()
+    try:
+        stats = import_pack(
+            Path(pack),
+            _require_page_cache(config),
+            entry_store=None if no_entries else get_entry_store(config),
+            result_cache=get_result_cache(config),
+        )
+    except (ValueError, tarfile.TarError) as e:
+        raise click.ClickException(f"Could not import {pack}: {e}")
+
+    click.echo(
+        f"Imported {stats.pages} pages and {stats.entries} entries "
+        f"({stats.skipped} pages already up to date)"
+    )
+    if stats.results:
+        click.echo(f"Merged {stats.results} new parse results")
+    if stats.corrupt:
+        for name in stats.corrupt:
+            click.echo(f"  checksum mismatch or missing: {name}", err=True)
+        sys.exit(1)
+
+
+@cache_group.command("stats")
+@click.option(
+    "--benchmark",
+    is_flag=True,
+    help="Also benchmark the compression codecs on cached pages",
+)
+def cache_stats(benchmark):
+    """Show cache size, hit/miss/eviction counters and compression savings"""
+    config = load_config()
+    page_cache = _require_page_cache(config)
+    stats = page_cache.stats()
+
+    click.echo(f"Entries: {stats['entries']}")
+    click.echo(
+        f"Stored: {stats['stored_bytes'] / 1e6:.1f} MB of "
+        f"{page_cache.max_size / 1e6:.1f} MB"
+    )
+    if "hits" in stats:
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups if lookups else 0.0
+        click.echo(f"Uncompressed: {stats['raw_bytes'] / 1e6:.1f} MB")
+        click.echo(
+            f"Saved by compression ({stats['codec']}): "
+            f"{stats['bytes_saved'] / 1e6:.1f} MB"
+        )
+        click.echo(
+            f"Hits: {stats['hits']}  Misses: {stats['misses']}  ({hit_rate:.0%})"
+        )
+        click.echo(f"Evictions ({stats['eviction']}): {stats['evictions']}")
+        click.echo(f"Reclaimable by compaction: {stats['dead_bytes'] / 1e6:.1f} MB")
+
+    result_cache = get_result_cache(config)
+    if result_cache is not None:
+        stats = result_cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups if lookups else 0.0
+        click.echo()
+        click.echo(
+            f"Parse results: {stats['entries']} "
+            f"({stats['stored_bytes'] / 1e6:.1f} MB)  "
+            f"Hits: {stats['hits']}  Misses: {stats['misses']}  ({hit_rate:.0%})"
+        )
+
+    if benchmark:
+        samples = [entry.body for _, entry in zip(range(50), page_cache.iter_entries())]
+        if not samples:
+            raise click.UsageError("The cache is empty; nothing to benchmark")
+        click.echo()
+        click.echo(f"Codec benchmark on {len(samples)} cached pages:")
+        results = benchmark_codecs(samples)
+        for result in results:
+            click.echo(
+                f"  {result.name:5} ratio {result.ratio:.3f}  "
+                f"compress {result.compress_seconds_per_mb * 1000:.1f} ms/MB  "
+                f"decompress {result.decompress_seconds_per_mb * 1000:.1f} ms/MB"
+            )
+        click.echo(f"Best fit: {pick_codec(results)}")
+
 
 @cli.command()
 @click.option(
@@ -279,6 +830,34 @@ def status():
 
     click.echo()
 
+    # Page cache settings
+    cache_config = config.get("cache", {})
+    click.echo(f"Page Cache: {cache_config.get('enabled', True)}")
+    click.echo(f"Cache Backend: {cache_config.get('backend', 'packed')}")
+    click.echo(f"Cache Eviction: {cache_config.get('eviction', 'lru')}")
+    click.echo(f"Cache Compression: {cache_config.get('compression', 'auto')}")
+    click.echo(f"Cache Path: {cache_config.get('path') or CACHE_DIR}")
+    click.echo(f"Cache TTL (seconds): {cache_config.get('ttl_seconds')}")
+    click.echo(f"Cache Max Size (MB): {cache_config.get('max_size_mb')}")
+    click.echo(f"Cache Parse Results: {cache_config.get('results', True)}")
+    click.echo(
+        f"Cache Results Max Size (MB): {cache_config.get('results_max_size_mb')}"
+    )
+
+    # Extraction engine settings
+    extraction_config = config.get("extraction", {})
+    click.echo(f"Extraction Engine: {extraction_config.get('engine', 'html')}")
+    click.echo(f"Entry Store: {extraction_config.get('store_path') or ENTRIES_FILE}")
+    click.echo(
+        f"HTML Parser: {extraction_config.get('html_parser', 'auto')}"
+        f" (installed: {', '.join(available_backends())})"
+    )
+    if extraction_config.get("kaikki_path"):
+        click.echo(f"Wiktextract JSONL: {extraction_config['kaikki_path']}")
+    click.echo(f"Queued Requests: {pending_count(config)}")
+
+    click.echo()
+
     # Other settings
     click.echo(f"Table Folding: {config.get('table_folding', True)}")
     click.echo(f"Default Output: {config.get('default_output', 'vocabulary_cards')}")
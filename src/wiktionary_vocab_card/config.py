@@ -34,6 +34,64 @@ DEFAULT_CONFIG = {
         "append_articles": True,
         "move_from_remembered": True,
     },
+    # HTTP settings shared by every Wiktionary request
+    "network": {
+        "user_agent": (
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        ),
+        "connect_timeout": 5.0,
+        "read_timeout": 30.0,
+        "pool_size": 10,
+        "requests_per_second": 5.0,  # Per-host cap, 0 disables it
+        # Retries for throttled (429/503) or failed requests; Retry-After wins
+        "max_retries": 4,
+        "backoff_base": 1.0,
+        "backoff_max": 60.0,  # A longer Retry-After fails the request instead
+        # Requests in flight adapt between 1 and max_concurrency (AIMD)
+        "initial_concurrency": 4,
+        "max_concurrency": 16,
+    },
+    # Concurrent generation of many cards
+    "batch": {
+        "workers": 8,  # Upper bound; the adaptive limit decides what is in flight
+    },
+    # On-disk cache of downloaded pages
+    "cache": {
+        "enabled": True,
+        "backend": "packed",  # Segment files + mmap'd index, or "files" (one per page)
+        "path": "",  # Empty means the per-user cache directory
+        "ttl_seconds": 7 * 24 * 3600,  # Serve without revalidation for a week
+        "max_size_mb": 200,  # Budget for stored (compressed) pages
+        "eviction": "lru",  # or "lfu"; used by the packed backend
+        "compression": "auto",  # Benchmark zlib/lzma on first write, or name one
+        "results": True,  # Also keep parse results, keyed by page content hash
+        "results_max_size_mb": 50,  # Budget for results, on top of max_size_mb
+    },
+    # Where page HTML comes from: live Wiktionary or stored snapshots
+    "source": {
+        "type": "http",  # or "snapshot"
+        "snapshot_path": "",  # Directory or archive of <title>.html files
+        # "page", "stream" (stop after the Finnish section) or "section" (parse API)
+        "fetch_mode": "page",
+    },
+    # How entries are extracted: parse page HTML, or read the local entry store
+    "extraction": {
+        "engine": "html",  # "store" (filled by ingest-dump) or "kaikki"
+        "store_path": "",  # Empty means the per-user data directory
+        "kaikki_path": "",  # wiktextract JSONL file for the kaikki engine
+        # "auto" (fastest installed), "html.parser", "lxml" or "selectolax"
+        "html_parser": "auto",
+    },
+    # Generate requests deferred while Wiktionary is unreachable or throttling
+    "queue": {
+        "enabled": True,  # Queue failed generate requests for `wikt-vocab drain`
+        "path": "",  # Empty means the per-user data directory
+        "interactive_retries": 1,  # Fail fast in generate; drain retries later
+        "max_attempts": 10,
+        "backoff_base": 30.0,  # Seconds, doubled per attempt (jittered)
+        "backoff_max": 3600.0,
+    },
 }
 
 
@@ -201,6 +259,36 @@ def _validate_config(config: Dict[str, Any]) -> Dict[str, Any]:
     if config.get("output", {}).get("mode") not in valid_modes:
         config.setdefault("output", {})["mode"] = "filesystem"
 
+    # Ensure page source is valid; a snapshot source needs a location
+    source = config.setdefault("source", {})
+    if source.get("type") not in {"http", "snapshot"} or (
+        source.get("type") == "snapshot" and not source.get("snapshot_path")
+    ):
+        source["type"] = "http"
+    if source.get("fetch_mode") not in {"page", "stream", "section"}:
+        source["fetch_mode"] = "page"
+
+    cache = config.setdefault("cache", {})
+    if cache.get("backend") not in {"packed", "files"}:
+        cache["backend"] = "packed"
+    if cache.get("eviction") not in {"lru", "lfu"}:
+        cache["eviction"] = "lru"
+    if cache.get("compression") not in {"auto", "zlib", "lzma", "none"}:
+        cache["compression"] = "auto"
+
+    extraction = config.setdefault("extraction", {})
+    if extraction.get("engine") not in {"html", "store", "kaikki"} or (
+        extraction.get("engine") == "kaikki" and not extraction.get("kaikki_path")
+    ):
+        extraction["engine"] = "html"
+    if extraction.get("html_parser") not in {
+        "auto",
+        "html.parser",
+        "lxml",
+        "selectolax",
+    }:
+        extraction["html_parser"] = "auto"
+
     # Ensure boolean values are actually booleans
     bool_keys = [
         ("table_folding",),
@@ -210,6 +298,9 @@ def _validate_config(config: Dict[str, Any]) -> Dict[str, Any]:
         ("file_management", "check_existing"),
         ("file_management", "append_articles"),
         ("file_management", "move_from_remembered"),
+        ("cache", "enabled"),
+        ("cache", "results"),
+        ("queue", "enabled"),
     ]
 
     for key_path in bool_keys:
@@ -221,4 +312,32 @@ def _validate_config(config: Dict[str, Any]) -> Dict[str, Any]:
         if final_key in current:
             current[final_key] = bool(current[final_key])
 
+    # Ensure numeric settings are usable, falling back to defaults
+    numeric_keys = [
+        ("network", "connect_timeout", float),
+        ("network", "read_timeout", float),
+        ("network", "pool_size", int),
+        ("network", "requests_per_second", float),
+        ("network", "max_retries", int),
+        ("network", "backoff_base", float),
+        ("network", "backoff_max", float),
+        ("network", "initial_concurrency", int),
+        ("network", "max_concurrency", int),
+        ("batch", "workers", int),
+        ("cache", "ttl_seconds", float),
+        ("cache", "max_size_mb", float),
+        ("cache", "results_max_size_mb", float),
+        ("queue", "interactive_retries", int),
+        ("queue", "max_attempts", int),
+        ("queue", "backoff_base", float),
+        ("queue", "backoff_max", float),
+    ]
+
+    for section, key, cast in numeric_keys:
+        values = config.setdefault(section, {})
+        try:
+            values[key] = cast(values[key])
+        except (KeyError, TypeError, ValueError):
+            values[key] = DEFAULT_CONFIG[section][key]
+
     return config
@@ -53,10 +53,16 @@ def debug_word(word=None):
         print(f"URL for '{word}' not found in examples.json")
         return
 
+    # Parse the stored snapshot when available so debugging needs no network
+    snapshots = "examples" if Path(f"examples/{word}.html").exists() else None
+
     print(f"Debugging word: {word} ({url})")
-    # Call the click command function directly with the arguments
-    # This bypasses Click's CLI exit handling
-    generate.callback(url=url, output=f"examples/{word}.md")
+    # Run the click command without its CLI exit handling; options that are
+    # not passed get their declared defaults
+    args = [url, "--output", f"examples/{word}.md", "--no-open"]
+    if snapshots:
+        args += ["--snapshots", snapshots]
+    generate.main(args, standalone_mode=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,341 @@
+"""
+Deferred Generation Queue
+
+When Wiktionary cannot be reached or keeps throttling, ``generate`` records the
+request (URL, article text and output options) in a durable SQLite queue
+instead of failing, so capturing a word stays instant on a bad connection.
+``wikt-vocab drain`` later works through the queue concurrently, backing off
+per request while the network is still unhealthy. Requests are claimed with a
+lease, so two drains never generate the same card and a drain that dies
+leaves its requests to the next one.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from appdirs import user_data_dir
+
+from .batch import BatchResult, write_card
+from .entries import create_parser
+from .fetcher import RetryPolicy, is_transient
+from .keys import SingleFlight, canonical_key, canonical_url
+from .sources import get_page_source
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FILE = Path(user_data_dir("wiktionary_vocab_card")) / "queue.sqlite3"
+
+# How long a drain may work on a claimed request before another drain retries it
+CLAIM_SECONDS = 15 * 60
+
+
+@dataclass
+class QueuedRequest:
+    """A generate request waiting for the network."""
+
+    id: int
+    url: str
+    article: str = ""
+    output: Optional[str] = None
+    engine: Optional[str] = None
+    fetch_mode: Optional[str] = None
+    added_at: float = 0.0
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+    status: str = "pending"
+    last_error: Optional[str] = None
+
+
+@dataclass
+class DrainStats:
+    """What a drain did with the requests that were due."""
+
+    generated: List[BatchResult] = field(default_factory=list)
+    deferred: List[BatchResult] = field(default_factory=list)
+    failed: List[BatchResult] = field(default_factory=list)
+
+
+class GenerationQueue:
+    """SQLite-backed queue of deferred generate requests."""
+
+    COLUMNS = (
+        "id, url, article, output, engine, fetch_mode, added_at, attempts, "
+        "next_attempt_at, status, last_error"
+    )
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else QUEUE_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS requests ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " key TEXT NOT NULL,"
+                " url TEXT NOT NULL,"
+                " article TEXT NOT NULL,"
+                " output TEXT,"
+                " engine TEXT,"
+                " fetch_mode TEXT,"
+                " added_at REAL NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " next_attempt_at REAL NOT NULL DEFAULT 0,"
+                " status TEXT NOT NULL DEFAULT 'pending',"
+                " last_error TEXT)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that created them
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _select(self, where: str, params=()) -> List[QueuedRequest]:
+        rows = self._connect().execute(
+            f"SELECT {self.COLUMNS} FROM requests WHERE {where} ORDER BY id", params
+        )
+        return [QueuedRequest(*row) for row in rows]
+
+    def add(
+        self,
+        url: str,
+        article: str = "",
+        output: Optional[Path] = None,
+        engine: Optional[str] = None,
+        fetch_mode: Optional[str] = None,
+    ) -> None:
+        """Queue a request; a pending request for the same page and output
+        is replaced, so queuing a word twice generates one card."""
+        key = str(canonical_key(url))
+        output = str(Path(output).resolve()) if output else None
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM requests WHERE key = ? AND output IS ?"
+                " AND status = 'pending'",
+                (key, output),
+            )
+            connection.execute(
+                "INSERT INTO requests"
+                " (key, url, article, output, engine, fetch_mode, added_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    canonical_url(url),
+                    article,
+                    output,
+                    engine,
+                    fetch_mode,
+                    time.time(),
+                ),
+            )
+
+    def claim_due(
+        self, now: Optional[float] = None, claim_seconds: float = CLAIM_SECONDS
+    ) -> List[QueuedRequest]:
+        """Return the pending requests that are due and lease them to the caller."""
+        now = now or time.time()
+        connection = self._connect()
+        # BEGIN IMMEDIATE makes select-and-lease atomic across processes
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            due = self._select("status = 'pending' AND next_attempt_at <= ?", (now,))
+            connection.executemany(
+                "UPDATE requests SET next_attempt_at = ? WHERE id = ?",
+                [(now + claim_seconds, request.id) for request in due],
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return due
+
+    def remove(self, request_id: int) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM requests WHERE id = ?", (request_id,))
+
+    def defer(self, request_id: int, error: str, delay: float, attempt: bool = True):
+        """Retry a request after delay seconds, counting an attempt if it was made."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE requests SET attempts = attempts + ?, next_attempt_at = ?,"
+                " last_error = ? WHERE id = ?",
+                (int(attempt), time.time() + delay, error, request_id),
+            )
+
+    def fail(self, request_id: int, error: str) -> None:
+        """Stop retrying a request; it stays listed until retry_failed()."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE requests SET status = 'failed', attempts = attempts + 1,"
+                " last_error = ? WHERE id = ?",
+                (error, request_id),
+            )
+
+    def retry_failed(self) -> int:
+        """Make failed requests pending again; returns how many there were."""
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE requests SET status = 'pending', attempts = 0,"
+                " next_attempt_at = 0 WHERE status = 'failed'"
+            ).rowcount
+
+    def all_requests(self) -> List[QueuedRequest]:
+        """Every queued request, oldest first."""
+        return self._select("1")
+
+    def next_attempt_at(self) -> Optional[float]:
+        """When the earliest pending request is due, or None if none is pending."""
+        row = (
+            self._connect()
+            .execute(
+                "SELECT MIN(next_attempt_at) FROM requests WHERE status = 'pending'"
+            )
+            .fetchone()
+        )
+        return row[0]
+
+    def __len__(self) -> int:
+        return (
+            self._connect()
+            .execute("SELECT COUNT(*) FROM requests WHERE status = 'pending'")
+            .fetchone()[0]
+        )
+
+
+_default_queue: Optional[GenerationQueue] = None
+
+
+def get_queue(config: Dict[str, Any]) -> GenerationQueue:
+    """Get the generation queue configured under queue.path."""
+    global _default_queue
+    path = config.get("queue", {}).get("path") or None
+    if _default_queue is None or (path and Path(path) != _default_queue.path):
+        _default_queue = GenerationQueue(Path(path) if path else None)
+    return _default_queue
+
+
+def pending_count(config: Dict[str, Any]) -> int:
+    """Number of pending requests, without creating the queue if there is none."""
+    path = config.get("queue", {}).get("path") or None
+    if _default_queue is None or (path and Path(path) != _default_queue.path):
+        if not Path(path or QUEUE_FILE).exists():
+            return 0
+    return len(get_queue(config))
+
+
+def drain_queue(
+    queue: GenerationQueue,
+    config: Dict[str, Any],
+    workers: int = 4,
+    output_dir: Optional[Path] = None,
+    on_result: Optional[Callable[[QueuedRequest, BatchResult, str], None]] = None,
+) -> DrainStats:
+    """Generate the cards for every due request in the queue.
+
+    Requests that fail for network reasons are retried later with exponential
+    backoff until queue.max_attempts; other failures are marked failed. Once a
+    request finds the network unreachable, requests not yet started are put
+    back without an attempt instead of each waiting for its own timeout.
+
+    Args:
+        queue: Queue to drain
+        config: Configuration dictionary
+        workers: Number of pages fetched and parsed at the same time
+        output_dir: Write cards without their own output file here instead
+            of using vault file management
+        on_result: Called with each request, its result and the outcome
+            ("generated", "deferred" or "failed")
+
+    Returns:
+        The results, by outcome
+    """
+    settings = config.get("queue", {})
+    policy = RetryPolicy(
+        max_retries=int(settings.get("max_attempts", 10)),
+        base_delay=float(settings.get("backoff_base", 30.0)),
+        max_delay=float(settings.get("backoff_max", 3600.0)),
+    )
+    stats = DrainStats()
+    due = queue.claim_due()
+    sources = {
+        fetch_mode: get_page_source(config, fetch_mode=fetch_mode)
+        for fetch_mode in {request.fetch_mode for request in due}
+    }
+    flights = SingleFlight()
+    offline = threading.Event()
+
+    def parse(request: QueuedRequest):
+        if offline.is_set():
+            return None
+
+        def run():
+            parser = create_parser(
+                request.url,
+                config,
+                source=sources[request.fetch_mode],
+                engine=request.engine,
+            )
+            return parser.parse()
+
+        try:
+            return flights.do(f"{canonical_key(request.url)}:{request.engine}", run)
+        except (requests.ConnectionError, requests.Timeout):
+            offline.set()
+            raise
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(parse, request): request for request in due}
+
+        # Cards are written from this thread only, as in run_batch
+        for future in as_completed(futures):
+            request = futures[future]
+            result = BatchResult(item=request.url, url=request.url)
+            try:
+                parser = future.result()
+                if parser is None:
+                    result.error = "network unreachable; not attempted"
+                    queue.defer(
+                        request.id,
+                        result.error,
+                        policy.delay(request.attempts),
+                        attempt=False,
+                    )
+                    outcome = "deferred"
+                else:
+                    result.word = parser.word
+                    result.path = write_card(
+                        parser,
+                        config,
+                        request.article,
+                        output_dir,
+                        Path(request.output) if request.output else None,
+                    )
+                    queue.remove(request.id)
+                    outcome = "generated"
+            except Exception as e:
+                result.error = str(e) or type(e).__name__
+                if is_transient(e) and policy.should_retry(request.attempts):
+                    # Wait at least as long as a throttling server asked for
+                    delay = policy.delay(request.attempts, getattr(e, "response", None))
+                    queue.defer(request.id, result.error, delay)
+                    outcome = "deferred"
+                else:
+                    logger.warning(f"Giving up on '{request.url}': {e}")
+                    queue.fail(request.id, result.error)
+                    outcome = "failed"
+
+            getattr(stats, outcome).append(result)
+            if on_result:
+                on_result(request, result, outcome)
+
+    return stats
@@ -0,0 +1,276 @@
+"""
+Offline Wiktionary Dump Ingestion
+
+This module reads a MediaWiki XML dump (``enwiktionary-*-pages-articles.xml``,
+optionally bz2-compressed) in one sequential pass with constant memory. Pages
+with a ``==Finnish==`` section are reduced to the same fields the HTML parser
+extracts (word types, Kotus types, definitions and declension/conjugation data)
+and written to the local EntryStore in batches.
+"""
+
+import bz2
+import logging
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .entries import EntryStore
+from .parser import SUPPORTED_WORD_TYPES
+
+logger = logging.getLogger(__name__)
+
+HEADING_PATTERN = re.compile(r"^(={2,6})\s*(.*?)\s*\1\s*$")
+TEMPLATE_PATTERN = re.compile(r"\{\{([^{}]*)\}\}")
+LINK_PATTERN = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+INFLECTION_TEMPLATE_PATTERN = re.compile(
+    r"\{\{\s*fi-(decl|conj)-([^|}\s]+)([^{}]*)\}\}"
+)
+
+LABEL_TEMPLATES = {"lb", "lbl", "label"}
+QUALIFIER_TEMPLATES = {"q", "qual", "qualifier", "i", "gloss", "gl"}
+LINK_TEMPLATES = {"l", "link", "m", "mention"}
+TEXT_TEMPLATES = {"non-gloss definition", "non-gloss", "n-g", "ngd"}
+
+
+@dataclass
+class IngestStats:
+    """Counters for one dump ingestion run."""
+
+    pages: int = 0
+    entries: int = 0
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_pages(stream) -> Iterator[Tuple[str, Optional[int], str]]:
+    """Yield (title, revision id, wikitext) for every main-namespace page.
+
+    Elements are cleared as soon as a page has been read, so memory use does not
+    grow with the size of the dump.
+    """
+    context = ET.iterparse(stream, events=("start", "end"))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != "end" or _local_name(elem.tag) != "page":
+            continue
+
+        page = {_local_name(child.tag): child.text or "" for child in elem}
+        revision = next((c for c in elem if _local_name(c.tag) == "revision"), None)
+        if revision is not None:
+            page.update(
+                (f"revision_{_local_name(child.tag)}", child.text or "")
+                for child in revision
+            )
+
+        if page.get("ns", "0") == "0":
+            revision_id = page.get("revision_id", "")
+            yield (
+                page.get("title", ""),
+                int(revision_id) if revision_id.isdigit() else None,
+                page.get("revision_text", ""),
+            )
+        root.clear()
+
+
+def finnish_section(wikitext: str) -> Optional[List[str]]:
+    """Return the lines of the ==Finnish== section, or None if there is none."""
+    lines = wikitext.splitlines()
+    start = None
+    for i, line in enumerate(lines):
+        match = HEADING_PATTERN.match(line)
+        if not match or len(match.group(1)) != 2:
+            continue
+        if start is not None:
+            return lines[start:i]
+        if match.group(2) == "Finnish":
+            start = i + 1
+    return lines[start:] if start is not None else None
+
+
+def _render_template(match: re.Match) -> str:
+    parts = [part.strip() for part in match.group(1).split("|")]
+    name, args = parts[0], [arg for arg in parts[1:] if "=" not in arg]
+
+    if name in LABEL_TEMPLATES:
+        labels = [arg for arg in args[1:] if arg and arg not in ("_", "and", "or")]
+        return f"({', '.join(labels)})" if labels else ""
+    if name in QUALIFIER_TEMPLATES:
+        return f"({', '.join(args)})" if args else ""
+    if name in LINK_TEMPLATES:
+        return args[1] if len(args) > 1 else ""
+    if name in TEXT_TEMPLATES:
+        return args[0] if args else ""
+    if name.endswith(" of") and len(args) > 1:
+        # {{inflection of|fi|koira||gen|s}} -> "inflection of koira"
+        return f"{name} {args[1]}"
+    return ""
+
+
+def strip_wikitext(text: str) -> str:
+    """Reduce a line of wikitext to the plain text a reader would see."""
+    text = re.sub(r"<ref[^>]*/>|<ref[^>]*>.*?</ref>", "", text)
+    text = re.sub(r"<[^>]+>", "", text)
+
+    # Expand innermost templates first so nested ones resolve correctly
+    previous = None
+    while previous != text:
+        previous = text
+        text = TEMPLATE_PATTERN.sub(_render_template, text)
+
+    text = LINK_PATTERN.sub(r"\1", text)
+    text = text.replace("'''", "").replace("''", "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _inflection_table(kind: str, kotus_type: str, arguments: str) -> str:
+    args = [arg.strip() for arg in arguments.split("|")[1:] if "=" not in arg]
+    rows = [("Declension" if kind == "decl" else "Conjugation", kotus_type)]
+    if args and args[0]:
+        rows.append(("Stem", args[0]))
+    if len(args) > 2 and args[1]:
+        rows.append(("Gradation", f"{args[1]}-{args[2] or '∅'}"))
+
+    lines = [f"| {rows[0][0]} | {rows[0][1]} |", "| --- | --- |"]
+    lines.extend(f"| {name} | {value} |" for name, value in rows[1:])
+    return "\n".join(lines)
+
+
+def extract_entry(title: str, wikitext: str) -> Optional[Dict[str, Any]]:
+    """Extract the Finnish entry of a page from its wikitext.
+
+    Word types are read from the level 3 headings, or from level 4 headings for
+    pages split into several etymologies, the same way the HTML parser does.
+
+    Args:
+        title: Page title
+        wikitext: Page source
+
+    Returns:
+        Entry dict for EntryStore, or None if the page has no Finnish entry
+    """
+    lines = finnish_section(wikitext)
+    if lines is None:
+        return None
+
+    headings = []
+    for i, line in enumerate(lines):
+        match = HEADING_PATTERN.match(line)
+        if match:
+            headings.append((i, len(match.group(1)), match.group(2)))
+
+    levels = [level for _, level, name in headings if name in SUPPORTED_WORD_TYPES]
+    if not levels:
+        return None
+    pos_level = 3 if 3 in levels else 4
+
+    word_types: Dict[str, Dict[str, Any]] = {}
+    for n, (start, level, name) in enumerate(headings):
+        word_type = name.lower()
+        if level != pos_level or name not in SUPPORTED_WORD_TYPES:
+            continue
+        if word_type in word_types:
+            continue
+
+        # The part of speech runs until the next heading at its level or above
+        end = len(lines)
+        for next_start, next_level, _ in headings[n + 1 :]:
+            if next_level <= level:
+                end = next_start
+                break
+        body = lines[start + 1 : end]
+
+        definitions = [
+            strip_wikitext(line[1:]) for line in body if re.match(r"#(?![*:#])", line)
+        ]
+        inflection = INFLECTION_TEMPLATE_PATTERN.search("\n".join(body))
+        word_types[word_type] = {
+            "definitions": [d for d in definitions if d],
+            "inflection": inflection.groups() if inflection else None,
+        }
+
+    entry = {
+        "word": title,
+        "word_types": list(word_types),
+        "kotus_types": [],
+        "definitions": [],
+        "conjugation_tables": [],
+    }
+    for data in word_types.values():
+        entry["definitions"].append(
+            "\n".join(f"{i+1}. {d}" for i, d in enumerate(data["definitions"]))
+        )
+        # Keep tables aligned with word types; the generator zips them together
+        table = ""
+        if data["inflection"]:
+            kind, kotus_type, arguments = data["inflection"]
+            entry["kotus_types"].append(kotus_type)
+            table = _inflection_table(kind, kotus_type, arguments)
+        entry["conjugation_tables"].append(table)
+    return entry
+
+
+def open_dump(path: Path):
+    """Open a dump for reading, decompressing .bz2 files on the fly."""
+    path = Path(path)
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def ingest_dump(
+    path: Path,
+    store: Optional[EntryStore] = None,
+    batch_size: int = 1000,
+    limit: Optional[int] = None,
+    on_progress: Optional[Callable[[IngestStats], None]] = None,
+) -> IngestStats:
+    """Extract every Finnish entry of a dump into the entry store.
+
+    Args:
+        path: Dump file (.xml or .xml.bz2)
+        store: Entry store to fill. Defaults to the per-user store.
+        batch_size: Entries written per transaction
+        limit: Stop after this many pages
+        on_progress: Called with the running counters after every batch
+
+    Returns:
+        Counters for the run
+    """
+    if store is None:
+        store = EntryStore()
+    stats = IngestStats()
+    pending: List[Dict[str, Any]] = []
+
+    def flush():
+        stats.entries += store.put_many(pending, origin="dump")
+        pending.clear()
+        if on_progress:
+            on_progress(stats)
+
+    with open_dump(path) as stream:
+        for title, revision_id, wikitext in iter_pages(stream):
+            if limit is not None and stats.pages >= limit:
+                break
+            stats.pages += 1
+
+            # Cheap check first; most pages have no Finnish section at all
+            if "==Finnish==" not in wikitext:
+                continue
+
+            entry = extract_entry(title, wikitext)
+            if entry is None:
+                continue
+            entry["revision_id"] = revision_id
+            pending.append(entry)
+
+            if len(pending) >= batch_size:
+                flush()
+
+    flush()
+    logger.info(f"Ingested {stats.entries} entries from {stats.pages} pages")
+    return stats
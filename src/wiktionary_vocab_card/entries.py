@@ -0,0 +1,216 @@
+"""
+Local Entry Store
+
+Pre-extracted Finnish entries (word types, Kotus types, definitions and
+inflection tables) are kept in a local SQLite database keyed by canonical page
+key. Bulk importers such as ``wikt-vocab ingest-dump`` fill it, and
+EntryParser serves entries from it (or from a wiktextract JSONL file) through
+the same interface as WiktionaryParser, so cards can be generated without any
+HTML.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from appdirs import user_data_dir
+
+from .cache import get_result_cache
+from .kaikki import KaikkiSource
+from .keys import canonical_key, canonical_url
+from .parser import WiktionaryParser
+from .result import ParseResult
+
+logger = logging.getLogger(__name__)
+
+ENTRIES_FILE = Path(user_data_dir("wiktionary_vocab_card")) / "entries.sqlite3"
+
+ENTRY_FIELDS = ("word_types", "kotus_types", "definitions", "conjugation_tables")
+
+
+class EntryStore:
+    """SQLite-backed store of extracted entries."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else ENTRIES_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " word TEXT NOT NULL,"
+                " origin TEXT NOT NULL,"
+                " revision_id INTEGER,"
+                " data TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that created them
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            # WAL lets readers in other processes carry on while one writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, url_or_word: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry for a page URL or word, or None."""
+        row = (
+            self._connect()
+            .execute(
+                "SELECT word, origin, revision_id, data FROM entries WHERE key = ?",
+                (str(canonical_key(url_or_word)),),
+            )
+            .fetchone()
+        )
+        return self._to_entry(row) if row else None
+
+    @staticmethod
+    def _to_entry(row) -> Dict[str, Any]:
+        word, origin, revision_id, data = row
+        entry = json.loads(data)
+        entry.update(word=word, origin=origin, revision_id=revision_id)
+        return entry
+
+    def put_many(self, entries: Iterable[Dict[str, Any]], origin: str) -> int:
+        """Insert or replace entries in one transaction.
+
+        Args:
+            entries: Dicts with "word", optional "revision_id" and ENTRY_FIELDS
+            origin: Where the entries came from (e.g. "dump")
+
+        Returns:
+            Number of entries written
+        """
+        rows = [
+            (
+                str(canonical_key(entry["word"])),
+                entry["word"],
+                origin,
+                entry.get("revision_id"),
+                json.dumps({field: entry.get(field, []) for field in ENTRY_FIELDS}),
+            )
+            for entry in entries
+        ]
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """Yield every stored entry."""
+        rows = self._connect().execute(
+            "SELECT word, origin, revision_id, data FROM entries ORDER BY key"
+        )
+        for row in rows:
+            yield self._to_entry(row)
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class EntryParser:
+    """Drop-in for WiktionaryParser that reads a stored entry instead of HTML.
+
+    The store is anything with a get(url) method returning an entry dict, such
+    as EntryStore or KaikkiSource.
+    """
+
+    def __init__(self, url, store=None):
+        self.url = canonical_url(url)
+        self.word = canonical_key(self.url).title
+        self.store = store
+        self.word_types = {}
+        self.kotus_types = []
+        self.definitions = []
+        self.conjugation_tables = []
+        self.revision_id = None
+
+    def parse(self):
+        """Load the entry from the store and return it as a ParseResult"""
+        if self.store is None:
+            self.store = EntryStore()
+
+        entry = self.store.get(self.url)
+        if entry is None:
+            raise LookupError(f"'{self.word}' not found in {self.store.path}")
+
+        self.word_types = dict.fromkeys(entry["word_types"])
+        self.kotus_types = entry["kotus_types"]
+        self.definitions = entry["definitions"]
+        self.conjugation_tables = entry["conjugation_tables"]
+        self.revision_id = entry.get("revision_id")
+        return ParseResult(
+            url=self.url,
+            word=self.word,
+            word_types=tuple(self.word_types),
+            kotus_types=tuple(self.kotus_types),
+            definitions=tuple(self.definitions),
+            tables=tuple(self.conjugation_tables),
+            revision_id=self.revision_id,
+        )
+
+
+_default_store: Optional[EntryStore] = None
+
+
+def get_entry_store(config: Optional[Dict[str, Any]] = None) -> EntryStore:
+    """Get the entry store configured in config.yaml."""
+    global _default_store
+
+    if _default_store is None:
+        store_path = (config or {}).get("extraction", {}).get("store_path")
+        _default_store = EntryStore(store_path or None)
+    return _default_store
+
+
+_kaikki_sources: Dict[str, KaikkiSource] = {}
+
+
+def get_kaikki_source(config: Dict[str, Any]) -> KaikkiSource:
+    """Get the wiktextract JSONL source configured in config.yaml."""
+    path = config.get("extraction", {}).get("kaikki_path")
+    if not path:
+        raise ValueError(
+            "No wiktextract JSONL file configured (extraction.kaikki_path)"
+        )
+    if path not in _kaikki_sources:
+        _kaikki_sources[path] = KaikkiSource(Path(path))
+    return _kaikki_sources[path]
+
+
+def create_parser(
+    url: str,
+    config: Dict[str, Any],
+    source=None,
+    engine: Optional[str] = None,
+):
+    """Create the parser for the configured extraction engine.
+
+    Args:
+        url: Wiktionary URL or word
+        config: Configuration dictionary
+        source: Page source for the HTML engine
+        engine: "html", "store" or "kaikki"; overrides extraction.engine
+
+    Returns:
+        A parser whose parse() returns a ParseResult
+    """
+    extraction = config.get("extraction", {})
+    engine = engine or extraction.get("engine", "html")
+    if engine == "store":
+        return EntryParser(url, get_entry_store(config))
+    if engine == "kaikki":
+        return EntryParser(url, get_kaikki_source(config))
+    return WiktionaryParser(
+        url,
+        source=source,
+        backend=extraction.get("html_parser", "auto"),
+        result_cache=get_result_cache(config),
+    )
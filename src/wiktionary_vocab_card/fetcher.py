@@ -0,0 +1,443 @@
+"""
+HTTP Fetching Module for Wiktionary Pages
+
+This module owns the network side of the parser. Every WiktionaryParser in the
+process shares one pooled requests.Session, so consecutive words reuse the same
+keep-alive connections instead of paying a new TCP+TLS handshake each time.
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from .cache import PageCache, get_page_cache
+from .config import DEFAULT_CONFIG, load_config
+from .keys import SingleFlight, canonical_url
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[requests.Session] = None
+_session_settings: Dict[str, Any] = {}
+_session_lock = threading.Lock()
+
+
+class RateLimiter:
+    """Spaces out requests so each host sees at most `rate` requests per second.
+
+    Slots are handed out under a lock, so concurrent workers queue up behind
+    each other instead of bursting.
+    """
+
+    def __init__(self, rate: float = 0.0):
+        self.rate = rate
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> None:
+        """Block until the next request to host is allowed."""
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + 1.0 / self.rate
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class RetryPolicy:
+    """Decides whether and how long to wait before retrying a request.
+
+    Throttling (429) and transient server errors are retried with full-jitter
+    exponential backoff; a Retry-After header from the server always wins. When
+    the server asks for a longer wait than max_delay, the request is not retried
+    at all, so callers can defer it instead of waiting.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self, max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 60.0
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(
+        self,
+        attempt: int,
+        status: Optional[int] = None,
+        response: Optional[requests.Response] = None,
+    ) -> bool:
+        """Check if a failed attempt (status None for connection errors) is retried."""
+        if attempt >= self.max_retries:
+            return False
+        retry_after = self.retry_after(response)
+        if retry_after is not None and retry_after > self.max_delay:
+            return False
+        return status is None or status in self.RETRY_STATUSES
+
+    @staticmethod
+    def retry_after(response: Optional[requests.Response]) -> Optional[float]:
+        """Seconds requested by a Retry-After header, if present and valid."""
+        if response is None:
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def delay(
+        self, attempt: int, response: Optional[requests.Response] = None
+    ) -> float:
+        """Seconds to wait before retry number attempt + 1."""
+        retry_after = self.retry_after(response)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on the number of requests in flight.
+
+    Every healthy response grows the limit by roughly one per round of requests
+    (additive increase); every throttled response halves it (multiplicative
+    decrease). Workers beyond the current limit wait for a free slot.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(float(self.minimum), self.limit / 2)
+                logger.info(f"Throttled, concurrency limit now {int(self.limit)}")
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for one request; yields a dict whose 'throttled' flag
+        the caller sets before leaving."""
+        self.acquire()
+        outcome = {"throttled": False}
+        try:
+            yield outcome
+        finally:
+            self.release(outcome["throttled"])
+
+
+_rate_limiter = RateLimiter()
+_retry_policy = RetryPolicy()
+_concurrency = AdaptiveConcurrency()
+_page_flights = SingleFlight()
+
+
+def set_rate_limit(rate: float) -> None:
+    """Override the per-host requests-per-second cap (0 disables it)."""
+    get_session()
+    _rate_limiter.rate = rate
+
+
+def set_max_retries(max_retries: int) -> None:
+    """Override how many times a throttled or failed request is retried."""
+    get_session()
+    _retry_policy.max_retries = max_retries
+
+
+def is_transient(error: BaseException) -> bool:
+    """Check if a fetch error may go away later (network down or throttled)."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in RetryPolicy.RETRY_STATUSES
+    return False
+
+
+def get_concurrency() -> AdaptiveConcurrency:
+    """Get the adaptive concurrency controller shared by all fetches."""
+    get_session()
+    return _concurrency
+
+
+def _network_settings(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Return the network section of the configuration merged with defaults."""
+    if config is None:
+        config = load_config()
+    settings = dict(DEFAULT_CONFIG["network"])
+    settings.update(config.get("network", {}) or {})
+    return settings
+
+
+def _build_session(settings: Dict[str, Any]) -> requests.Session:
+    """Create a session with a connection pool and compressed transfer enabled."""
+    session = requests.Session()
+
+    pool_size = int(settings["pool_size"])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    session.headers.update(
+        {
+            "User-Agent": settings["user_agent"],
+            # Advertise every codec urllib3 can decode (gzip, deflate and br/zstd
+            # when the optional packages are installed)
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive",
+        }
+    )
+    return session
+
+
+def get_session(config: Optional[Dict[str, Any]] = None) -> requests.Session:
+    """Get the shared session, creating it on first use.
+
+    Args:
+        config: Optional configuration dictionary. If None, loads from config file.
+
+    Returns:
+        The process-wide requests.Session
+    """
+    global _session, _session_settings, _retry_policy, _concurrency
+
+    with _session_lock:
+        if _session is None:
+            settings = _network_settings(config)
+            _session_settings = settings
+            _session = _build_session(settings)
+            _rate_limiter.rate = float(settings["requests_per_second"])
+            _retry_policy = RetryPolicy(
+                max_retries=int(settings["max_retries"]),
+                base_delay=float(settings["backoff_base"]),
+                max_delay=float(settings["backoff_max"]),
+            )
+            _concurrency = AdaptiveConcurrency(
+                initial=int(settings["initial_concurrency"]),
+                maximum=int(settings["max_concurrency"]),
+            )
+            logger.info("Created shared HTTP session")
+        return _session
+
+
+def get_timeout() -> tuple:
+    """Get the (connect, read) timeout pair of the shared session."""
+    get_session()
+    return (
+        float(_session_settings["connect_timeout"]),
+        float(_session_settings["read_timeout"]),
+    )
+
+
+def reset_session() -> None:
+    """Close the shared session so the next fetch picks up new settings."""
+    global _session, _session_settings
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_settings = {}
+
+
+def fetch(
+    url: str, headers: Optional[Dict[str, str]] = None, stream: bool = False
+) -> requests.Response:
+    """Fetch a URL through the shared session.
+
+    Args:
+        url: URL to fetch
+        headers: Optional extra request headers
+        stream: Defer downloading the body until it is read
+
+    Throttled (429/503) and failed requests are retried according to the retry
+    policy, and the adaptive concurrency limit shrinks while the server is
+    throttling.
+
+    Returns:
+        The response; HTTP errors are raised as requests.HTTPError once retries
+        are exhausted
+    """
+    session = get_session()
+    host = urlsplit(url).netloc
+    attempt = 0
+
+    while True:
+        response = None
+        _rate_limiter.wait(host)
+        with _concurrency.slot() as outcome:
+            try:
+                response = session.get(
+                    url, headers=headers, timeout=get_timeout(), stream=stream
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                outcome["throttled"] = True
+                if not _retry_policy.should_retry(attempt):
+                    raise
+            else:
+                outcome["throttled"] = response.status_code in (429, 503)
+                if not _retry_policy.should_retry(
+                    attempt, response.status_code, response
+                ):
+                    response.raise_for_status()
+                    return response
+                response.close()
+
+        delay = _retry_policy.delay(attempt, response)
+        status = response.status_code if response is not None else "connection error"
+        logger.warning(f"Retrying {url} in {delay:.1f}s after {status}")
+        time.sleep(delay)
+        attempt += 1
+
+
+def read_until(
+    response: requests.Response,
+    should_stop: Callable[[bytes], bool],
+    chunk_size: int = 16 * 1024,
+) -> bytes:
+    """Read a streamed response body until should_stop returns True.
+
+    The connection is closed as soon as reading stops, so the rest of the body
+    is never transferred.
+
+    Args:
+        response: A response requested with stream=True
+        should_stop: Called with every decoded chunk; True ends the download
+        chunk_size: Bytes to read per chunk
+
+    Returns:
+        The bytes read so far, including the chunk that triggered the stop
+    """
+    chunks = []
+    try:
+        for chunk in response.iter_content(chunk_size):
+            chunks.append(chunk)
+            if should_stop(chunk):
+                logger.info(
+                    f"Stopped download early after {sum(map(len, chunks))} bytes"
+                )
+                break
+    finally:
+        response.close()
+    return b"".join(chunks)
+
+
+def _read_body(
+    response: requests.Response, should_stop: Optional[Callable[[bytes], bool]]
+) -> bytes:
+    if should_stop is None:
+        return response.content
+    return read_until(response, should_stop)
+
+
+def fetch_content(
+    url: str,
+    cache: Optional[PageCache] = None,
+    should_stop: Optional[Callable[[bytes], bool]] = None,
+    revalidate: bool = False,
+    max_stale: float = 0.0,
+    on_stale: Optional[Callable[[str], None]] = None,
+) -> bytes:
+    """Fetch a page body, serving and revalidating it through the page cache.
+
+    Fresh cache hits are returned without any network access. Stale entries are
+    revalidated with a conditional GET, so an unchanged page costs a 304 with no
+    body transfer.
+
+    Args:
+        url: URL of the page
+        cache: Page cache to use. Defaults to the cache configured in config.yaml.
+        should_stop: Stream the body and stop once this returns True (see
+            read_until). The truncated body is what gets cached.
+        revalidate: Revalidate cached entries even while they are fresh
+        max_stale: Serve entries up to this many seconds past their TTL without
+            revalidating them
+        on_stale: Called with the URL when a stale entry was served
+
+    Concurrent calls for the same page (in any spelling) through the same
+    cache with the same options share one download; each of them gets its own
+    on_stale call.
+
+    Returns:
+        The page body as bytes
+    """
+    flight_key = (
+        canonical_url(url),
+        id(cache),
+        should_stop is not None,
+        revalidate,
+        max_stale,
+    )
+    body, stale = _page_flights.do(
+        flight_key,
+        lambda: _fetch_content(url, cache, should_stop, revalidate, max_stale),
+    )
+    if stale and on_stale:
+        on_stale(url)
+    return body
+
+
+def _fetch_content(
+    url: str,
+    cache: Optional[PageCache],
+    should_stop: Optional[Callable[[bytes], bool]],
+    revalidate: bool,
+    max_stale: float,
+) -> Tuple[bytes, bool]:
+    """Return the page body and whether it is a stale cached copy."""
+    stream = should_stop is not None
+
+    if cache is None:
+        cache = get_page_cache()
+    if cache is None:
+        return _read_body(fetch(url, stream=stream), should_stop), False
+
+    entry = cache.get(url)
+    if entry and not revalidate and cache.is_fresh(entry):
+        logger.info(f"Page cache hit: {url}")
+        return entry.body, False
+    if entry and not revalidate and entry.age() < cache.ttl + max_stale:
+        logger.info(f"Serving stale page ({entry.age():.0f}s old): {url}")
+        return entry.body, True
+
+    response = fetch(url, headers=entry.validators() if entry else None, stream=stream)
+
+    if entry and response.status_code == 304:
+        logger.info(f"Page not modified, reusing cached copy: {url}")
+        response.close()
+        return cache.refresh(entry, response.headers).body, False
+
+    body = _read_body(response, should_stop)
+    cache.put(url, body, response.headers)
+    return body, False
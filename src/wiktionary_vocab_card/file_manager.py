@@ -9,7 +9,7 @@ field transformation.
 import logging
 import re
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from .config import get_all_stage_directories, is_vault_configured, load_config
 
@@ -69,6 +69,19 @@ class FileManager:
         logger.info(f"No existing wordcard found for '{word}'")
         return None
 
+    def list_wordcards(self) -> List[Tuple[Path, str]]:
+        """List every wordcard across all stage directories.
+
+        Returns:
+            List of (filepath, stage) tuples
+        """
+        wordcards = []
+        for stage, stage_dir in self.stage_directories.items():
+            if stage_dir and stage_dir.exists():
+                for file_path in sorted(stage_dir.glob("*.md")):
+                    wordcards.append((file_path, stage))
+        return wordcards
+
     def parse_existing_wordcard(self, filepath: Path) -> Dict[str, Any]:
         """Extract content from existing markdown wordcard file.
 
@@ -393,6 +406,23 @@ class FileManager:
 
         return target_path, was_moved
 
+    def update_wordcard(self, filepath: Path, new_content: Dict[str, Any]) -> bool:
+        """Replace the Wiktionary-derived sections of a wordcard in place.
+
+        Unlike process_wordcard, the card keeps its stage and its articles; only
+        the word sections, tags and URL are refreshed.
+
+        Args:
+            filepath: Path to the existing wordcard
+            new_content: New wordcard content (from MarkdownGenerator)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        existing_content = self.parse_existing_wordcard(filepath)
+        merged_content = self._merge_wordcard_content(existing_content, new_content)
+        return self.save_wordcard(merged_content, filepath)
+
     def _normalize_filename(self, word: str) -> str:
         """Normalize word for use as filename."""
         # Remove or replace characters that are problematic in filenames
@@ -0,0 +1,210 @@
+"""
+HTML Parser Backends
+
+WiktionaryParser works on a BeautifulSoup-style tree. The tree can be built by
+Python's html.parser (always available), by lxml, or by selectolax's lexbor
+engine. lxml and selectolax are optional; install them with
+``pip install lxml selectolax``.
+
+Backends differ in details that reach the cards: HTML5 parsers such as lexbor
+report the CSS of inline ``<style>`` blocks as text, which BeautifulSoup leaves
+out of get_text(). build_tree() normalizes these differences so every backend
+produces identical cards.
+
+With ``filtered=True`` the BeautifulSoup backends only build the elements the
+parser reads (see SectionStrainer), which saves most of the time and memory
+spent on a page. lexbor builds its whole tree in C, where filtering would not
+pay off.
+"""
+
+import importlib.util
+from typing import Iterator, List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+BACKENDS = ["html.parser", "lxml", "selectolax"]
+
+# Import name of each optional backend
+_MODULES = {"lxml": "lxml", "selectolax": "selectolax"}
+
+# Elements whose text never appears in a card
+_NON_TEXT_TAGS = ["style", "script", "template"]
+
+
+def available_backends() -> List[str]:
+    """The backends that can be used in this environment, in BACKENDS order."""
+    return [
+        name
+        for name in BACKENDS
+        if name not in _MODULES or importlib.util.find_spec(_MODULES[name])
+    ]
+
+
+class SectionStrainer(SoupStrainer):
+    """Only build headings, definition lists and inflection tables.
+
+    Each kept element comes with its whole subtree. Skipped elements are not
+    created, but their descendants are still considered, so the kept elements
+    end up side by side in document order and section boundaries stay intact.
+    """
+
+    HEADINGS = {"h2", "h3", "h4", "h5"}
+
+    def __init__(self):
+        # Name rules make the strainer drop text outside kept elements
+        super().__init__(name=sorted(self.HEADINGS | {"div", "ol", "table"}))
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        if name in self.HEADINGS or name == "ol":
+            return True
+        classes = (attrs or {}).get("class") or ""
+        if isinstance(classes, str):
+            classes = classes.split()
+        if name == "div":
+            return "mw-heading" in classes
+        if name == "table":
+            return "inflection-table" in classes
+        return False
+
+
+class LexborElement:
+    """Element of a selectolax (lexbor) tree with the subset of the
+    BeautifulSoup Tag API that the parser uses."""
+
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, LexborElement) and self.node.mem_id == other.node.mem_id
+        )
+
+    def __hash__(self):
+        return self.node.mem_id
+
+    def __repr__(self):
+        return f"<LexborElement {self.name}>"
+
+    @property
+    def name(self) -> str:
+        return self.node.tag
+
+    def get(self, key: str, default=None):
+        attributes = self.node.attributes
+        if key not in attributes:
+            return default
+        value = attributes[key] or ""
+        # BeautifulSoup splits class into a list
+        return value.split() if key == "class" else value
+
+    def get_text(self) -> str:
+        return self.node.text(deep=True)
+
+    def text_outside(self, name: str, br: str = "") -> str:
+        parts = []
+
+        def walk(node):
+            for child in node.iter(include_text=True):
+                if child.is_text_node:
+                    parts.append(child.text_content)
+                elif child.tag == "br":
+                    parts.append(br)
+                elif child.is_element_node and child.tag != name:
+                    walk(child)
+
+        walk(self.node)
+        return "".join(parts)
+
+    @property
+    def descendants(self) -> Iterator["LexborElement"]:
+        nodes = self.node.traverse()
+        next(nodes)  # the element itself
+        return (LexborElement(node) for node in nodes)
+
+    @property
+    def next_elements(self) -> Iterator["LexborElement"]:
+        """Elements following this one in document order."""
+        nodes = self.node.parser.root.traverse()
+        mem_id = self.node.mem_id
+        for node in nodes:
+            if node.mem_id == mem_id:
+                break
+        return (LexborElement(node) for node in nodes)
+
+    @staticmethod
+    def _matches(element, name, attrs) -> bool:
+        if isinstance(name, str):
+            if element.name != name:
+                return False
+        elif element.name not in name:
+            return False
+        return not attrs or all(element.get(k) == v for k, v in attrs.items())
+
+    def find_all(self, name, attrs=None, recursive: bool = True):
+        if recursive:
+            elements = self.descendants
+        else:
+            elements = (LexborElement(node) for node in self.node.iter())
+        return [e for e in elements if self._matches(e, name, attrs)]
+
+    def find(self, name, attrs=None) -> Optional["LexborElement"]:
+        return next(
+            (e for e in self.descendants if self._matches(e, name, attrs)), None
+        )
+
+
+def text_outside(element, name: str, br: str = "") -> str:
+    """get_text() of element, leaving out the subtrees of name elements nested
+    in it (e.g. possessive tables inside an inflection table cell).
+
+    br is put where line breaks are.
+    """
+    if isinstance(element, LexborElement):
+        return element.text_outside(name, br)
+
+    # The string types get_text() would include, e.g. not comments or CSS
+    types = element.interesting_string_types
+
+    def walk(tag):
+        for child in tag.children:
+            if child.name is None:
+                if type(child) in types:
+                    yield child
+            elif child.name == "br":
+                yield br
+            elif child.name != name:
+                yield from walk(child)
+
+    return "".join(walk(element))
+
+
+def build_tree(
+    content: bytes,
+    backend: str,
+    from_encoding: Optional[str] = None,
+    filtered: bool = False,
+):
+    """Build a normalized tree of content with the given backend.
+
+    With filtered, BeautifulSoup backends build only what SectionStrainer keeps.
+
+    Returns a BeautifulSoup object, or for selectolax a LexborElement for the
+    document root, which offers the same find/get_text interface.
+    """
+    if backend == "selectolax":
+        from selectolax.lexbor import LexborHTMLParser
+
+        if from_encoding:
+            content = content.decode(from_encoding, errors="replace")
+        tree = LexborHTMLParser(content)
+        tree.strip_tags(_NON_TEXT_TAGS)
+        return LexborElement(tree.root)
+
+    return BeautifulSoup(
+        content,
+        backend,
+        from_encoding=from_encoding,
+        parse_only=SectionStrainer() if filtered else None,
+    )
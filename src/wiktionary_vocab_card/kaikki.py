@@ -0,0 +1,251 @@
+"""
+Wiktextract (kaikki.org) JSONL Engine
+
+kaikki.org publishes Wiktionary already extracted by wiktextract: one JSON
+object per word and part of speech, one per line. This module reads such a
+file for Finnish line by line and turns the records of a word into the same
+entry structure the HTML parser produces. An optional SQLite index of line
+offsets (``wikt-vocab index-kaikki``) makes lookups a seek instead of a scan.
+"""
+
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .keys import canonical_key
+from .parser import SUPPORTED_WORD_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Tags that mark bookkeeping rows in "forms" rather than inflected forms
+META_FORM_TAGS = {"table-tags", "inflection-template", "class"}
+NUMBER_COLUMNS = ("singular", "plural")
+# wiktextract part-of-speech codes whose heading is not the code capitalized
+POS_HEADINGS = {
+    "adj": "Adjective",
+    "adv": "Adverb",
+    "pron": "Pronoun",
+    "prep": "Preposition",
+    "postp": "Postposition",
+    "conj": "Conjunction",
+    "num": "Numeral",
+}
+
+
+def _open(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _is_finnish(record: Dict[str, Any]) -> bool:
+    return record.get("lang_code", "fi") == "fi"
+
+
+def iter_records(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (byte offset, record) for every Finnish record in a JSONL file."""
+    offset = 0
+    with _open(Path(path)) as f:
+        for line in f:
+            start, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed line at offset {start}")
+                continue
+            if _is_finnish(record):
+                yield start, record
+
+
+def _kotus_type(record: Dict[str, Any]) -> Optional[str]:
+    for template in record.get("inflection_templates", []):
+        name = template.get("name", "")
+        if name.startswith(("fi-decl-", "fi-conj-")):
+            return name.split("-", 2)[2]
+    for form in record.get("forms", []):
+        if "class" in form.get("tags", []):
+            # "8/hame" -> "hame", like the Kotus type in the HTML table header
+            return form.get("form", "").split("/")[-1] or None
+    return None
+
+
+def _definitions(record: Dict[str, Any]) -> str:
+    glosses = []
+    for sense in record.get("senses", []):
+        # Sub-senses repeat their parent's gloss first; keep the most specific
+        gloss = (sense.get("raw_glosses") or sense.get("glosses") or [None])[-1]
+        if gloss:
+            glosses.append(gloss)
+    return "\n".join(f"{i+1}. {gloss}" for i, gloss in enumerate(glosses))
+
+
+def _inflection_table(record: Dict[str, Any]) -> str:
+    forms = [
+        form
+        for form in record.get("forms", [])
+        if form.get("source") in ("declension", "conjugation", "inflection")
+        and form.get("form")
+        and not META_FORM_TAGS & set(form.get("tags", []))
+    ]
+    if not forms:
+        return ""
+
+    # Nouns and adjectives pivot into case x number; other forms are listed
+    if all(len(set(NUMBER_COLUMNS) & set(form.get("tags", []))) == 1 for form in forms):
+        rows: Dict[str, Dict[str, List[str]]] = {}
+        for form in forms:
+            tags = form.get("tags", [])
+            number = next(tag for tag in tags if tag in NUMBER_COLUMNS)
+            label = " ".join(tag for tag in tags if tag not in NUMBER_COLUMNS)
+            rows.setdefault(label, {}).setdefault(number, []).append(form["form"])
+
+        lines = ["| | singular | plural |", "| --- | --- | --- |"]
+        for label, numbers in rows.items():
+            cells = [", ".join(numbers.get(number, [])) for number in NUMBER_COLUMNS]
+            lines.append(f"| {label} | {' | '.join(cells)} |")
+        return "\n".join(lines)
+
+    lines = ["| form | tags |", "| --- | --- |"]
+    for form in forms:
+        lines.append(f"| {form['form']} | {' '.join(form.get('tags', []))} |")
+    return "\n".join(lines)
+
+
+def _word_type(record: Dict[str, Any]) -> Optional[str]:
+    """The word type as the HTML engine names it ("adjective"), or None for
+    parts of speech it skips (e.g. "name" for proper nouns)."""
+    pos = record.get("pos", "").lower()
+    heading = POS_HEADINGS.get(pos, pos.capitalize())
+    return heading.lower() if heading in SUPPORTED_WORD_TYPES else None
+
+
+def entry_from_records(word: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge the per part-of-speech records of a word into one entry."""
+    entry = {
+        "word": word,
+        "word_types": [],
+        "kotus_types": [],
+        "definitions": [],
+        "conjugation_tables": [],
+        "revision_id": None,
+    }
+    for record in records:
+        word_type = _word_type(record)
+        if not word_type or word_type in entry["word_types"]:
+            continue
+        entry["word_types"].append(word_type)
+        entry["definitions"].append(_definitions(record))
+        entry["conjugation_tables"].append(_inflection_table(record))
+        kotus_type = _kotus_type(record)
+        if kotus_type:
+            entry["kotus_types"].append(kotus_type)
+    return entry
+
+
+class KaikkiSource:
+    """Looks up entries in a wiktextract JSONL file, using its index if present."""
+
+    def __init__(self, path: Path, index_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.index_path = Path(index_path) if index_path else self.default_index_path
+        self._index: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def default_index_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".idx")
+
+    def _signature(self) -> str:
+        stat = self.path.stat()
+        return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+    def _open_index(self) -> Optional[sqlite3.Connection]:
+        if self._index is not None:
+            return self._index
+        if self.path.suffix == ".gz" or not self.index_path.exists():
+            return None
+
+        connection = sqlite3.connect(self.index_path, check_same_thread=False)
+        row = connection.execute(
+            "SELECT value FROM meta WHERE name = 'signature'"
+        ).fetchone()
+        if row is None or row[0] != self._signature():
+            logger.warning(f"Ignoring stale index {self.index_path}; rebuild it")
+            connection.close()
+            return None
+
+        self._index = connection
+        return connection
+
+    def build_index(self) -> int:
+        """Record the byte offset of every Finnish record, keyed by page.
+
+        Returns:
+            Number of records indexed
+        """
+        if self.path.suffix == ".gz":
+            raise ValueError("Decompress the file first; offsets need random access")
+
+        # Build beside the live index and rename, so readers never see half of it
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp_path.unlink(missing_ok=True)
+        connection = sqlite3.connect(tmp_path)
+        count = 0
+        with connection:
+            connection.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+            connection.execute("CREATE TABLE offsets (key TEXT, offset INTEGER)")
+            for offset, record in iter_records(self.path):
+                key = str(canonical_key(record.get("word", "")))
+                connection.execute("INSERT INTO offsets VALUES (?, ?)", (key, offset))
+                count += 1
+            connection.execute("CREATE INDEX offsets_key ON offsets (key)")
+            connection.execute(
+                "INSERT INTO meta VALUES ('signature', ?)", (self._signature(),)
+            )
+        connection.close()
+        os.replace(tmp_path, self.index_path)
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+            self._index = None
+        return count
+
+    def _records(self, key: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            index = self._open_index()
+        if index is None:
+            # No usable index: stream the whole file once
+            return [
+                record
+                for _, record in iter_records(self.path)
+                if str(canonical_key(record.get("word", ""))) == key
+            ]
+
+        with self._lock:
+            offsets = [
+                row[0]
+                for row in index.execute(
+                    "SELECT offset FROM offsets WHERE key = ? ORDER BY offset", (key,)
+                )
+            ]
+        records = []
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                records.append(json.loads(f.readline()))
+        return records
+
+    def get(self, url_or_word: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for a page URL or word, or None if it is not listed."""
+        key = canonical_key(url_or_word)
+        records = self._records(str(key))
+        if not records:
+            return None
+        return entry_from_records(key.title, records)
@@ -0,0 +1,129 @@
+"""
+Canonical Page Keys and Request Coalescing
+
+Wiktionary pages can be spelled many ways: with or without ``#Finnish``,
+percent-encoded or raw (``yski%C3%A4`` / ``yskiä``), with underscores or
+spaces, on the desktop or mobile host, or as a bare word. This module maps all
+of them to one PageKey so caches and in-flight requests are shared, and
+provides SingleFlight to coalesce concurrent work on the same key.
+"""
+
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+DEFAULT_SITE = "en.wiktionary.org"
+
+
+@dataclass(frozen=True)
+class PageKey:
+    """Normalized identity of a wiki page."""
+
+    site: str
+    title: str
+    scheme: str = "https"
+
+    @property
+    def url(self) -> str:
+        """The canonical URL of the page."""
+        return f"{self.scheme}://{self.site}/wiki/{quote(self.title.replace(' ', '_'), safe='/:')}"
+
+    def __str__(self) -> str:
+        return f"{self.site}/{self.title}"
+
+
+def normalize_title(title: str) -> str:
+    """Decode, NFC-normalize and unify underscores/spaces in a page title."""
+    title = unquote(title).replace("_", " ")
+    title = re.sub(r"\s+", " ", title).strip()
+    return unicodedata.normalize("NFC", title)
+
+
+def _normalize_site(netloc: str) -> str:
+    site = netloc.lower()
+    if site.startswith("www."):
+        site = site[4:]
+    # Mobile hosts serve the same pages: en.m.wiktionary.org -> en.wiktionary.org
+    return re.sub(r"^([a-z-]+)\.m\.(wiktionary\.org)$", r"\1.\2", site)
+
+
+def canonical_key(url_or_word: str, default_site: str = DEFAULT_SITE) -> PageKey:
+    """Map a page URL or a bare word to its canonical PageKey.
+
+    Args:
+        url_or_word: A wiki URL (/wiki/<title> or index.php?title=<title>) or a word
+        default_site: Site used for bare words
+
+    Returns:
+        The PageKey identifying the page
+    """
+    value = url_or_word.strip()
+    if not value.startswith(("http://", "https://")):
+        return PageKey(site=default_site, title=normalize_title(value.split("#")[0]))
+
+    parts = urlsplit(value)
+    site = _normalize_site(parts.netloc)
+    scheme = "https" if site.endswith("wiktionary.org") else parts.scheme
+
+    if "/wiki/" in parts.path:
+        title = parts.path.split("/wiki/", 1)[1]
+    else:
+        title = parse_qs(parts.query).get("title", [""])[0]
+
+    return PageKey(site=site, title=normalize_title(title), scheme=scheme)
+
+
+def canonical_url(url_or_word: str) -> str:
+    """Canonical URL for a page URL or word; other URLs only lose their fragment."""
+    value = url_or_word.strip()
+    if value.startswith(("http://", "https://")):
+        parts = urlsplit(value)
+        if "/wiki/" not in parts.path and "title=" not in parts.query:
+            return value.split("#")[0]
+    return canonical_key(value).url
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, _Call] = {}
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,768 @@
+"""
+Packed Append-Only Store
+
+Values are appended, compressed, to a few large segment files instead of one
+file per entry. A fixed-size open-addressing hash table in ``index.bin`` maps
+each key to (segment, offset, length) plus access statistics; it is
+memory-mapped, so a lookup touches only the index slots it probes and then does
+one seek and one read in a segment. Overwritten, deleted and evicted records
+become dead space, which a background compaction reclaims once it passes a
+threshold.
+
+The compression codec is picked by benchmarking the stdlib codecs on the first
+value written, unless one is configured. Several processes may read and write
+the same store at once; see PackedStore for how they coordinate.
+"""
+
+import hashlib
+import logging
+import lzma
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .utils import file_lock, lock_file, unlock_file
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"WVIDX003"
+Header = namedtuple(
+    "Header",
+    "magic capacity used count live_bytes dead_bytes raw_bytes "
+    "hits misses evictions codec active retired",
+)
+INDEX_HEADER = struct.Struct("<8s12Q")
+# segment is 0 for an empty slot and DELETED for a tombstone
+Slot = namedtuple("Slot", "fp segment length offset raw_length atime hits")
+INDEX_SLOT = struct.Struct("<16sIIQIII4x")
+RECORD_MAGIC = b"WVP3"
+# magic, codec id, key length, stored value length, CRC-32 of key and value
+RECORD_HEADER = struct.Struct("<4sBHII")
+
+EMPTY = 0
+DELETED = 0xFFFFFFFF
+INITIAL_CAPACITY = 1024
+MAX_LOAD = 0.7
+
+
+@dataclass(frozen=True)
+class Codec:
+    """A stdlib compression codec as stored in record headers."""
+
+    id: int
+    name: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+CODECS = {
+    codec.name: codec
+    for codec in (
+        Codec(1, "zlib", lambda data: zlib.compress(data, 6), zlib.decompress),
+        Codec(2, "lzma", lambda data: lzma.compress(data, preset=6), lzma.decompress),
+        Codec(3, "none", bytes, bytes),
+    )
+}
+CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+
+# Values are decompressed on every hit and compressed once per write; a codec
+# must stay well below network latency on both paths to be picked
+MAX_COMPRESS_SECONDS_PER_MB = 0.5
+MAX_DECOMPRESS_SECONDS_PER_MB = 0.05
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+@dataclass
+class CodecResult:
+    """Benchmark result of one codec on sample data."""
+
+    name: str
+    ratio: float
+    compress_seconds_per_mb: float
+    decompress_seconds_per_mb: float
+
+
+def benchmark_codecs(samples: List[bytes]) -> List[CodecResult]:
+    """Measure compression ratio and speed of every codec on samples."""
+    size = max(sum(len(sample) for sample in samples), 1)
+    results = []
+    for codec in CODECS.values():
+        start = time.perf_counter()
+        packed = [codec.compress(sample) for sample in samples]
+        compress_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for data in packed:
+            codec.decompress(data)
+        decompress_seconds = time.perf_counter() - start
+
+        results.append(
+            CodecResult(
+                name=codec.name,
+                ratio=sum(len(data) for data in packed) / size,
+                compress_seconds_per_mb=compress_seconds * 1e6 / size,
+                decompress_seconds_per_mb=decompress_seconds * 1e6 / size,
+            )
+        )
+    return results
+
+
+def pick_codec(results: List[CodecResult]) -> str:
+    """The best-compressing codec that is fast enough on both paths."""
+    usable = [
+        result
+        for result in results
+        if result.compress_seconds_per_mb <= MAX_COMPRESS_SECONDS_PER_MB
+        and result.decompress_seconds_per_mb <= MAX_DECOMPRESS_SECONDS_PER_MB
+    ]
+    return min(usable or results, key=lambda result: result.ratio).name
+
+
+def _fingerprint(key: str) -> bytes:
+    return hashlib.sha256(key.encode("utf-8")).digest()[:16]
+
+
+def _slot_offset(i: int) -> int:
+    return INDEX_HEADER.size + i * INDEX_SLOT.size
+
+
+def _valid_header(header: Header) -> bool:
+    return header.magic == INDEX_MAGIC and header.capacity > 0
+
+
+def _empty_header(capacity: int) -> Header:
+    return Header(INDEX_MAGIC, capacity, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0)
+
+
+class PackedStore:
+    """Key/value store of compressed values in append-only segment files.
+
+    The store is meant for caches: an index in an older format is discarded
+    together with its segments.
+
+    Several processes can share a store. Writers take an advisory lock on the
+    ``lock`` file; readers never do. A record is appended in full before the
+    index slot pointing at it is written, and carries a checksum, so a reader
+    racing a writer, or a writer that crashed half way, yields a miss rather
+    than a torn value. A replaced index file is published by renaming it into
+    place and flagging the old one as retired, which tells other processes to
+    map the new file; one whose header does not validate reads as empty until
+    the write lock re-syncs it. Hit, miss and access-time bookkeeping from reads is kept
+    in memory and written back whenever the lock is free.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_size: int = 64 * 1024 * 1024,
+        compact_threshold: float = 0.5,
+        compact_min_bytes: int = 1024 * 1024,
+        compression: str = "auto",
+    ):
+        """Initialize PackedStore.
+
+        Args:
+            directory: Where the index and segment files live
+            segment_size: Start a new segment once the active one exceeds this
+            compact_threshold: Fraction of dead bytes that triggers compaction
+            compact_min_bytes: Never compact for less dead space than this
+            compression: Codec name, or "auto" to benchmark on the first write
+        """
+        if compression != "auto" and compression not in CODECS:
+            raise ValueError(f"Unknown compression codec: {compression}")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / "index.bin"
+        self.segment_size = segment_size
+        self.compact_threshold = compact_threshold
+        self.compact_min_bytes = compact_min_bytes
+        self.compression = compression
+
+        # _lock guards the mapping within this process; _write_lock and the
+        # lock file make one thread of one process the writer
+        self._lock = threading.RLock()
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._lock_file = open(self.directory / "lock", "a+b")
+        self._compactor: Optional[threading.Thread] = None
+        self._index_file = None
+        self._index: Optional[mmap.mmap] = None
+        self._pending_hits = 0
+        self._pending_misses = 0
+        self._pending_touches: Dict[bytes, Tuple[int, int]] = {}
+        with self._exclusive():
+            pass
+
+    # Locking ---------------------------------------------------------------
+
+    @contextmanager
+    def _exclusive(self, blocking: bool = True) -> Iterator[bool]:
+        """Hold the write lock across threads and processes.
+
+        Yields whether it is held, which is only False when blocking is False
+        and another writer holds it. On entry the mapping is brought up to date
+        with the index file on disk.
+        """
+        if not self._write_lock.acquire(blocking):
+            yield False
+            return
+        try:
+            if self._write_depth == 0 and not lock_file(self._lock_file, blocking):
+                yield False
+                return
+            self._write_depth += 1
+            try:
+                with self._lock:
+                    if self._write_depth == 1:
+                        self._sync_index()
+                    yield True
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    unlock_file(self._lock_file)
+        finally:
+            self._write_lock.release()
+
+    def _record_access(self, fp: bytes, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._pending_hits += 1
+                _, hits = self._pending_touches.get(fp, (0, 0))
+                self._pending_touches[fp] = (int(time.time()), hits + 1)
+            else:
+                self._pending_misses += 1
+        with self._exclusive(blocking=False) as held:
+            if held:
+                self._flush_accesses()
+
+    def _flush_accesses(self) -> None:
+        """Write pending read bookkeeping to the index; needs the write lock."""
+        if not (self._pending_hits or self._pending_misses):
+            return
+        for fp, (atime, hits) in self._pending_touches.items():
+            i, _ = self._find(fp)
+            if i is not None:
+                slot = self._slot(i)
+                self._set_slot(
+                    i,
+                    slot._replace(atime=max(slot.atime, atime), hits=slot.hits + hits),
+                )
+        header = self._header()
+        self._update_header(
+            hits=header.hits + self._pending_hits,
+            misses=header.misses + self._pending_misses,
+        )
+        self._pending_hits = self._pending_misses = 0
+        self._pending_touches.clear()
+
+    # Index -----------------------------------------------------------------
+
+    def _publish_index(self, header: Header, slots: List[Slot] = ()) -> None:
+        """Atomically replace the index file with one holding header and slots."""
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w+b") as f:
+            f.write(INDEX_HEADER.pack(*header))
+            f.truncate(INDEX_HEADER.size + header.capacity * INDEX_SLOT.size)
+            if slots:
+                with mmap.mmap(f.fileno(), 0) as index:
+                    for slot in slots:
+                        i = int.from_bytes(slot.fp[:8], "little") % header.capacity
+                        while INDEX_SLOT.unpack_from(index, _slot_offset(i))[1]:
+                            i = (i + 1) % header.capacity
+                        INDEX_SLOT.pack_into(index, _slot_offset(i), *slot)
+                    index.flush()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        if self._index is not None:
+            # Readers in other processes check this flag and map the new file
+            self._update_header(retired=1)
+        self._map_index()
+
+    def _map_index(self) -> None:
+        """Map the index file; raises ValueError if it has no valid header."""
+        index_file = open(self.index_path, "r+b")
+        try:
+            index = mmap.mmap(index_file.fileno(), 0)
+        except ValueError:
+            index_file.close()
+            raise ValueError(f"Empty index file in {self}") from None
+        if not _valid_header(Header(*INDEX_HEADER.unpack_from(index, 0))):
+            index.close()
+            index_file.close()
+            raise ValueError(f"Invalid index header in {self}")
+        self._close_index()
+        self._index_file = index_file
+        self._index = index
+
+    def _index_replaced(self) -> bool:
+        try:
+            current = os.stat(self.index_path).st_ino
+        except FileNotFoundError:
+            return True
+        return current != os.fstat(self._index_file.fileno()).st_ino
+
+    def _sync_index(self) -> None:
+        """Map the current index file, creating it if needed; needs the write lock."""
+        if self._index is not None:
+            header = self._header()
+            if _valid_header(header) and not (header.retired or self._index_replaced()):
+                return
+            self._close_index()
+
+        if self.index_path.exists():
+            with open(self.index_path, "rb") as f:
+                magic = f.read(len(INDEX_MAGIC))
+            if magic != INDEX_MAGIC:
+                logger.warning(f"Discarding packed store in an old format: {self}")
+                self._remove_files()
+        if self.index_path.exists():
+            try:
+                self._map_index()
+            except ValueError as e:
+                logger.warning(f"Discarding packed store with a damaged index: {e}")
+                self._remove_files()
+        if self._index is None:
+            self._publish_index(_empty_header(INITIAL_CAPACITY))
+
+    def _remap_if_retired(self) -> bool:
+        """Follow an index replaced by another process; needs self._lock.
+
+        Returns False if the index has no valid header, in which case the
+        caller must not look anything up in it and should re-sync under the
+        write lock instead.
+        """
+        if self._header().retired:
+            try:
+                self._map_index()
+            except FileNotFoundError:
+                # Being recreated by clear(); keep the old mapping meanwhile
+                pass
+            except ValueError as e:
+                logger.warning(f"Unreadable packed store index: {e}")
+                return False
+        return _valid_header(self._header())
+
+    def _close_index(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index_file.close()
+            self._index = self._index_file = None
+
+    def _remove_files(self) -> None:
+        for segment in self._segments():
+            self._segment_path(segment).unlink(missing_ok=True)
+        self.index_path.unlink(missing_ok=True)
+
+    def _header(self) -> Header:
+        return Header(*INDEX_HEADER.unpack_from(self._index, 0))
+
+    def _update_header(self, **changes) -> None:
+        # Not pack_into: it zeroes the bytes before filling them in, and readers
+        # in other processes would see the capacity drop to 0 in between
+        header = self._header()._replace(**changes)
+        self._index[: INDEX_HEADER.size] = INDEX_HEADER.pack(*header)
+
+    def _slot(self, i: int) -> Slot:
+        return Slot(*INDEX_SLOT.unpack_from(self._index, _slot_offset(i)))
+
+    def _set_slot(self, i: int, slot: Slot) -> None:
+        offset = _slot_offset(i)
+        self._index[offset : offset + INDEX_SLOT.size] = INDEX_SLOT.pack(*slot)
+
+    def _find(self, fp: bytes) -> Tuple[Optional[int], int]:
+        """Return (slot holding fp or None, first free slot on the probe path)."""
+        capacity = self._header().capacity
+        i = int.from_bytes(fp[:8], "little") % capacity
+        free = None
+        for _ in range(capacity):
+            slot = self._slot(i)
+            if slot.segment == EMPTY:
+                return None, i if free is None else free
+            if slot.segment == DELETED:
+                if free is None:
+                    free = i
+            elif slot.fp == fp:
+                return i, i
+            i = (i + 1) % capacity
+        return None, free
+
+    def _live_slots(self) -> List[Tuple[int, Slot]]:
+        slots = (self._slot(i) for i in range(self._header().capacity))
+        return [
+            (i, slot)
+            for i, slot in enumerate(slots)
+            if slot.segment not in (EMPTY, DELETED)
+        ]
+
+    def _grow(self) -> None:
+        header = self._header()
+        # Mostly tombstones: rebuild at the same size; otherwise double
+        capacity = header.capacity
+        if header.count >= capacity * MAX_LOAD / 2:
+            capacity *= 2
+        slots = [slot for _, slot in self._live_slots()]
+        self._publish_index(
+            header._replace(capacity=capacity, used=len(slots), retired=0), slots
+        )
+
+    def _remove_slot(self, i: int) -> Slot:
+        slot = self._slot(i)
+        header = self._header()
+        self._set_slot(i, slot._replace(segment=DELETED, length=0, offset=0))
+        self._update_header(
+            count=header.count - 1,
+            live_bytes=header.live_bytes - slot.length,
+            dead_bytes=header.dead_bytes + slot.length,
+            raw_bytes=header.raw_bytes - slot.raw_length,
+        )
+        return slot
+
+    # Segments --------------------------------------------------------------
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"{number:06d}.seg"
+
+    def _segments(self) -> List[int]:
+        return sorted(int(path.stem) for path in self.directory.glob("*.seg"))
+
+    def _append(self, record: bytes) -> Tuple[int, int]:
+        """Append a record to the active segment; returns (segment, offset)."""
+        active = self._header().active
+        path = self._segment_path(active)
+        if path.exists() and path.stat().st_size >= self.segment_size:
+            active += 1
+            self._update_header(active=active)
+            path = self._segment_path(active)
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(record)
+        return active, offset
+
+    def _read(self, slot: Slot) -> Tuple[str, bytes]:
+        with open(self._segment_path(slot.segment), "rb") as f:
+            f.seek(slot.offset)
+            record = f.read(slot.length)
+        if len(record) < RECORD_HEADER.size:
+            raise ValueError(f"Truncated record in segment {slot.segment}")
+        magic, codec_id, key_length, _, checksum = RECORD_HEADER.unpack_from(record)
+        start = RECORD_HEADER.size
+        if (
+            magic != RECORD_MAGIC
+            or len(record) != slot.length
+            or zlib.crc32(memoryview(record)[start:]) != checksum
+        ):
+            raise ValueError(f"Corrupt record in segment {slot.segment}")
+        key = record[start : start + key_length].decode("utf-8")
+        value = CODECS_BY_ID[codec_id].decompress(record[start + key_length :])
+        return key, value
+
+    def _codec(self, value: bytes) -> Codec:
+        if self.compression != "auto":
+            return CODECS[self.compression]
+        with self._lock:
+            codec_id = self._header().codec
+        if codec_id:
+            return CODECS_BY_ID[codec_id]
+        # Benchmark once per store, on real data; put() remembers the choice
+        return CODECS[pick_codec(benchmark_codecs([value]))]
+
+    @staticmethod
+    def _record(key: str, value: bytes, codec: Codec) -> bytes:
+        key_bytes = key.encode("utf-8")
+        payload = key_bytes + codec.compress(value)
+        header = RECORD_HEADER.pack(
+            RECORD_MAGIC,
+            codec.id,
+            len(key_bytes),
+            len(payload) - len(key_bytes),
+            zlib.crc32(payload),
+        )
+        return header + payload
+
+    # Public API ------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value stored for key, or None. Counts a hit or a miss."""
+        fp = _fingerprint(key)
+        value = None
+        for _ in range(2):
+            with self._lock:
+                mapped = self._remap_if_retired()
+                if mapped:
+                    i, _ = self._find(fp)
+                    slot = self._slot(i) if i is not None else None
+            if not mapped:
+                # A miss; the write lock re-maps the index or discards it
+                with self._exclusive():
+                    pass
+                break
+            if slot is None:
+                break
+            try:
+                stored_key, value = self._read(slot)
+            except FileNotFoundError:
+                # Compaction moved the record between lookup and read; look again
+                continue
+            except (ValueError, KeyError, zlib.error, lzma.LZMAError) as e:
+                # A record still being written by another process, or torn by a crash
+                logger.warning(f"Unreadable record for {key}: {e}")
+            else:
+                if stored_key != key:
+                    value = None
+            break
+
+        self._record_access(fp, hit=value is not None)
+        return value
+
+    def contains(self, key: str) -> bool:
+        """Whether key is stored; unlike get() it counts neither a hit nor a miss."""
+        with self._lock:
+            if not self._remap_if_retired():
+                return False
+            i, _ = self._find(_fingerprint(key))
+        return i is not None
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store value under key, replacing any previous value."""
+        fp = _fingerprint(key)
+        # Compress before taking the lock; it is the slow part of a write
+        codec = self._codec(value)
+        record = self._record(key, value, codec)
+        with self._exclusive():
+            header = self._header()
+            if header.codec != codec.id and (
+                self.compression != "auto" or not header.codec
+            ):
+                self._update_header(codec=codec.id)
+                logger.info(f"Packed store compression: {codec.name}")
+            if header.used + 1 > header.capacity * MAX_LOAD:
+                self._grow()
+
+            segment, offset = self._append(record)
+
+            i, free = self._find(fp)
+            hits = 0
+            if i is not None:
+                # Replacing keeps the access count, so LFU sees the key's history
+                hits = self._remove_slot(i).hits
+            else:
+                i = free
+            header = self._header()
+            used = header.used + (self._slot(i).segment == EMPTY)
+            now = int(time.time())
+            self._set_slot(
+                i, Slot(fp, segment, len(record), offset, len(value), now, hits)
+            )
+            self._update_header(
+                used=used,
+                count=header.count + 1,
+                live_bytes=header.live_bytes + len(record),
+                raw_bytes=header.raw_bytes + len(value),
+            )
+
+        self.maybe_compact()
+
+    def delete(self, key: str) -> bool:
+        """Remove key; returns False if it was not stored."""
+        with self._exclusive():
+            i, _ = self._find(_fingerprint(key))
+            if i is None:
+                return False
+            self._remove_slot(i)
+        self.maybe_compact()
+        return True
+
+    def evict(self, max_bytes: int, policy: str = "lru") -> int:
+        """Drop records until the stored data fits in max_bytes.
+
+        Args:
+            max_bytes: Budget for stored (compressed) record bytes
+            policy: "lru" drops the least recently used records first, "lfu"
+                the least frequently used (ties broken by recency)
+
+        Returns:
+            Number of records evicted
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+
+        evicted = 0
+        with self._exclusive():
+            if self._header().live_bytes <= max_bytes:
+                return 0
+            self._flush_accesses()
+
+            def order(item):
+                slot = item[1]
+                if policy == "lfu":
+                    return (slot.hits, slot.atime, slot.segment, slot.offset)
+                return (slot.atime, slot.segment, slot.offset)
+
+            for i, _ in sorted(self._live_slots(), key=order):
+                if self._header().live_bytes <= max_bytes:
+                    break
+                self._remove_slot(i)
+                evicted += 1
+            self._update_header(evictions=self._header().evictions + evicted)
+
+        logger.info(f"Evicted {evicted} records from {self}")
+        self.maybe_compact()
+        return evicted
+
+    def _slots_in_write_order(self) -> List[Slot]:
+        with self._lock:
+            self._remap_if_retired()
+            slots = [slot for _, slot in self._live_slots()]
+        return sorted(slots, key=lambda slot: (slot.segment, slot.offset))
+
+    def items(self) -> Iterator[Tuple[str, bytes]]:
+        """Yield (key, value) for every readable record, oldest write first."""
+        for slot in self._slots_in_write_order():
+            try:
+                record = self._read(slot)
+            except FileNotFoundError:
+                continue
+            except (ValueError, KeyError, zlib.error, lzma.LZMAError) as e:
+                logger.warning(f"Skipping unreadable record in {self}: {e}")
+                continue
+            yield record
+
+    def stats(self) -> Dict[str, object]:
+        """Counters and sizes; they live in the index, so they span processes."""
+        with self._exclusive(blocking=False) as held:
+            if held:
+                self._flush_accesses()
+        with self._lock:
+            self._remap_if_retired()
+            header = self._header()
+            hits = header.hits + self._pending_hits
+            misses = header.misses + self._pending_misses
+        codec = CODECS_BY_ID.get(header.codec)
+        return {
+            "entries": header.count,
+            "stored_bytes": header.live_bytes,
+            "raw_bytes": header.raw_bytes,
+            "bytes_saved": header.raw_bytes - header.live_bytes,
+            "dead_bytes": header.dead_bytes,
+            "hits": hits,
+            "misses": misses,
+            "evictions": header.evictions,
+            "codec": codec.name if codec else self.compression,
+        }
+
+    def _current_header(self) -> Header:
+        with self._lock:
+            self._remap_if_retired()
+            return self._header()
+
+    @property
+    def count(self) -> int:
+        return self._current_header().count
+
+    @property
+    def live_bytes(self) -> int:
+        return self._current_header().live_bytes
+
+    @property
+    def dead_bytes(self) -> int:
+        return self._current_header().dead_bytes
+
+    def needs_compaction(self) -> bool:
+        header = self._current_header()
+        total = header.dead_bytes + header.live_bytes
+        return (
+            header.dead_bytes >= self.compact_min_bytes
+            and header.dead_bytes > total * self.compact_threshold
+        )
+
+    def maybe_compact(self) -> None:
+        """Start a background compaction if dead space passed the threshold."""
+        with self._lock:
+            if not self.needs_compaction():
+                return
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self.compact, name="packed-store-compaction", daemon=True
+            )
+            self._compactor.start()
+
+    def compact(self) -> None:
+        """Copy live records into fresh segments and delete the old ones.
+
+        Returns immediately if another process is already compacting the store.
+        """
+        with file_lock(self.directory / "compact.lock", blocking=False) as held:
+            if held:
+                self._compact()
+
+    def _compact(self) -> None:
+        with self._exclusive():
+            old_segments = set(self._segments()) | {self._header().active}
+            # Everything appended from now on, moved or new, lands in new segments
+            self._update_header(active=max(old_segments) + 1)
+            slots = self._slots_in_write_order()
+
+        for slot in slots:
+            try:
+                with open(self._segment_path(slot.segment), "rb") as f:
+                    f.seek(slot.offset)
+                    record = f.read(slot.length)
+            except FileNotFoundError:
+                continue
+
+            with self._exclusive():
+                i, _ = self._find(slot.fp)
+                # Skip records replaced or deleted while we were copying
+                if i is None or self._slot(i)[1:4] != slot[1:4]:
+                    continue
+                segment, offset = self._append(record)
+                moved = self._slot(i)._replace(segment=segment, offset=offset)
+                self._set_slot(i, moved)
+
+        with self._exclusive():
+            for segment in old_segments:
+                self._segment_path(segment).unlink(missing_ok=True)
+            # Records replaced during the copy left dead space in new segments
+            total = sum(self._segment_path(n).stat().st_size for n in self._segments())
+            self._update_header(dead_bytes=max(total - self._header().live_bytes, 0))
+        logger.info(f"Compacted packed store {self}")
+
+    def wait_for_compaction(self) -> None:
+        """Block until a running background compaction has finished."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def clear(self) -> None:
+        """Remove every record and reset the counters."""
+        self.wait_for_compaction()
+        with self._exclusive():
+            for segment in self._segments():
+                self._segment_path(segment).unlink(missing_ok=True)
+            self._publish_index(_empty_header(INITIAL_CAPACITY))
+            self._pending_hits = self._pending_misses = 0
+            self._pending_touches.clear()
+
+    def close(self) -> None:
+        self.wait_for_compaction()
+        if self._lock_file.closed:
+            return
+        with self._exclusive():
+            self._flush_accesses()
+            self._close_index()
+        self._lock_file.close()
+
+    def __str__(self) -> str:
+        return str(self.directory)
@@ -0,0 +1,266 @@
+"""
+Portable Cache Packs
+
+A cache pack is a single gzip-compressed tar archive holding cached pages,
+stored entries and parse results plus a ``manifest.json`` with the SHA-256
+checksum of every member. Packs let a new machine or CI runner start with a
+warm cache: importing merges the pack into the local caches, keeping whichever
+copy of a page is newer, so importing the same pack twice changes nothing.
+Parse results are keyed by page content and parser version, so a result is
+only added when no result is stored under its key.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import tarfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .cache import CacheEntry, PageCache, ResultCache
+from .entries import EntryStore
+from .keys import canonical_key
+from .result import ParseResult
+
+logger = logging.getLogger(__name__)
+
+PACK_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+ENTRIES_NAME = "entries.jsonl"
+RESULTS_NAME = "results.jsonl"
+# Manifest fields that import_pack() relies on
+PAGE_FIELDS = ("url", "file", "sha256", "fetched_at")
+MEMBER_FIELDS = ("file", "sha256")
+
+
+@dataclass
+class PackStats:
+    """What an export or import did."""
+
+    pages: int = 0
+    entries: int = 0
+    results: int = 0
+    skipped: int = 0
+    corrupt: List[str] = field(default_factory=list)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _add_member(archive: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    archive.addfile(info, io.BytesIO(data))
+
+
+def export_pack(
+    path: Path,
+    cache: PageCache,
+    entry_store: Optional[EntryStore] = None,
+    words: Optional[Iterable[str]] = None,
+    result_cache: Optional[ResultCache] = None,
+) -> PackStats:
+    """Write cached pages (and stored entries and parse results) to a pack.
+
+    Args:
+        path: Archive to create
+        cache: Page cache to export
+        entry_store: Entry store to export as well, if any
+        words: Only export these URLs or words
+        result_cache: Parse-result cache to export as well, if any
+
+    Returns:
+        Counters for the export
+    """
+    only = {canonical_key(word) for word in words} if words is not None else None
+    stats = PackStats()
+    manifest: Dict[str, Any] = {
+        "format": PACK_FORMAT,
+        "created": time.time(),
+        "pages": [],
+    }
+
+    with tarfile.open(path, "w:gz") as archive:
+        for entry in cache.iter_entries():
+            if only is not None and canonical_key(entry.url) not in only:
+                continue
+            name = f"pages/{PageCache.key_for(entry.url)}.body"
+            _add_member(archive, name, entry.body)
+            manifest["pages"].append(
+                {
+                    "url": entry.url,
+                    "file": name,
+                    "sha256": _sha256(entry.body),
+                    "etag": entry.etag,
+                    "last_modified": entry.last_modified,
+                    "fetched_at": entry.fetched_at,
+                }
+            )
+            stats.pages += 1
+
+        if entry_store is not None:
+            lines = [
+                json.dumps(entry, ensure_ascii=False)
+                for entry in entry_store.iter_entries()
+                if only is None or canonical_key(entry["word"]) in only
+            ]
+            data = "\n".join(lines).encode("utf-8")
+            _add_member(archive, ENTRIES_NAME, data)
+            manifest["entries"] = {"file": ENTRIES_NAME, "sha256": _sha256(data)}
+            stats.entries = len(lines)
+
+        if result_cache is not None:
+            lines = [
+                json.dumps({"key": key, "result": result.to_dict()}, ensure_ascii=False)
+                for key, result in result_cache.items()
+                if only is None or canonical_key(result.url) in only
+            ]
+            data = "\n".join(lines).encode("utf-8")
+            _add_member(archive, RESULTS_NAME, data)
+            manifest["results"] = {"file": RESULTS_NAME, "sha256": _sha256(data)}
+            stats.results = len(lines)
+
+        # The manifest goes last so it can list every member's checksum
+        _add_member(archive, MANIFEST_NAME, json.dumps(manifest, indent=1).encode())
+
+    return stats
+
+
+def _read_manifest(path: Path) -> Dict[str, Any]:
+    # Stream mode reads members in order without seeking back in the gzip stream
+    with tarfile.open(path, "r|gz") as archive:
+        for member in archive:
+            if member.name == MANIFEST_NAME:
+                manifest = json.loads(archive.extractfile(member).read())
+                break
+        else:
+            raise ValueError(f"{path} is not a cache pack (no manifest)")
+
+    if not isinstance(manifest, dict):
+        raise ValueError(f"{path} has an invalid manifest")
+    if manifest.get("format") != PACK_FORMAT:
+        raise ValueError(f"Unsupported cache pack format: {manifest.get('format')}")
+
+    pages = manifest.get("pages")
+    if not isinstance(pages, list):
+        raise ValueError(f"{path} has an invalid manifest (no page list)")
+    for page in pages:
+        if not (isinstance(page, dict) and all(name in page for name in PAGE_FIELDS)):
+            raise ValueError(f"{path} has an invalid manifest entry: {page!r}")
+    for name in ("entries", "results"):
+        member = manifest.get(name)
+        if member and not (
+            isinstance(member, dict) and all(field in member for field in MEMBER_FIELDS)
+        ):
+            raise ValueError(f"{path} has an invalid manifest entry: {member!r}")
+    return manifest
+
+
+def import_pack(
+    path: Path,
+    cache: PageCache,
+    entry_store: Optional[EntryStore] = None,
+    result_cache: Optional[ResultCache] = None,
+) -> PackStats:
+    """Merge a pack into the local caches.
+
+    Pages are only written when the local cache has no copy that is as new as
+    the packed one, and parse results when none is stored under their key.
+    Members whose checksum does not match the manifest are skipped and
+    reported in PackStats.corrupt.
+
+    Args:
+        path: Archive to import
+        cache: Page cache to merge into
+        entry_store: Entry store to merge packed entries into, if any
+        result_cache: Parse-result cache to merge packed results into, if any
+
+    Returns:
+        Counters for the import
+    """
+    manifest = _read_manifest(path)
+    pages = {page["file"]: page for page in manifest["pages"]}
+    entries = manifest.get("entries") or {}
+    results = manifest.get("results") or {}
+    stats = PackStats()
+
+    with tarfile.open(path, "r|gz") as archive:
+        for member in archive:
+            page = pages.pop(member.name, None)
+            if page is None and member.name not in (
+                entries.get("file"),
+                results.get("file"),
+            ):
+                continue
+
+            if page is not None:
+                local = cache.get(page["url"])
+                if local is not None and local.fetched_at >= page["fetched_at"]:
+                    stats.skipped += 1
+                    continue
+
+            data = archive.extractfile(member).read()
+            if page is not None:
+                expected = page["sha256"]
+            elif member.name == entries.get("file"):
+                expected = entries["sha256"]
+            else:
+                expected = results["sha256"]
+            if _sha256(data) != expected:
+                stats.corrupt.append(member.name)
+            elif page is not None:
+                entry = CacheEntry(
+                    url=page["url"],
+                    body=data,
+                    etag=page.get("etag"),
+                    last_modified=page.get("last_modified"),
+                    fetched_at=page["fetched_at"],
+                )
+                cache.add(entry, enforce_limit=False)
+                stats.pages += 1
+            elif member.name == entries.get("file"):
+                if entry_store is not None:
+                    stats.entries += _import_entries(data, entry_store)
+            elif result_cache is not None:
+                stats.results += _import_results(data, result_cache)
+
+    # Listed in the manifest but missing from the archive
+    stats.corrupt.extend(pages)
+    cache.enforce_size_limit()
+    if result_cache is not None:
+        result_cache.enforce_size_limit()
+    logger.info(
+        f"Imported {stats.pages} pages, {stats.entries} entries and "
+        f"{stats.results} parse results from {path}"
+    )
+    return stats
+
+
+def _import_results(data: bytes, result_cache: ResultCache) -> int:
+    imported = 0
+    for line in data.decode("utf-8").splitlines():
+        record = json.loads(line)
+        if not result_cache.contains(record["key"]):
+            result_cache.add(
+                record["key"],
+                ParseResult.from_dict(record["result"]),
+                enforce_limit=False,
+            )
+            imported += 1
+    return imported
+
+
+def _import_entries(data: bytes, entry_store: EntryStore) -> int:
+    by_origin: Dict[str, List[Dict[str, Any]]] = {}
+    for line in data.decode("utf-8").splitlines():
+        entry = json.loads(line)
+        by_origin.setdefault(entry.get("origin", "pack"), []).append(entry)
+    return sum(
+        entry_store.put_many(origin_entries, origin)
+        for origin, origin_entries in by_origin.items()
+    )
@@ -0,0 +1,195 @@
+"""
+Paradigm Model
+
+A Paradigm is the structured form of one inflection table: the laid-out cells
+of the table, each either a header label (case, mood, tense, number, person)
+or the inflected form(s) in that slot, plus the Kotus type and consonant
+gradation from the table title. Forms can be listed with the headers that
+apply to them, searched, exported as JSON and rendered again without the page
+HTML. Markdown is one renderer of it.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Cell values that mark a missing form
+NO_FORM = {"—", "–", "-"}
+
+
+class Cell(NamedTuple):
+    """A table cell: a header label, the alternative forms of a slot, or a
+    note (the usage footnotes of verb tables)."""
+
+    values: Tuple[str, ...] = ()
+    kind: str = "form"  # "header", "form" or "note"
+
+    @property
+    def header(self) -> bool:
+        return self.kind == "header"
+
+    @property
+    def text(self) -> str:
+        return ", ".join(self.values)
+
+
+class InflectedForm(NamedTuple):
+    """Forms of one slot with the row and column headers that apply to it,
+    e.g. ("asettamasta",), ("3rd", "elative"), ("Nominal forms",
+    "infinitives", "active")."""
+
+    forms: Tuple[str, ...]
+    row: Tuple[str, ...]
+    column: Tuple[str, ...]
+
+
+def grid_to_markdown(grid: List[List[str]]) -> str:
+    """Render rows of cell texts as a Markdown table.
+
+    Columns and rows without any text are dropped; the first remaining row
+    becomes the header row.
+    """
+    used = [
+        c for c in range(len(grid[0]) if grid else 0) if any(row[c] for row in grid)
+    ]
+    lines = []
+    for row in grid:
+        cells = [row[c].replace("|", "\\|") for c in used]
+        if not any(cells):
+            continue
+        lines.append("| " + " | ".join(cells) + " |")
+        if len(lines) == 1:
+            lines.append("| " + " | ".join(["---"] * len(cells)) + " |")
+    return "\n".join(lines)
+
+
+@dataclass(frozen=True, slots=True)
+class Paradigm:
+    """Inflection table of one word type.
+
+    grid holds an index into cells for every slot of the laid-out table, or -1
+    where no cell is; a cell spanning rows or columns fills all its slots.
+    """
+
+    cells: Tuple[Cell, ...] = ()
+    grid: Tuple[Tuple[int, ...], ...] = ()
+    kotus_type: Optional[str] = None
+    gradation: Optional[str] = None
+
+    @property
+    def title(self) -> str:
+        """The caption row ("Inflection of ase (Kotus type 48/hame, ...)"), if any."""
+        if self._has_title():
+            return self.cells[self.grid[0][0]].text
+        return ""
+
+    def _has_title(self) -> bool:
+        # A single header spanning the whole first row
+        return bool(self.grid) and (
+            len(set(self.grid[0])) == 1
+            and self.grid[0][0] >= 0
+            and self.cells[self.grid[0][0]].header
+        )
+
+    def _is_origin(self, r: int, c: int) -> bool:
+        index = self.grid[r][c]
+        return not (
+            (c > 0 and self.grid[r][c - 1] == index)
+            or (r > 0 and self.grid[r - 1][c] == index)
+        )
+
+    def text_grid(self) -> List[List[str]]:
+        """Cell texts laid out as in the table; spanned slots after the first
+        are empty."""
+        return [
+            [
+                self.cells[index].text if index >= 0 and self._is_origin(r, c) else ""
+                for c, index in enumerate(row)
+            ]
+            for r, row in enumerate(self.grid)
+        ]
+
+    def _labels(self, indexes) -> Tuple[str, ...]:
+        labels = []
+        for index in dict.fromkeys(indexes):  # a spanning header counts once
+            if self.cells[index].text:
+                labels.append(self.cells[index].text)
+        return tuple(labels)
+
+    def forms(self) -> Iterator[InflectedForm]:
+        """Every slot holding a form, with the headers that apply to it.
+
+        Row headers are the nearest run of header cells to the left of the
+        slot (a verb table has a person column before each tense). Column
+        headers are the header cells above it up to the nearest form, followed
+        upwards by wider headers only, which head the whole block the slot is
+        in (e.g. a mood above its tense blocks).
+        """
+        first = 1 if self._has_title() else 0
+        seen = set()
+        for r in range(first, len(self.grid)):
+            for c, index in enumerate(self.grid[r]):
+                if index < 0 or index in seen:
+                    continue
+                cell = self.cells[index]
+                if cell.kind != "form" or set(cell.values) <= NO_FORM:
+                    continue
+                seen.add(index)
+
+                row = []
+                for left in range(c - 1, -1, -1):
+                    other = self.grid[r][left]
+                    if other >= 0 and self.cells[other].header:
+                        row.append(other)
+                    elif row:
+                        break
+
+                column = []
+                width = 0
+                in_block = True
+                for up in range(r - 1, first - 1, -1):
+                    other = self.grid[up][c]
+                    if other == index or other < 0:
+                        continue
+                    if not self.cells[other].header:
+                        in_block = False
+                        continue
+                    span = self.grid[up].count(other)
+                    if in_block or span > width:
+                        column.append(other)
+                        width = max(width, span)
+
+                yield InflectedForm(
+                    cell.values,
+                    self._labels(reversed(row)),
+                    self._labels(reversed(column)),
+                )
+
+    def find(self, form: str) -> List[InflectedForm]:
+        """The slots holding form (case-insensitive)."""
+        form = form.lower()
+        return [
+            slot
+            for slot in self.forms()
+            if any(value.lower() == form for value in slot.forms)
+        ]
+
+    def to_markdown(self) -> str:
+        return grid_to_markdown(self.text_grid())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form, read back by from_dict()."""
+        return {
+            "kotus_type": self.kotus_type,
+            "gradation": self.gradation,
+            "cells": [[list(cell.values), cell.kind] for cell in self.cells],
+            "grid": [list(row) for row in self.grid],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Paradigm":
+        return cls(
+            cells=tuple(Cell(tuple(values), kind) for values, kind in data["cells"]),
+            grid=tuple(tuple(row) for row in data["grid"]),
+            kotus_type=data.get("kotus_type"),
+            gradation=data.get("gradation"),
+        )
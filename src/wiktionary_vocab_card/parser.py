@@ -1,8 +1,22 @@
+import functools
+import logging
 import re
-from urllib.parse import unquote
+import time
+from bisect import bisect_right
+from dataclasses import replace
 
-import requests
-from bs4 import BeautifulSoup
+from .html_backends import available_backends, build_tree
+from .keys import canonical_key, canonical_url
+from .result import ParseResult
+from .sources import get_page_source
+from .tables import table_paradigm
+
+logger = logging.getLogger(__name__)
+
+# Version of what parse() extracts; bump it whenever a change to the parser
+# changes the ParseResult of a page, so cached results are not reused.
+# test_parser.py fails when the results for examples/ change without a bump.
+PARSER_VERSION = 1
 
 SUPPORTED_WORD_TYPES = [
     "Noun",
@@ -20,113 +34,183 @@ SUPPORTED_WORD_TYPES = [
     "Particle",
 ]
 
+# Full pages carry the revision in mw.config; section fragments in a meta tag
+REVISION_ID_PATTERN = re.compile(
+    rb'"wgRevisionId":(\d+)|<meta name="revision-id" content="(\d+)"'
+)
 
-def html_table_to_markdown(table):
-    """Convert a BeautifulSoup table element to Markdown format."""
-    if not table:
-        return ""
-
-    # First, remove all nested tables completely
-    nested_tables = table.find_all("table", recursive=True)
-    for nested in nested_tables:
-        if nested != table:  # Don't remove the main table
-            nested.decompose()
-
-    # Now parse the simplified table
-    rows = table.find_all("tr")
-    if not rows:
-        return ""
-
-    # Analyze table structure
-    max_cols = 0
-    for row in rows:
-        cells = row.find_all(["th", "td"])
-        cols_in_row = sum(
-            int(cell.get("colspan", 1)) for cell in cells if cell is not None
-        )
-        max_cols = max(max_cols, cols_in_row)
 
-    markdown_rows = []
-    for row in rows:
-        cells = row.find_all(["th", "td"])
-        markdown_cells = []
+def extract_revision_id(content):
+    """Return the Wiktionary revision id embedded in page HTML, if any."""
+    match = REVISION_ID_PATTERN.search(content)
+    if match:
+        return int(match.group(1) or match.group(2))
+    return None
 
-        for cell in cells:
-            if cell is None:
-                continue
 
-            # Extract text, handling line breaks
-            text = cell.get_text().strip()
-            text = re.sub(r"\s+", " ", text)
+KOTUS_TYPE_PATTERN = re.compile(r"Kotus type ([^,\s)]+)")
+# "tt-t gradation"; tables of words without gradation say "no gradation"
+GRADATION_PATTERN = re.compile(r"([^\s,()]+) gradation")
 
-            # Handle colspan
-            colspan = int(cell.get("colspan", 1))
-            markdown_cells.append(text)
+FINNISH_HEADING_PATTERN = re.compile(rb'<h2\b[^>]*\bid="Finnish"')
+H2_PATTERN = re.compile(rb"<h2[\s>]")
 
-            # Add empty cells for spanning columns
-            for _ in range(1, colspan):
-                markdown_cells.append("")
+# Markup whose content is not parsed as tags; an h2 marker inside one of these
+# is not a heading
+OPAQUE_MARKUP = [(b"<!--", b"-->"), (b"<script", b"</script"), (b"<style", b"</style")]
 
-        # Pad with empty cells if needed
-        while len(markdown_cells) < max_cols:
-            markdown_cells.append("")
 
-        markdown_rows.append(markdown_cells)
+def _inside_opaque_markup(content, position):
+    return any(
+        content.rfind(start, 0, position) > content.rfind(end, 0, position)
+        for start, end in OPAQUE_MARKUP
+    )
 
-    # Find the maximum non-empty column
-    max_used_cols = 0
-    for row in markdown_rows:
-        for i in range(len(row) - 1, -1, -1):
-            if row[i].strip():
-                max_used_cols = max(max_used_cols, i + 1)
-                break
 
-    # Trim rows to only include used columns
-    trimmed_rows = [row[:max_used_cols] for row in markdown_rows]
+def slice_finnish_section(content):
+    """Return the bytes from the Finnish h2 up to the next h2.
+
+    Building a tree only from this slice skips the other languages and the page
+    chrome, which make up most of a page. Returns None when the markers are
+    ambiguous (no or several Finnish headings, or a marker inside a comment,
+    script or style block), in which case the whole page should be parsed.
+    """
+    headings = FINNISH_HEADING_PATTERN.finditer(content)
+    heading = next(headings, None)
+    if heading is None or next(headings, None) is not None:
+        return None
+
+    start = heading.start()
+    boundary = H2_PATTERN.search(content, heading.end())
+    end = boundary.start() if boundary else len(content)
+    if _inside_opaque_markup(content, start) or _inside_opaque_markup(content, end):
+        return None
+    return content[start:end]
+
+
+def _is_heading(element):
+    return element.name == "div" and "mw-heading" in element.get("class", [])
+
 
-    # Convert to markdown
-    result = []
-    for i, row in enumerate(trimmed_rows):
-        if all(cell == "" for cell in row):
-            continue
+class SectionIndex:
+    """Headings, definition lists and inflection tables of one language section.
 
-        line = "| " + " | ".join(row) + " |"
-        result.append(line)
+    Built in a single pass over the elements following the section's h2, up to
+    the h2 of the next language. Elements are numbered in document order, so
+    "the first table after a heading" is a binary search instead of another walk
+    over the page.
+    """
 
-        if i == 0:
-            result.append("| " + " | ".join(["---"] * len(row)) + " |")
+    def __init__(self, section_header):
+        self.headings = []  # mw-heading divs
+        self.lists = []  # ol elements
+        self.tables = []  # table.inflection-table elements
+        self.end = None  # h2 of the next language section
+        self._positions = {"headings": [], "lists": [], "tables": []}
+        self._headers = {}
 
-    return "\n".join(result)
+        position = 0
+        for element in section_header.next_elements:
+            if element.name is None:  # text and comments
+                continue
+            position += 1
+            if element.name == "h2":
+                self.end = element
+                break
+            if _is_heading(element):
+                kind = "headings"
+            elif element.name == "ol":
+                kind = "lists"
+            elif element.name == "table" and "inflection-table" in element.get(
+                "class", []
+            ):
+                kind = "tables"
+            else:
+                continue
+            getattr(self, kind).append(element)
+            self._positions[kind].append(position)
+
+    def headers(self, header_level):
+        """(position, header) for every heading with an h-tag of the given level."""
+        if header_level not in self._headers:
+            self._headers[header_level] = [
+                (position, header)
+                for position, heading in zip(self._positions["headings"], self.headings)
+                for header in [heading.find(header_level)]
+                if header
+            ]
+        return self._headers[header_level]
+
+    def first_after(self, kind, position, before=None):
+        """The first element of kind ("lists" or "tables") after position,
+        or None if there is none before the position before."""
+        positions = self._positions[kind]
+        i = bisect_right(positions, position)
+        if i == len(positions) or (before is not None and positions[i] > before):
+            return None
+        return getattr(self, kind)[i]
+
+    def next_heading(self, position):
+        """Position of the first heading after position, or None."""
+        positions = self._positions["headings"]
+        i = bisect_right(positions, position)
+        return positions[i] if i < len(positions) else None
 
 
 class WiktionaryParser:
-    def __init__(self, url):
+    def __init__(self, url, source=None, backend=None, result_cache=None):
         self.url = self._clean_url(url)
-        self.word = unquote(self.url.split("/wiki/")[-1]).replace("_", " ")
+        self.source = source
+        # HTML parser backend; None or "auto" picks the fastest installed one
+        self.backend = backend
+        # ResultCache to look results up in before parsing; None disables it
+        self.result_cache = result_cache
+        self.word = canonical_key(self.url).title
         self.soup = None
         self.finnish_section = None
         self.word_types = {}
         self.kotus_types = []
         self.definitions = []
-        self.conjugation_tables = []
+        self.paradigms = []
+        self.revision_id = None
         # Word with one word type has h3 header, multiple word types have h4 header
         self.header_level = 3
 
+    @property
+    def conjugation_tables(self):
+        """The paradigms rendered as Markdown tables"""
+        return [paradigm.to_markdown() for paradigm in self.paradigms]
+
     @property
     def header_level_str(self):
         return f"h{self.header_level}"
 
     @staticmethod
     def _clean_url(url):
-        return url.split("#")[0]
-
-    def fetch_page(self):
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(self.url, headers=headers)
-        response.raise_for_status()
-        self.soup = BeautifulSoup(response.content, "html.parser")
+        return canonical_url(url)
+
+    def load_page(self):
+        """The page HTML as bytes"""
+        if self.source is None:
+            self.source = get_page_source()
+        return self.source.get_page(self.url)
+
+    def fetch_page(self, content=None):
+        if content is None:
+            content = self.load_page()
+        self.revision_id = extract_revision_id(content)
+
+        self.backend = resolve_backend(self.backend)
+
+        section = slice_finnish_section(content)
+        if section is not None:
+            # The slice has lost the page's charset declaration
+            self.soup = build_tree(
+                section, self.backend, from_encoding="utf-8", filtered=True
+            )
+            if self.soup.find("h2", {"id": "Finnish"}):
+                return
+        self.soup = build_tree(content, self.backend, filtered=True)
 
     def find_finnish_section(self):
         finnish_header = self.soup.find("h2", {"id": "Finnish"})
@@ -135,150 +219,124 @@ class WiktionaryParser:
         self.finnish_section = finnish_header
 
     def find_next_non_finnish_section(self):
-        self.next_non_finnish_section = None
-        current = self.finnish_section
-        while current:
-            current = current.find_next()
-            if not current:
-                break
-            if current.name == "h2":
-                self.next_non_finnish_section = current
-                break
+        self.section = SectionIndex(self.finnish_section)
+        self.next_non_finnish_section = self.section.end
 
-    def _parse_word_type_headers(self, current, header_level):
-        header = current.find(header_level)
-        if header and header.get("id").split("_", 1)[0] in SUPPORTED_WORD_TYPES:
+    def _parse_word_type_headers(self, header):
+        if header.get("id", "").split("_", 1)[0] in SUPPORTED_WORD_TYPES:
             self.word_types[header.get_text().strip().lower()] = header
 
     def parse_word_type(self):
-        # Find the h3 tag with "Noun", "Verb", etc.
-        # Search through all elements after Finnish section, not just siblings
-        current = self.finnish_section
-        while current:
-            current = current.find_next()
-            if not current:
-                break
-            # Check if it already in the next non-finnish section
-            if current == self.next_non_finnish_section:
-                break
-            # Check for h3 within a div
-            if current.name == "div" and "mw-heading" in current.get("class", []):
-                self._parse_word_type_headers(current, self.header_level_str)
+        # Find the h3 tag with "Noun", "Verb", etc. in the headings of the
+        # Finnish section
+        for _, header in self.section.headers(self.header_level_str):
+            self._parse_word_type_headers(header)
 
     def _parse_form_table_header(self, form_table_name, word_type):
-        """Parse either the declension or conjugation table based on the type of the
-        word"""
-        current = self.finnish_section
-
-        while current:
-            current = current.find_next()
-            if not current:
-                break
-
-            if current.name == "div" and "mw-heading" in current.get("class", []):
-                header = current.find(f"h{self.header_level + 1}")
-                if header and form_table_name in header.get_text():
-                    return header
+        """Position of either the declension or conjugation heading based on the
+        type of the word"""
+        for position, header in self.section.headers(f"h{self.header_level + 1}"):
+            if form_table_name in header.get_text():
+                return position
+
+    def _add_paradigm(self, table, th):
+        """Record the paradigm of an inflection table, with the Kotus type and
+        gradation from its header cell th"""
+        kotus_type = gradation = None
+        if th:
+            th_text = th.get_text()
+            match = KOTUS_TYPE_PATTERN.search(th_text)
+            if match:
+                # Take the last part after / ("53*C/muistaa")
+                kotus_type = match.group(1).split("/")[-1]
+                self.kotus_types.append(kotus_type)
+            match = GRADATION_PATTERN.search(th_text)
+            if match and match.group(1) != "no":
+                gradation = match.group(1)
+        paradigm = table_paradigm(table)
+        self.paradigms.append(
+            replace(paradigm, kotus_type=kotus_type, gradation=gradation)
+        )
 
     def parse_non_verb_declension(self, word_type):
         # Find the declension heading first
-        current = self._parse_form_table_header("Declension", word_type)
+        position = self._parse_form_table_header("Declension", word_type)
 
-        if current:
+        if position is not None:
             # Find the inflection table after the declension header
-            inflection_table = None
-
-            while current:
-                current = current.find_next()
-                if not current:
-                    break
-
-                if current.name == "table" and "inflection-table" in current.get(
-                    "class", []
-                ):
-                    inflection_table = current
-                    break
+            inflection_table = self.section.first_after("tables", position)
 
             if inflection_table:
-                # Extract Kotus type from the table header text
+                # The Kotus type is in the table header text
                 th = inflection_table.find("th", {"colspan": "4"})
-                if th:
-                    th_text = th.get_text()
-                    match = re.search(r"Kotus type ([^,\s)]+)", th_text)
-                    if match:
-                        kotus_full = match.group(1)
-                        kotus_parts = kotus_full.split("/")
-                        self.kotus_types.append(
-                            kotus_parts[-1]
-                        )  # Take the last part after /
-
-                # Convert table to markdown for conjugation_table
-                self.conjugation_tables.append(html_table_to_markdown(inflection_table))
+                self._add_paradigm(inflection_table, th)
 
     def parse_verb_conjugation(self, word_type):
         # Find conjugation header for verbs
-        current = self._parse_form_table_header("Conjugation", word_type)
-
-        if current:
-            # Find the inflection table after the conjugation header
-            while current:
-                current = current.find_next()
-                if not current:
-                    break  # Stop if no more elements
-                
-                # Stop at next heading (but not just any div)
-                if current.name == "div" and "mw-heading" in current.get("class", []):
-                    break  # Stop at next header
-
-                if (
-                    current
-                    and current.name == "table"
-                    and "inflection-table" in current.get("class", [])
-                ):
-                    # Extract Kotus type from table header text if present
-                    th = current.find("th")
-                    if th:
-                        th_text = th.get_text()
-                        match = re.search(r"Kotus type ([^,\s)]+)", th_text)
-                        if match:
-                            kotus_full = match.group(1)
-                            kotus_parts = kotus_full.split("/")
-                            self.kotus_types.append(kotus_parts[-1])
-
-                    # Convert table to markdown
-                    self.conjugation_tables.append(html_table_to_markdown(current))
-                    return
-
-    def parse_definitions(self, word_type):
-        # Find the list element containing definitions
-        current = self.finnish_section
-        found_pos = False
+        position = self._parse_form_table_header("Conjugation", word_type)
 
-        while current:
-            current = current.find_next()
-            if not current:
-                break
+        if position is not None:
+            # Find the inflection table before the next heading
+            table = self.section.first_after(
+                "tables", position, before=self.section.next_heading(position)
+            )
+            if table:
+                # The Kotus type is in the first header cell, if present
+                self._add_paradigm(table, table.find("th"))
 
-            if current.name == "div" and "mw-heading" in current.get("class", []):
-                header = current.find(self.header_level_str)
-                if header and header.get_text().strip().lower() == word_type:
-                    found_pos = True
-
-            if found_pos and current.name == "ol":
-                items = current.find_all("li", recursive=False)
-                self.definitions.append(
-                    "\n".join(
-                        [
-                            f"{i+1}. {li.get_text().strip()}"
-                            for i, li in enumerate(items)
-                        ]
+    def parse_definitions(self, word_type):
+        # Find the list element containing definitions under the word type heading
+        for position, header in self.section.headers(self.header_level_str):
+            if header.get_text().strip().lower() == word_type:
+                items_list = self.section.first_after("lists", position)
+                if items_list:
+                    items = items_list.find_all("li", recursive=False)
+                    self.definitions.append(
+                        "\n".join(
+                            [
+                                f"{i+1}. {li.get_text().strip()}"
+                                for i, li in enumerate(items)
+                            ]
+                        )
                     )
-                )
-                break
+                return
+
+    def release_tree(self):
+        """Drop every reference into the HTML tree so it can be freed"""
+        self.soup = None
+        self.finnish_section = None
+        self.section = None
+        self.next_non_finnish_section = None
+        self.word_types = dict.fromkeys(self.word_types)
+
+    def result(self):
+        """The extracted content as a ParseResult"""
+        return ParseResult(
+            url=self.url,
+            word=self.word,
+            word_types=tuple(self.word_types),
+            kotus_types=tuple(self.kotus_types),
+            definitions=tuple(self.definitions),
+            paradigms=tuple(self.paradigms),
+            revision_id=self.revision_id,
+        )
 
     def parse(self):
-        """Process everything in the right order"""
-        self.fetch_page()
+        """Process everything in the right order.
+
+        Returns the ParseResult; the HTML tree is released before returning.
+        With a result cache, a page parsed before by this PARSER_VERSION is
+        not parsed again.
+        """
+        content = self.load_page()
+        if self.result_cache is not None:
+            result = self.result_cache.get(content, PARSER_VERSION)
+            if result is not None:
+                logger.info(f"Parse result cache hit: {self.url}")
+                self.revision_id = result.revision_id
+                return replace(result, url=self.url, word=self.word)
+
+        self.fetch_page(content)
         self.find_finnish_section()
         self.find_next_non_finnish_section()
         # For words with one word type, the header is an h3
@@ -295,4 +353,64 @@ class WiktionaryParser:
             else:
                 self.parse_non_verb_declension(word_type)  # For nouns, adjectives, etc.
 
-        return self
+        self.release_tree()
+        result = self.result()
+        if self.result_cache is not None:
+            self.result_cache.put(content, PARSER_VERSION, result)
+        return result
+
+
+def _probe_page():
+    """A small Finnish section shaped like a real page: word type headings,
+    definition lists and inflection tables."""
+    parts = ['<div class="mw-heading mw-heading2"><h2 id="Finnish">Finnish</h2></div>']
+    for word_type in ["Noun", "Verb"]:
+        items = "".join(f"<li>sense <a href='#'>{n}</a></li>" for n in range(8))
+        rows = "".join(
+            f"<tr><th>form {n}</th><td><span>talo{n}</span></td><td>talot{n}</td></tr>"
+            for n in range(24)
+        )
+        form = "Conjugation" if word_type == "Verb" else "Declension"
+        parts.append(
+            f'<div class="mw-heading mw-heading4"><h4 id="{word_type}">{word_type}</h4>'
+            f"</div><p>talo</p><ol>{items}</ol>"
+            f'<div class="mw-heading mw-heading5"><h5 id="{form}">{form}</h5></div>'
+            f'<table class="inflection-table"><tr><th colspan="4">'
+            f"Inflection of talo (Kotus type 1/valo)</th></tr>{rows}</table>"
+        )
+    return "".join(parts).encode("utf-8")
+
+
+class _ProbeSource:
+    def get_page(self, url):
+        return _probe_page()
+
+
+@functools.lru_cache(maxsize=None)
+def fastest_backend():
+    """Time every installed backend on a sample page and return the fastest.
+
+    Runs once per process, the first time a parser is asked for "auto".
+    """
+    timings = {}
+    for backend in available_backends():
+        runs = []
+        for _ in range(4):  # The first run pays for imports and is discarded
+            start = time.perf_counter()
+            WiktionaryParser("talo", source=_ProbeSource(), backend=backend).parse()
+            runs.append(time.perf_counter() - start)
+        timings[backend] = min(runs[1:])
+    backend = min(timings, key=timings.get)
+    logger.debug(f"HTML parser backend timings {timings}; using {backend}")
+    return backend
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_backend(name=None):
+    """Return the backend to use for a configured name ("auto" or a backend)."""
+    if name in (None, "auto"):
+        return fastest_backend()
+    if name not in available_backends():
+        logger.warning(f"HTML parser backend '{name}' is not installed")
+        return fastest_backend()
+    return name
@@ -7,6 +7,7 @@ class TableProcessor:
 
 class ContentProcessor:
     def __init__(self, parser, config):
+        # The ParseResult returned by parse()
         self.parser = parser
         self.config = config
 
@@ -14,8 +15,10 @@ class ContentProcessor:
         # Process all components and return structured data
         return {
             "word": self.parser.word,
-            "word_types": list(self.parser.word_types.keys()),
-            "kotus_types": self.parser.kotus_types,
-            "definitions": self.parser.definitions,
+            "word_types": list(self.parser.word_types),
+            "kotus_types": list(self.parser.kotus_types),
+            "definitions": list(self.parser.definitions),
             "conjugation_tables": self.parser.conjugation_tables,
+            # Structured tables; entries from the store or kaikki have none
+            "paradigms": list(self.parser.paradigms),
         }
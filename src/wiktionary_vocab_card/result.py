@@ -0,0 +1,64 @@
+"""
+Parse Results
+
+parse() returns a ParseResult: what was extracted from a page, as strings and
+immutable structures only. It holds no reference to the HTML tree or to the
+parser that built it, so the tree can be freed as soon as extraction is done,
+and results are cheap to keep in memory, pickle, and send to other processes.
+to_dict()/from_dict() give the JSON form kept by the parse-result cache.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .paradigm import Paradigm
+
+
+@dataclass(frozen=True, slots=True)
+class ParseResult:
+    """The extracted content of one Wiktionary page."""
+
+    url: str
+    word: str
+    word_types: Tuple[str, ...] = ()
+    kotus_types: Tuple[str, ...] = ()
+    definitions: Tuple[str, ...] = ()
+    paradigms: Tuple[Paradigm, ...] = ()
+    # Markdown tables of entries that have no paradigms (offline store, kaikki)
+    tables: Tuple[str, ...] = ()
+    revision_id: Optional[int] = None
+
+    @property
+    def conjugation_tables(self) -> List[str]:
+        """The inflection tables as Markdown"""
+        if self.paradigms:
+            return [paradigm.to_markdown() for paradigm in self.paradigms]
+        return list(self.tables)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form, read back by from_dict()."""
+        return {
+            "url": self.url,
+            "word": self.word,
+            "word_types": list(self.word_types),
+            "kotus_types": list(self.kotus_types),
+            "definitions": list(self.definitions),
+            "paradigms": [paradigm.to_dict() for paradigm in self.paradigms],
+            "tables": list(self.tables),
+            "revision_id": self.revision_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ParseResult":
+        return cls(
+            url=data["url"],
+            word=data["word"],
+            word_types=tuple(data.get("word_types", ())),
+            kotus_types=tuple(data.get("kotus_types", ())),
+            definitions=tuple(data.get("definitions", ())),
+            paradigms=tuple(
+                Paradigm.from_dict(paradigm) for paradigm in data.get("paradigms", ())
+            ),
+            tables=tuple(data.get("tables", ())),
+            revision_id=data.get("revision_id"),
+        )
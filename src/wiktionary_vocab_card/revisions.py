@@ -0,0 +1,265 @@
+"""
+Revision Tracking Module
+
+Every generated card records the Wiktionary revision it was built from. The
+refresh workflow asks the MediaWiki API for the current revision of many pages
+per request (up to 50 titles each) and regenerates only the cards whose page
+has changed since.
+"""
+
+import json
+import logging
+import subprocess
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlencode
+
+from appdirs import user_data_dir
+
+from .cache import get_result_cache
+from .fetcher import fetch
+from .file_manager import FileManager
+from .generator import MarkdownGenerator
+from .keys import PageKey, canonical_key
+from .parser import WiktionaryParser
+from .processor import ContentProcessor
+from .sources import PageSource
+from .utils import file_lock, write_atomic
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(user_data_dir("wiktionary_vocab_card"))
+REVISIONS_FILE = DATA_DIR / "revisions.json"
+
+# MediaWiki accepts at most 50 titles per query for regular clients
+MAX_TITLES_PER_QUERY = 50
+
+
+class RevisionStore:
+    """Remembers the revision id each card was generated from, per page key."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else REVISIONS_FILE
+        self._revisions: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, int]:
+        if self._revisions is None:
+            try:
+                self._revisions = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._revisions = {}
+        return self._revisions
+
+    def get(self, url: str) -> Optional[int]:
+        """Recorded revision id for the page at url, if any."""
+        with self._lock:
+            return self._load().get(str(canonical_key(url)))
+
+    def set(self, url: str, revision_id: int) -> None:
+        """Record the revision id for the page at url and save the store."""
+        with self._lock, file_lock(self.path.with_suffix(".lock")):
+            # Other processes may have recorded revisions since we read the file
+            self._revisions = None
+            self._load()[str(canonical_key(url))] = revision_id
+            data = json.dumps(self._revisions, ensure_ascii=False, indent=1)
+            write_atomic(self.path, data.encode("utf-8"))
+
+
+def record_revision(parser, store: Optional[RevisionStore] = None) -> None:
+    """Record the revision a freshly parsed page came from."""
+    revision_id = getattr(parser, "revision_id", None)
+    if isinstance(revision_id, int):
+        (store or RevisionStore()).set(parser.url, revision_id)
+
+
+def _api_url(key: PageKey, titles: List[str]) -> str:
+    query = {
+        "action": "query",
+        "prop": "revisions",
+        "rvprop": "ids",
+        "titles": "|".join(titles),
+        "format": "json",
+        "formatversion": "2",
+    }
+    return f"{key.scheme}://{key.site}/w/api.php?{urlencode(query)}"
+
+
+def query_revisions(keys: Iterable[PageKey]) -> Dict[PageKey, Optional[int]]:
+    """Look up the current revision id of many pages.
+
+    Pages are grouped per site and queried MAX_TITLES_PER_QUERY at a time.
+
+    Args:
+        keys: Pages to look up
+
+    Returns:
+        Mapping of page key to current revision id (None for missing pages)
+    """
+    by_site: Dict[tuple, List[PageKey]] = {}
+    for key in dict.fromkeys(keys):
+        by_site.setdefault((key.scheme, key.site), []).append(key)
+
+    revisions: Dict[PageKey, Optional[int]] = {}
+    for site_keys in by_site.values():
+        for start in range(0, len(site_keys), MAX_TITLES_PER_QUERY):
+            batch = site_keys[start : start + MAX_TITLES_PER_QUERY]
+            data = fetch(_api_url(batch[0], [key.title for key in batch])).json()
+            query = data.get("query", {})
+
+            # The API may normalize titles; map them back to what we asked for
+            renamed = {n["to"]: n["from"] for n in query.get("normalized", [])}
+            current = {}
+            for page in query.get("pages", []):
+                page_revisions = page.get("revisions") or [{}]
+                title = renamed.get(page["title"], page["title"])
+                current[title] = page_revisions[0].get("revid")
+
+            for key in batch:
+                revisions[key] = current.get(key.title)
+
+    return revisions
+
+
+@dataclass
+class CardRevision:
+    """Recorded and current revision of the page behind one card."""
+
+    path: Path
+    url: str
+    recorded: Optional[int] = None
+    current: Optional[int] = None
+
+    @property
+    def changed(self) -> bool:
+        """True if the page exists and differs from what the card was built from."""
+        return self.current is not None and self.current != self.recorded
+
+
+def check_cards(
+    card_paths: Iterable[Path],
+    file_manager: FileManager,
+    store: Optional[RevisionStore] = None,
+    only: Optional[Set[PageKey]] = None,
+) -> List[CardRevision]:
+    """Compare the recorded and current revision of every card's page.
+
+    Cards without a Wiktionary URL are skipped. Cards generated before revisions
+    were recorded count as changed.
+
+    Args:
+        card_paths: Wordcard files to check
+        file_manager: FileManager used to read the cards
+        store: Revision store. Defaults to the per-user store.
+        only: Restrict the check to cards for these pages
+
+    Returns:
+        One CardRevision per checked card
+    """
+    store = store or RevisionStore()
+    cards = []
+    for path in card_paths:
+        url = file_manager.parse_existing_wordcard(path).get("url")
+        if not url or (only is not None and canonical_key(url) not in only):
+            continue
+        cards.append(CardRevision(path=path, url=url, recorded=store.get(url)))
+
+    current = query_revisions(canonical_key(card.url) for card in cards)
+    for card in cards:
+        card.current = current.get(canonical_key(card.url))
+    return cards
+
+
+def regenerate_card(
+    card: CardRevision,
+    source: PageSource,
+    config: Dict[str, Any],
+    file_manager: FileManager,
+    store: Optional[RevisionStore] = None,
+) -> None:
+    """Re-parse the page behind a card and update the card in place."""
+    backend = config.get("extraction", {}).get("html_parser")
+    parser = WiktionaryParser(
+        card.url,
+        source=source,
+        backend=backend,
+        result_cache=get_result_cache(config),
+    ).parse()
+    _rewrite_card(parser, card.path, config, file_manager, store)
+
+
+def _rewrite_card(
+    parser,
+    path: Path,
+    config: Dict[str, Any],
+    file_manager: FileManager,
+    store: Optional[RevisionStore],
+) -> None:
+    content = ContentProcessor(parser, config).process_content()
+    generator = MarkdownGenerator(parser, content, config)
+    if not file_manager.update_wordcard(path, generator._create_content_structure()):
+        raise RuntimeError(f"Failed to update wordcard {path}")
+
+    record_revision(parser, store)
+
+
+def revalidate_card(
+    url: str,
+    card_path: Optional[Path],
+    source: PageSource,
+    config: Dict[str, Any],
+    file_manager: FileManager,
+    store: Optional[RevisionStore] = None,
+) -> bool:
+    """Re-fetch a page that was served stale and update its card if it changed.
+
+    Args:
+        url: Page the card was generated from
+        card_path: The card, if it was written to a file
+        source: Page source that revalidates cached pages
+        config: Configuration dictionary
+        file_manager: FileManager used to update the card
+        store: Revision store. Defaults to the per-user store.
+
+    Returns:
+        True if the card was rewritten
+    """
+    store = store or RevisionStore()
+    recorded = store.get(url)
+    backend = config.get("extraction", {}).get("html_parser")
+    parser = WiktionaryParser(
+        url, source=source, backend=backend, result_cache=get_result_cache(config)
+    ).parse()
+
+    # Without a known revision there is nothing to compare; rewriting is safe
+    if parser.revision_id is not None and parser.revision_id == recorded:
+        return False
+    if card_path is None or not card_path.exists():
+        record_revision(parser, store)
+        return False
+
+    _rewrite_card(parser, card_path, config, file_manager, store)
+    logger.info(f"Updated {card_path}: revision {recorded} -> {parser.revision_id}")
+    return True
+
+
+def revalidate_in_background(
+    url: str, card_path: Optional[Path] = None, fetch_mode: Optional[str] = None
+) -> None:
+    """Start a detached ``wikt-vocab revalidate`` for a page served stale."""
+    command = [sys.executable, "-m", "wiktionary_vocab_card", "revalidate", url]
+    if card_path is not None:
+        command += ["--card", str(Path(card_path).resolve())]
+    if fetch_mode:
+        command += ["--fetch-mode", fetch_mode]
+    # Its own session, so it outlives the interactive command and its terminal
+    subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
@@ -0,0 +1,295 @@
+"""
+Page Source Module
+
+A page source turns a Wiktionary URL into the raw HTML of the page. The parser
+only talks to this interface, so the same parsing code runs against the live
+site or against stored snapshots (a directory or an archive of
+``<title>.html`` files such as ``examples/``) with no network at all.
+"""
+
+import codecs
+import json
+import logging
+import tarfile
+import threading
+import zipfile
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode, urlsplit
+
+from .cache import PageCache
+from .config import load_config
+from .fetcher import fetch_content
+from .keys import canonical_key
+
+logger = logging.getLogger(__name__)
+
+
+def title_from_url(url: str) -> str:
+    """Extract the page title from a Wiktionary URL (or return a bare word)."""
+    return canonical_key(url).title
+
+
+class PageSource:
+    """Interface for anything that can provide the HTML of a Wiktionary page."""
+
+    def get_page(self, url: str) -> bytes:
+        """Return the raw HTML for url."""
+        raise NotImplementedError
+
+
+class HttpSource(PageSource):
+    """Fetches pages from Wiktionary through the shared session and page cache.
+
+    With max_stale, cached pages up to that many seconds past their TTL are
+    served as they are; served_stale then tells the caller to revalidate later.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[PageCache] = None,
+        revalidate: bool = False,
+        max_stale: float = 0.0,
+    ):
+        self.cache = cache
+        self.revalidate = revalidate
+        self.max_stale = max_stale
+        self.served_stale = False
+
+    def _mark_stale(self, url: str) -> None:
+        self.served_stale = True
+
+    def _fetch(self, url: str, **kwargs) -> bytes:
+        return fetch_content(
+            url,
+            cache=self.cache,
+            revalidate=self.revalidate,
+            max_stale=self.max_stale,
+            on_stale=self._mark_stale,
+            **kwargs,
+        )
+
+    def get_page(self, url: str) -> bytes:
+        return self._fetch(url)
+
+
+class SectionEndScanner(HTMLParser):
+    """Incremental tokenizer that spots the h2 following the Finnish heading.
+
+    Instances are fed raw response chunks and return True once the next
+    top-level language heading has started, i.e. once everything the parser
+    needs has been received.
+    """
+
+    def __init__(self, section_id: str = "Finnish"):
+        super().__init__(convert_charrefs=False)
+        self.section_id = section_id
+        self.in_section = False
+        self.done = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "h2":
+            return
+        if self.in_section:
+            self.done = True
+        elif dict(attrs).get("id") == self.section_id:
+            self.in_section = True
+
+    def __call__(self, chunk: bytes) -> bool:
+        if not self.done:
+            self.feed(self._decoder.decode(chunk))
+        return self.done
+
+
+class StreamingSource(HttpSource):
+    """Downloads the full page URL but stops at the end of the Finnish section.
+
+    Languages sorting after Finnish are never transferred. Pages where Finnish is
+    the last language are read completely.
+    """
+
+    def get_page(self, url: str) -> bytes:
+        return self._fetch(url, should_stop=SectionEndScanner())
+
+
+class SectionApiSource(HttpSource):
+    """Fetches only the Finnish section through the MediaWiki parse API.
+
+    The first request resolves the index of the top-level Finnish section, the
+    second one returns the rendered HTML of just that section. The parser then
+    works on a small fragment instead of the full multi-language article.
+    """
+
+    language = "Finnish"
+
+    def api_url(self, url: str, **params) -> str:
+        """Build an api.php URL on the same host as the page URL."""
+        parts = urlsplit(url)
+        query = {"format": "json", "formatversion": "2", **params}
+        return f"{parts.scheme}://{parts.netloc}/w/api.php?{urlencode(query)}"
+
+    def _get_json(self, api_url: str) -> Dict[str, Any]:
+        data = json.loads(self._fetch(api_url))
+        if "error" in data:
+            raise ValueError(f"MediaWiki API error: {data['error'].get('info')}")
+        return data
+
+    def find_section_index(self, url: str) -> str:
+        """Return the parse API index of the language section of the page."""
+        title = title_from_url(url)
+        data = self._get_json(
+            self.api_url(url, action="parse", page=title, prop="sections")
+        )
+
+        for section in data["parse"]["sections"]:
+            if section.get("toclevel") == 1 and section.get("line") == self.language:
+                return section["index"]
+
+        raise ValueError(f"{self.language} section not found")
+
+    def get_page(self, url: str) -> bytes:
+        title = title_from_url(url)
+        index = self.find_section_index(url)
+        data = self._get_json(
+            self.api_url(
+                url,
+                action="parse",
+                page=title,
+                section=index,
+                prop="text|revid",
+                disableeditsection="1",
+                disablelimitreport="1",
+            )
+        )
+        fragment = data["parse"]["text"]
+
+        # Older renderers omit the heading from section output; the parser
+        # anchors on it, so restore it when missing
+        if f'id="{self.language}"' not in fragment:
+            fragment = (
+                '<div class="mw-heading mw-heading2">'
+                f'<h2 id="{self.language}">{self.language}</h2></div>\n{fragment}'
+            )
+
+        revision = data["parse"].get("revid")
+        head = f'<meta name="revision-id" content="{revision}">' if revision else ""
+        return f"<html><head>{head}</head><body>{fragment}</body></html>".encode(
+            "utf-8"
+        )
+
+
+class SnapshotSource(PageSource):
+    """Serves pages from stored HTML snapshots keyed by page title.
+
+    The snapshot location can be a directory or a .zip/.tar(.gz/.xz/.bz2)
+    archive. Files are looked up as ``<title>.html``, with spaces and
+    underscores treated alike.
+
+    An archive is opened and indexed once and then read from by every lookup.
+    Members of a zip or plain tar are read with one seek; a compressed tar has
+    to be decompressed up to the member, so prefer those for large batches.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Snapshot location does not exist: {self.path}")
+        self._archive = None
+        # Snapshot file name -> ZipInfo or TarInfo of its member
+        self._archive_members: Optional[Dict[str, Any]] = None
+        # Archive objects keep one file position; reads must not interleave
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _candidate_names(title: str):
+        names = [f"{title}.html"]
+        if " " in title:
+            names.append(f"{title.replace(' ', '_')}.html")
+        return names
+
+    def _load_archive_members(self) -> Dict[str, Any]:
+        """Open the archive and map snapshot file names to its members."""
+        if self._archive_members is None:
+            if zipfile.is_zipfile(self.path):
+                self._archive = zipfile.ZipFile(self.path)
+                members = [(m.filename, m) for m in self._archive.infolist()]
+            else:
+                self._archive = tarfile.open(self.path)
+                members = [
+                    (m.name, m) for m in self._archive.getmembers() if m.isfile()
+                ]
+            self._archive_members = {Path(name).name: m for name, m in members}
+        return self._archive_members
+
+    def _read_member(self, member) -> bytes:
+        if isinstance(self._archive, zipfile.ZipFile):
+            return self._archive.read(member)
+        return self._archive.extractfile(member).read()
+
+    def close(self) -> None:
+        """Close the archive, if one was opened."""
+        with self._lock:
+            if self._archive is not None:
+                self._archive.close()
+            self._archive = None
+            self._archive_members = None
+
+    def get_page(self, url: str) -> bytes:
+        title = title_from_url(url)
+
+        if self.path.is_dir():
+            for name in self._candidate_names(title):
+                candidate = self.path / name
+                if candidate.exists():
+                    logger.info(f"Using snapshot {candidate}")
+                    return candidate.read_bytes()
+        else:
+            with self._lock:
+                members = self._load_archive_members()
+                for name in self._candidate_names(title):
+                    if name in members:
+                        logger.info(f"Using snapshot {name} from {self.path}")
+                        return self._read_member(members[name])
+
+        raise FileNotFoundError(f"No snapshot for '{title}' in {self.path}")
+
+
+def get_page_source(
+    config: Optional[Dict[str, Any]] = None,
+    snapshots: Optional[str] = None,
+    fetch_mode: Optional[str] = None,
+    revalidate: bool = False,
+    max_stale: float = 0.0,
+) -> PageSource:
+    """Build the page source selected by the CLI or config.yaml.
+
+    Args:
+        config: Optional configuration dictionary. If None, loads from config file.
+        snapshots: Snapshot directory or archive. Overrides the configuration.
+        fetch_mode: "page", "stream" or "section". Overrides the configuration.
+        revalidate: Make HTTP sources revalidate cached pages even when fresh
+        max_stale: Let HTTP sources serve cached pages up to this many seconds
+            past their TTL without revalidating them
+
+    Returns:
+        A SnapshotSource when snapshots are selected, otherwise an HTTP source
+        for the selected fetch mode
+    """
+    if snapshots:
+        return SnapshotSource(Path(snapshots))
+
+    if config is None:
+        config = load_config()
+    source_config = config.get("source", {})
+
+    if source_config.get("type") == "snapshot":
+        return SnapshotSource(Path(source_config["snapshot_path"]))
+
+    fetch_mode = fetch_mode or source_config.get("fetch_mode", "page")
+    if fetch_mode == "section":
+        return SectionApiSource(revalidate=revalidate, max_stale=max_stale)
+    if fetch_mode == "stream":
+        return StreamingSource(revalidate=revalidate, max_stale=max_stale)
+    return HttpSource(revalidate=revalidate, max_stale=max_stale)
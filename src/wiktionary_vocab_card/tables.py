@@ -0,0 +1,105 @@
+"""
+Inflection Table Layout
+
+Lays an HTML table out into a Paradigm, a rectangular grid of cells, the way a browser
+places cells: a cell spanning rows or columns occupies every slot it covers, so
+the cells after it land in the right column. Only the table's own rows and cells
+are read; tables nested in a cell (possessive forms) contribute no text and are
+left in the tree, so laying out never modifies it.
+"""
+
+import re
+from typing import List
+
+from .html_backends import text_outside
+from .paradigm import Cell, Paradigm
+
+# Browsers clamp spans to these limits
+MAX_COLSPAN = 1000
+MAX_ROWSPAN = 65534
+
+_LEADING_DIGITS = re.compile(r"\s*(\d+)")
+
+
+def _span(value, limit: int) -> int:
+    """Parse a colspan/rowspan attribute like a browser: leading digits,
+    defaulting to 1."""
+    match = _LEADING_DIGITS.match(value or "")
+    if not match:
+        return 1
+    return min(max(int(match.group(1)), 1), limit)
+
+
+def table_rows(table) -> list:
+    """The table's own tr elements, including those in thead/tbody/tfoot."""
+    rows = []
+    for child in table.find_all(["tr", "thead", "tbody", "tfoot"], recursive=False):
+        if child.name == "tr":
+            rows.append(child)
+        else:
+            rows.extend(child.find_all("tr", recursive=False))
+    return rows
+
+
+def table_cell(cell) -> Cell:
+    """A th cell as a header label, a td cell as its forms or as a note.
+
+    Whitespace is collapsed and nested tables are left out. Line breaks in a
+    td separate alternative forms (e.g. "aseiden<br>aseitten").
+    """
+    parts = text_outside(cell, "table", br="\0").split("\0")
+    values = [" ".join(part.split()) for part in parts]
+    values = [value for value in values if value]
+    if cell.name == "th":
+        kind = "header"
+    elif any(name.endswith("notes") for name in cell.get("class", [])):
+        kind = "note"
+    else:
+        return Cell(tuple(values))
+    return Cell((" ".join(values),) if values else (), kind)
+
+
+def table_paradigm(table) -> Paradigm:
+    """Lay a table out into a Paradigm, placing cells as a browser does."""
+    rows = table_rows(table)
+    cells = []
+    grid = [[] for _ in rows]
+
+    for r, row in enumerate(rows):
+        column = 0
+        for cell in row.find_all(["th", "td"], recursive=False):
+            # Skip slots taken by rowspans from above
+            while column < len(grid[r]) and grid[r][column] >= 0:
+                column += 1
+            colspan = _span(cell.get("colspan"), MAX_COLSPAN)
+            rowspan = _span(cell.get("rowspan"), MAX_ROWSPAN)
+
+            index = len(cells)
+            cells.append(table_cell(cell))
+            # Rowspans reaching past the last row are cut off, as in browsers
+            for line in grid[r : r + rowspan]:
+                if len(line) < column + colspan:
+                    line.extend([-1] * (column + colspan - len(line)))
+                line[column : column + colspan] = [index] * colspan
+            column += colspan
+
+    width = max((len(line) for line in grid), default=0)
+    return Paradigm(
+        tuple(cells), tuple(tuple(line + [-1] * (width - len(line))) for line in grid)
+    )
+
+
+def table_grid(table) -> List[List[str]]:
+    """Lay a table out into rows of cell texts of equal length.
+
+    Slots covered by a spanning cell, beyond its first, and slots no cell
+    covers are empty strings.
+    """
+    return table_paradigm(table).text_grid()
+
+
+def html_table_to_markdown(table) -> str:
+    """Convert a table element to Markdown without modifying it."""
+    if not table:
+        return ""
+    return table_paradigm(table).to_markdown()
@@ -1,8 +1,22 @@
 import json
+import os
 import subprocess
+import tempfile
+import time
 import urllib.parse
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# How often a blocking lock_file() retries a lock held by another process on
+# Windows, where msvcrt cannot wait indefinitely
+LOCK_RETRY_SECONDS = 0.05
 
 
 def add_word(word, url):
@@ -17,19 +31,101 @@ def add_word(word, url):
 def generate_all_examples():
     with open("./examples/examples.json", "r", encoding="utf-8") as f:
         data = json.load(f)
-    for word, url in data.items():
-        print(f"Regenerating {word}...")
-        cmd = [
-            "wikt-vocab",
-            "generate",
-            url,
-            "-o",
-            f"examples/{word}.md",
-            "-t",
-            "examples",
-        ]
-        subprocess.run(cmd, check=True)
-        print(f"✓ examples/{word}.md")
+    print(f"Regenerating {len(data)} examples...")
+    cmd = [
+        "wikt-vocab",
+        "generate-batch",
+        *data.values(),
+        "-d",
+        "examples",
+        "-t",
+        "examples",
+        "--snapshots",
+        "examples",
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write data to path so readers never observe a partially written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration such as "90", "45m", "12h" or "30d" into seconds."""
+    value = value.strip().lower()
+    unit = DURATION_UNITS.get(value[-1:]) if value else None
+    number = value[:-1] if unit else value
+    try:
+        seconds = float(number) * (unit or 1)
+    except ValueError:
+        raise ValueError(f"Invalid duration: {value!r} (use e.g. 90s, 45m, 12h, 30d)")
+    if seconds < 0:
+        raise ValueError(f"Invalid duration: {value!r} is negative")
+    return seconds
+
+
+def lock_file(f, blocking: bool = True) -> bool:
+    """Take an exclusive lock on an open file, across processes.
+
+    Returns False instead of waiting when blocking is False and another process
+    holds the lock.
+    """
+    if fcntl is None:
+        # msvcrt locks bytes from the current position: always the first one
+        while True:
+            f.seek(0)
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+            time.sleep(LOCK_RETRY_SECONDS)
+    flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+    try:
+        fcntl.flock(f.fileno(), flags)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def unlock_file(f) -> None:
+    """Release a lock taken with lock_file."""
+    if fcntl is None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """Hold an exclusive lock on path (created if missing).
+
+    Yields whether the lock is held, which is only False when blocking is False
+    and another process holds it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        held = lock_file(f, blocking)
+        try:
+            yield held
+        finally:
+            if held:
+                unlock_file(f)
 
 
 def open_in_obsidian(
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent batch generation, run offline against examples/.
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from wiktionary_vocab_card.batch import read_items, run_batch, to_url
+from wiktionary_vocab_card.cache import ResultCache, set_result_cache
+from wiktionary_vocab_card.cli import cli
+from wiktionary_vocab_card.sources import SnapshotSource
+
+EXAMPLES_DIR = Path(__file__).parent / "examples"
+
+CONFIG = {
+    "custom_text": "",
+    "table_folding": True,
+    "file_management": {"check_existing": False},
+}
+
+
+class TestBatchHelpers(unittest.TestCase):
+    def test_to_url(self):
+        self.assertEqual(to_url("yskiä"), "https://en.wiktionary.org/wiki/yski%C3%A4")
+        self.assertEqual(
+            to_url("olla hyvä"), "https://en.wiktionary.org/wiki/olla_hyv%C3%A4"
+        )
+        self.assertEqual(
+            to_url("https://en.wiktionary.org/wiki/ase#Finnish"),
+            "https://en.wiktionary.org/wiki/ase",
+        )
+
+    def test_read_items(self):
+        lines = ["ase\n", "\n", "# comment\n", "  pala  \n"]
+        self.assertEqual(read_items(lines), ["ase", "pala"])
+
+
+class TestRunBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        revisions = patch(
+            "wiktionary_vocab_card.revisions.REVISIONS_FILE",
+            Path(self.tmp.name) / "revisions.json",
+        )
+        revisions.start()
+        self.addCleanup(revisions.stop)
+        self.results = ResultCache(Path(self.tmp.name) / "results")
+        set_result_cache(self.results)
+
+    def tearDown(self):
+        set_result_cache(None)
+        self.results.store.close()
+        self.tmp.cleanup()
+
+    def test_generates_cards_and_reports_failures(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            seen = []
+            results = run_batch(
+                ["ase", "https://en.wiktionary.org/wiki/yski%C3%A4", "nonexistent"],
+                CONFIG,
+                source=SnapshotSource(EXAMPLES_DIR),
+                workers=3,
+                article="examples",
+                output_dir=Path(tmp),
+                on_result=seen.append,
+            )
+
+            self.assertEqual(len(seen), 3)
+            self.assertEqual([r.item for r in results][0], "ase")
+            self.assertEqual([r.ok for r in results], [True, True, False])
+            self.assertIn("#hame", (Path(tmp) / "ase.md").read_text(encoding="utf-8"))
+            self.assertTrue((Path(tmp) / "yskiä.md").exists())
+
+    def test_cli_reads_stdin(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            runner = CliRunner()
+            result = runner.invoke(
+                cli,
+                ["generate-batch", "--snapshots", str(EXAMPLES_DIR), "-d", tmp],
+                input="ase\ntili\nnonexistent\n",
+            )
+
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("Generated 2 of 3 wordcards", result.output)
+            self.assertIn("failed: nonexistent", result.output)
+            self.assertTrue((Path(tmp) / "tili.md").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
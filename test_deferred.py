@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tests for the deferred generation queue and the drain command.
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import requests
+from click.testing import CliRunner
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import wiktionary_vocab_card.deferred as deferred
+from wiktionary_vocab_card import fetcher
+from wiktionary_vocab_card.cache import ResultCache, set_result_cache
+from wiktionary_vocab_card.cli import cli
+from wiktionary_vocab_card.deferred import GenerationQueue, drain_queue, pending_count
+
+EXAMPLES_DIR = Path(__file__).parent / "examples"
+
+CONFIG = {
+    "custom_text": "",
+    "table_folding": True,
+    "file_management": {"check_existing": False},
+    "source": {"type": "snapshot", "snapshot_path": str(EXAMPLES_DIR)},
+    "queue": {"max_attempts": 3, "backoff_base": 60.0, "backoff_max": 600.0},
+}
+
+
+class OfflineParser:
+    def __init__(self, url, *args, **kwargs):
+        self.url = url
+
+    def parse(self):
+        raise requests.ConnectionError("Network is unreachable")
+
+
+class TestGenerationQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = GenerationQueue(Path(self.tmp.name) / "queue.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_requeue_replaces_pending_request(self):
+        self.queue.add("ase", "first")
+        self.queue.add("https://en.wiktionary.org/wiki/ase#Finnish", "second")
+        self.queue.add("ase", "to a file", output=Path(self.tmp.name) / "ase.md")
+
+        requests_ = self.queue.all_requests()
+        self.assertEqual(len(self.queue), 2)
+        self.assertEqual([r.article for r in requests_], ["second", "to a file"])
+        self.assertEqual(requests_[0].url, "https://en.wiktionary.org/wiki/ase")
+
+    def test_claims_are_leased(self):
+        self.queue.add("ase")
+        self.assertEqual(len(self.queue.claim_due()), 1)
+        # A second drain running at the same time gets nothing
+        self.assertEqual(self.queue.claim_due(), [])
+
+        request = self.queue.all_requests()[0]
+        self.queue.defer(request.id, "timed out", delay=0)
+        self.assertEqual(self.queue.claim_due()[0].attempts, 1)
+
+    def test_failed_requests_can_be_retried(self):
+        self.queue.add("ase")
+        request = self.queue.claim_due()[0]
+        self.queue.fail(request.id, "not found")
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(self.queue.all_requests()[0].status, "failed")
+
+        self.assertEqual(self.queue.retry_failed(), 1)
+        self.assertEqual(len(self.queue.claim_due()), 1)
+
+    def test_pending_count_does_not_create_the_queue(self):
+        self.addCleanup(setattr, deferred, "_default_queue", None)
+        path = Path(self.tmp.name) / "missing" / "queue.sqlite3"
+        config = {"queue": {"path": str(path)}}
+        self.assertEqual(pending_count(config), 0)
+        self.assertFalse(path.parent.exists())
+
+        GenerationQueue(path).add("ase")
+        self.assertEqual(pending_count(config), 1)
+
+
+class TestDrain(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.tmp.name) / "cards"
+        self.queue = GenerationQueue(Path(self.tmp.name) / "queue.sqlite3")
+        revisions = patch(
+            "wiktionary_vocab_card.revisions.REVISIONS_FILE",
+            Path(self.tmp.name) / "revisions.json",
+        )
+        revisions.start()
+        self.addCleanup(revisions.stop)
+        self.results = ResultCache(Path(self.tmp.name) / "results")
+        set_result_cache(self.results)
+
+    def tearDown(self):
+        set_result_cache(None)
+        self.results.store.close()
+        self.tmp.cleanup()
+
+    def test_generates_due_requests(self):
+        self.queue.add("ase", "article text")
+        self.queue.add("tili", output=Path(self.tmp.name) / "own" / "tili.md")
+        self.queue.add("nonexistent")
+
+        stats = drain_queue(self.queue, CONFIG, workers=2, output_dir=self.output_dir)
+
+        self.assertEqual(len(stats.generated), 2)
+        self.assertEqual(
+            [r.item for r in stats.failed],
+            ["https://en.wiktionary.org/wiki/nonexistent"],
+        )
+        card = (self.output_dir / "ase.md").read_text(encoding="utf-8")
+        self.assertIn("article text", card)
+        self.assertTrue((Path(self.tmp.name) / "own" / "tili.md").exists())
+        self.assertEqual([r.status for r in self.queue.all_requests()], ["failed"])
+
+    def test_offline_requests_back_off(self):
+        for word in ["ase", "tili", "pala"]:
+            self.queue.add(word)
+
+        with patch("wiktionary_vocab_card.deferred.create_parser", OfflineParser):
+            stats = drain_queue(self.queue, CONFIG, workers=1)
+
+        self.assertEqual(len(stats.deferred), 3)
+        requests_ = self.queue.all_requests()
+        # Only the first request was tried; the rest were not sent once the
+        # network proved unreachable
+        self.assertEqual(sorted(r.attempts for r in requests_), [0, 0, 1])
+        self.assertEqual(len(self.queue), 3)
+        self.assertEqual(self.queue.claim_due(), [])
+
+
+class TestCommands(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        deferred._default_queue = GenerationQueue(Path(self.tmp.name) / "q.sqlite3")
+        revisions = patch(
+            "wiktionary_vocab_card.revisions.REVISIONS_FILE",
+            Path(self.tmp.name) / "revisions.json",
+        )
+        revisions.start()
+        self.addCleanup(revisions.stop)
+        self.results = ResultCache(Path(self.tmp.name) / "results")
+        set_result_cache(self.results)
+
+    def tearDown(self):
+        set_result_cache(None)
+        self.results.store.close()
+        deferred._default_queue = None
+        fetcher.reset_session()
+        self.tmp.cleanup()
+
+    def test_offline_generate_is_queued_then_drained(self):
+        runner = CliRunner()
+        card_path = Path(self.tmp.name) / "ase.md"
+        with patch("wiktionary_vocab_card.cli.create_parser", OfflineParser):
+            result = runner.invoke(
+                cli, ["generate", "ase", "-t", "my article", "-o", str(card_path)]
+            )
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Queued ase (1 waiting)", result.output)
+
+        result = runner.invoke(cli, ["generate", "tili", "--defer"])
+        self.assertIn("Queued tili (2 waiting)", result.output)
+
+        result = runner.invoke(cli, ["drain", "--list"])
+        self.assertIn(
+            f"pending  https://en.wiktionary.org/wiki/ase -> {card_path}", result.output
+        )
+
+        with patch("wiktionary_vocab_card.cli.load_config", return_value=CONFIG):
+            result = runner.invoke(cli, ["drain", "-d", self.tmp.name])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn(
+            "Generated 2, deferred 0, failed 0; 0 still queued", result.output
+        )
+        self.assertIn("my article", card_path.read_text(encoding="utf-8"))
+        self.assertTrue((Path(self.tmp.name) / "tili.md").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for ingesting a Wiktionary XML dump into the local entry store, using a
+small synthetic dump.
+"""
+
+import bz2
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from click.testing import CliRunner
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import wiktionary_vocab_card.entries as entries
+from wiktionary_vocab_card.cli import cli
+from wiktionary_vocab_card.dump import extract_entry, ingest_dump, strip_wikitext
+from wiktionary_vocab_card.entries import EntryParser, EntryStore
+from wiktionary_vocab_card.generator import MarkdownGenerator
+from wiktionary_vocab_card.processor import ContentProcessor
+
+ASE = """==Finnish==
+
+===Etymology===
+From {{inh|fi|urj-fin-pro|*ase}}.
+
+===Noun===
+{{fi-noun}}
+
+# [[weapon]], [[arm]]
+#: {{ux|fi|Hänellä oli '''ase'''.}}
+# {{lb|fi|colloquial}} [[gun]]
+
+====Declension====
+{{fi-decl-hame|as|||e|a}}
+
+----
+
+==Estonian==
+
+===Noun===
+# [[weapon]]
+"""
+
+PALA = """==Finnish==
+
+===Etymology 1===
+
+====Noun====
+# [[piece]], [[bit]]
+
+=====Declension=====
+{{fi-decl-kala|pa|l|l|a}}
+
+===Etymology 2===
+
+====Verb====
+# {{inflection of|fi|palaa||pres|ind|3s}}
+
+=====Conjugation=====
+{{fi-conj-sanoa|pal|||a}}
+"""
+
+DOG = """==English==
+
+===Noun===
+# A [[mammal]].
+"""
+
+PAGES = [
+    ("ase", 101, 0, ASE),
+    ("pala", 102, 0, PALA),
+    ("dog", 103, 0, DOG),
+    ("Talk:ase", 104, 1, ASE),
+]
+
+
+def write_dump(path: Path) -> None:
+    parts = ['<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/">']
+    for page_id, (title, revision_id, ns, text) in enumerate(PAGES, 1):
+        parts.append(
+            f"<page><title>{escape(title)}</title><ns>{ns}</ns><id>{page_id}</id>"
+            f"<revision><id>{revision_id}</id><parentid>1</parentid>"
+            f"<contributor><username>x</username><id>9</id></contributor>"
+            f'<text bytes="{len(text)}" xml:space="preserve">{escape(text)}</text>'
+            f"</revision></page>"
+        )
+    parts.append("</mediawiki>")
+    with bz2.open(path, "wt", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+class TestWikitextExtraction(unittest.TestCase):
+    def test_strip_wikitext(self):
+        self.assertEqual(
+            strip_wikitext(" {{lb|fi|colloquial}} [[gun]], [[firearm|piece]]"),
+            "(colloquial) gun, piece",
+        )
+        self.assertEqual(
+            strip_wikitext("'''bold'''<ref>source</ref> {{unknown|x}}"), "bold"
+        )
+
+    def test_single_word_type(self):
+        entry = extract_entry("ase", ASE)
+        self.assertEqual(entry["word_types"], ["noun"])
+        self.assertEqual(entry["kotus_types"], ["hame"])
+        self.assertEqual(entry["definitions"], ["1. weapon, arm\n2. (colloquial) gun"])
+        self.assertIn("| Declension | hame |", entry["conjugation_tables"][0])
+
+    def test_several_etymologies(self):
+        entry = extract_entry("pala", PALA)
+        self.assertEqual(entry["word_types"], ["noun", "verb"])
+        self.assertEqual(entry["kotus_types"], ["kala", "sanoa"])
+        self.assertEqual(entry["definitions"][1], "1. inflection of palaa")
+        self.assertIn("| Gradation | l-l |", entry["conjugation_tables"][0])
+        self.assertIn("| Conjugation | sanoa |", entry["conjugation_tables"][1])
+
+    def test_non_finnish_page(self):
+        self.assertIsNone(extract_entry("dog", DOG))
+
+
+class TestIngestDump(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dump = Path(self.tmp.name) / "enwiktionary-test-pages-articles.xml.bz2"
+        write_dump(self.dump)
+        self.store = EntryStore(Path(self.tmp.name) / "entries.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ingest_keeps_finnish_main_namespace_pages(self):
+        stats = ingest_dump(self.dump, self.store, batch_size=1)
+
+        self.assertEqual(stats.pages, 3)
+        self.assertEqual(stats.entries, 2)
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.store.get("ase")["revision_id"], 101)
+        self.assertIsNone(self.store.get("dog"))
+
+        # Ingesting again replaces entries instead of duplicating them
+        ingest_dump(self.dump, self.store)
+        self.assertEqual(len(self.store), 2)
+
+    def test_entry_parser_feeds_the_generator(self):
+        ingest_dump(self.dump, self.store)
+        parser = EntryParser(
+            "https://en.wiktionary.org/wiki/pala#Finnish", self.store
+        ).parse()
+
+        config = {"table_folding": True, "file_management": {"check_existing": False}}
+        content = ContentProcessor(parser, config).process_content()
+        card = MarkdownGenerator(parser, content, config).generate_card()
+
+        self.assertEqual(content["word_types"], ["noun", "verb"])
+        self.assertEqual(parser.revision_id, 102)
+        self.assertIn("#noun #verb #kala #sanoa #flashcards", card)
+        self.assertIn("1. piece, bit", card)
+
+    def test_missing_entry(self):
+        with self.assertRaises(LookupError):
+            EntryParser("koira", self.store).parse()
+
+    def test_cli(self):
+        entries._default_store = self.store
+        try:
+            result = CliRunner().invoke(cli, ["ingest-dump", str(self.dump)])
+        finally:
+            entries._default_store = None
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Ingested 2 Finnish entries from 3 pages", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -26,8 +26,7 @@ from click.testing import CliRunner
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from wiktionary_vocab_card.cli import cli
-from wiktionary_vocab_card.config import (is_vault_configured, load_config,
-                                          update_config)
+from wiktionary_vocab_card.config import is_vault_configured, load_config, update_config
 from wiktionary_vocab_card.file_manager import FileManager
 from wiktionary_vocab_card.generator import MarkdownGenerator
 from wiktionary_vocab_card.processor import ContentProcessor
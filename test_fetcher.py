@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared HTTP fetching layer.
+
+A local stand-in server replaces Wiktionary so the tests never touch the
+network.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from wiktionary_vocab_card import fetcher
+from wiktionary_vocab_card.cache import PageCache
+from wiktionary_vocab_card.config import DEFAULT_CONFIG
+from wiktionary_vocab_card.parser import WiktionaryParser
+from wiktionary_vocab_card.sources import SectionApiSource, StreamingSource
+
+EXAMPLES_DIR = Path(__file__).parent / "examples"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves a tiny page and records every request it sees."""
+
+    protocol_version = "HTTP/1.1"
+    body = b"<html><body><h2 id='Finnish'>Finnish</h2></body></html>"
+
+    def do_GET(self):
+        self.server.seen.append(
+            {
+                "path": self.path,
+                "client_port": self.client_address[1],
+                "headers": dict(self.headers),
+            }
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ETagHandler(StandInHandler):
+    """Answers conditional requests with 304 when the ETag matches."""
+
+    etag = '"rev-1"'
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == self.etag:
+            self.server.seen.append({"path": self.path, "status": 304})
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        self.server.seen.append({"path": self.path, "status": 200})
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+class ParseApiHandler(StandInHandler):
+    """Minimal api.php answering action=parse from examples/ase.html."""
+
+    page = (EXAMPLES_DIR / "ase.html").read_text(encoding="utf-8")
+
+    def _finnish_fragment(self):
+        start = self.page.index('<div class="mw-heading mw-heading2"><h2 id="Finnish"')
+        end = self.page.index('<div class="mw-heading mw-heading2"><h2', start + 1)
+        return self.page[start:end]
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        self.server.seen.append({"path": self.path, "query": query})
+
+        if query.get("prop") == ["sections"]:
+            sections = [
+                {"toclevel": 1, "line": "English", "index": "1"},
+                {"toclevel": 2, "line": "Finnish", "index": "7"},
+                {"toclevel": 1, "line": "Finnish", "index": "34"},
+            ]
+            payload = {"parse": {"title": "ase", "sections": sections}}
+        elif query.get("section") == ["34"]:
+            payload = {"parse": {"title": "ase", "revid": 84173227}}
+            payload["parse"]["text"] = self._finnish_fragment()
+        else:
+            payload = {"error": {"code": "nosuchsection", "info": "bad section"}}
+
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FullPageHandler(StandInHandler):
+    """Serves examples/ase.html in small pieces like a slow origin would."""
+
+    body = (EXAMPLES_DIR / "ase.html").read_bytes()
+
+    def do_GET(self):
+        self.server.seen.append({"path": self.path})
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        try:
+            for start in range(0, len(self.body), 8192):
+                self.wfile.write(self.body[start : start + 8192])
+                self.wfile.flush()
+                time.sleep(0.001)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client hung up after the Finnish section, as intended
+            self.server.aborted = True
+
+
+class ThrottlingHandler(StandInHandler):
+    """Answers 429 with Retry-After for the first two requests."""
+
+    def do_GET(self):
+        throttled = [r for r in self.server.seen if r.get("status") == 429]
+        if len(throttled) < 2:
+            self.server.seen.append({"path": self.path, "status": 429})
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+class LongThrottlingHandler(StandInHandler):
+    """Answers 429 asking for a wait longer than the backoff cap."""
+
+    def do_GET(self):
+        self.server.seen.append({"path": self.path, "status": 429})
+        self.send_response(429)
+        self.send_header("Retry-After", "300")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class StandInServer:
+    """Context manager running a StandInHandler-style server in a thread."""
+
+    def __init__(self, handler=StandInHandler):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.seen = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestSharedSession(unittest.TestCase):
+    def setUp(self):
+        fetcher.reset_session()
+        self.config = {
+            "network": dict(DEFAULT_CONFIG["network"], user_agent="vocab-test/1.0")
+        }
+        fetcher.get_session(self.config)
+
+    def tearDown(self):
+        fetcher.reset_session()
+
+    def test_session_is_shared(self):
+        self.assertIs(fetcher.get_session(), fetcher.get_session())
+
+    def test_connection_is_kept_alive(self):
+        with StandInServer() as server:
+            fetcher.fetch(f"{server.base_url}/wiki/ase")
+            fetcher.fetch(f"{server.base_url}/wiki/pala")
+
+            ports = {request["client_port"] for request in server.server.seen}
+            self.assertEqual(len(server.server.seen), 2)
+            self.assertEqual(len(ports), 1, "Both requests should share a connection")
+
+    def test_headers_and_timeout(self):
+        with StandInServer() as server:
+            response = fetcher.fetch(f"{server.base_url}/wiki/ase")
+
+            headers = server.server.seen[0]["headers"]
+            self.assertEqual(headers["User-Agent"], "vocab-test/1.0")
+            self.assertIn("gzip", headers["Accept-Encoding"])
+            self.assertIn(b"Finnish", response.content)
+            self.assertEqual(fetcher.get_timeout(), (5.0, 30.0))
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_spaces_requests_per_host(self):
+        limiter = fetcher.RateLimiter(rate=20)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.wait("en.wiktionary.org")
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+        start = time.monotonic()
+        limiter.wait("fi.wiktionary.org")
+        self.assertLess(time.monotonic() - start, 0.05)
+
+
+class TestRetryAndConcurrency(unittest.TestCase):
+    def setUp(self):
+        fetcher.reset_session()
+        fetcher.get_session({"network": DEFAULT_CONFIG["network"]})
+
+    def tearDown(self):
+        fetcher.reset_session()
+
+    def test_throttled_request_is_retried(self):
+        with StandInServer(ThrottlingHandler) as server:
+            response = fetcher.fetch(f"{server.base_url}/wiki/ase")
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(server.server.seen), 3)
+            self.assertEqual(server.server.seen[-1]["path"], "/wiki/ase")
+            self.assertLess(fetcher.get_concurrency().limit, 4)
+
+    def test_long_retry_after_is_not_shortened(self):
+        with StandInServer(LongThrottlingHandler) as server:
+            with patch.object(fetcher.time, "sleep") as sleep:
+                with self.assertRaises(fetcher.requests.HTTPError) as caught:
+                    fetcher.fetch(f"{server.base_url}/wiki/ase")
+
+            sleep.assert_not_called()
+            self.assertEqual(len(server.server.seen), 1)
+            self.assertTrue(fetcher.is_transient(caught.exception))
+
+    def test_retry_policy_delays(self):
+        policy = fetcher.RetryPolicy(max_retries=2, base_delay=1.0, max_delay=5.0)
+        self.assertTrue(policy.should_retry(0, 429))
+        self.assertFalse(policy.should_retry(0, 404))
+        self.assertFalse(policy.should_retry(2, 503))
+        for attempt in range(5):
+            self.assertLessEqual(policy.delay(attempt), 5.0)
+
+        response = fetcher.requests.Response()
+        response.headers["Retry-After"] = "3"
+        self.assertEqual(policy.delay(0, response), 3.0)
+        self.assertTrue(policy.should_retry(0, 429, response))
+
+        # Asked to wait longer than max_delay: give up instead of retrying early
+        response.headers["Retry-After"] = "300"
+        self.assertEqual(policy.delay(0, response), 300.0)
+        self.assertFalse(policy.should_retry(0, 429, response))
+
+    def test_aimd_limit(self):
+        controller = fetcher.AdaptiveConcurrency(initial=8, maximum=10)
+        with controller.slot() as outcome:
+            outcome["throttled"] = True
+        self.assertEqual(controller.limit, 4)
+
+        for _ in range(20):
+            with controller.slot():
+                pass
+        self.assertGreater(controller.limit, 6)
+        self.assertLessEqual(controller.limit, 10)
+        self.assertEqual(controller.in_flight, 0)
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        fetcher.reset_session()
+        fetcher.get_session({"network": DEFAULT_CONFIG["network"]})
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = PageCache(Path(self.tmp.name), ttl=60)
+
+    def tearDown(self):
+        fetcher.reset_session()
+        self.tmp.cleanup()
+
+    def test_fresh_hit_skips_network(self):
+        with StandInServer(ETagHandler) as server:
+            url = f"{server.base_url}/wiki/ase"
+            first = fetcher.fetch_content(url, cache=self.cache)
+            second = fetcher.fetch_content(f"{url}#Finnish", cache=self.cache)
+
+            self.assertEqual(first, second)
+            self.assertEqual(len(server.server.seen), 1)
+
+    def test_stale_entry_is_revalidated(self):
+        with StandInServer(ETagHandler) as server:
+            url = f"{server.base_url}/wiki/ase"
+            fetcher.fetch_content(url, cache=self.cache)
+
+            self.cache.ttl = 0
+            body = fetcher.fetch_content(url, cache=self.cache)
+
+            statuses = [request["status"] for request in server.server.seen]
+            self.assertEqual(statuses, [200, 304])
+            self.assertEqual(body, ETagHandler.body)
+            self.assertLess(self.cache.get(url).age(), 5)
+
+    def test_max_stale_serves_without_network(self):
+        with StandInServer(ETagHandler) as server:
+            url = f"{server.base_url}/wiki/ase"
+            fetcher.fetch_content(url, cache=self.cache)
+
+            self.cache.ttl = 0
+            stale = []
+            body = fetcher.fetch_content(
+                url, cache=self.cache, max_stale=3600, on_stale=stale.append
+            )
+
+            self.assertEqual(body, ETagHandler.body)
+            self.assertEqual(stale, [url])
+            self.assertEqual(len(server.server.seen), 1)
+
+    def test_coalesced_calls_each_get_their_on_stale(self):
+        url = "https://en.wiktionary.org/wiki/ase"
+        other = PageCache(Path(self.tmp.name) / "other", ttl=60)
+        calls, stale = [], []
+
+        def slow_fetch(url, cache, *args):
+            calls.append(cache)
+            time.sleep(0.1)
+            return b"page", True
+
+        def fetch_content(cache, name):
+            fetcher.fetch_content(
+                url, cache=cache, max_stale=3600, on_stale=lambda _: stale.append(name)
+            )
+
+        threads = [
+            threading.Thread(target=fetch_content, args=(cache, name))
+            for cache, name in [(self.cache, "a"), (self.cache, "b"), (other, "c")]
+        ]
+        with patch.object(fetcher, "_fetch_content", slow_fetch):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # One download per cache, and every caller hears the page was stale
+        self.assertCountEqual(calls, [self.cache, other])
+        self.assertCountEqual(stale, ["a", "b", "c"])
+
+    def test_size_limit_evicts_oldest(self):
+        self.cache.max_size = 25
+        self.cache.put("https://en.wiktionary.org/wiki/ase", b"x" * 10)
+        old_path = next(self.cache.pages_dir.glob("*/*.body"))
+        an_hour_ago = time.time() - 3600
+        os.utime(old_path, (an_hour_ago, an_hour_ago))
+        self.cache.put("https://en.wiktionary.org/wiki/pala", b"y" * 10)
+        self.cache.put("https://en.wiktionary.org/wiki/tili", b"z" * 10)
+
+        self.assertIsNone(self.cache.get("https://en.wiktionary.org/wiki/ase"))
+        self.assertIsNotNone(self.cache.get("https://en.wiktionary.org/wiki/tili"))
+
+    def test_revalidated_entry_is_not_evicted_first(self):
+        self.cache.max_size = 25
+        ase = self.cache.put("https://en.wiktionary.org/wiki/ase", b"x" * 10)
+        self.cache.put("https://en.wiktionary.org/wiki/pala", b"y" * 10)
+        for hours, url in enumerate(["pala", "ase"], 1):
+            body_path, _ = self.cache._paths(f"https://en.wiktionary.org/wiki/{url}")
+            fetched = time.time() - hours * 3600
+            os.utime(body_path, (fetched, fetched))
+        # ase, fetched before pala, has been revalidated (304) since
+        self.cache.refresh(ase)
+        self.cache.put("https://en.wiktionary.org/wiki/tili", b"z" * 10)
+
+        self.assertIsNotNone(self.cache.get("https://en.wiktionary.org/wiki/ase"))
+        self.assertIsNone(self.cache.get("https://en.wiktionary.org/wiki/pala"))
+
+
+class TestSectionApiSource(unittest.TestCase):
+    def setUp(self):
+        fetcher.reset_session()
+        fetcher.get_session({"network": DEFAULT_CONFIG["network"]})
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = SectionApiSource(cache=PageCache(Path(self.tmp.name)))
+
+    def tearDown(self):
+        fetcher.reset_session()
+        self.tmp.cleanup()
+
+    def test_fetches_only_finnish_section(self):
+        with StandInServer(ParseApiHandler) as server:
+            url = f"{server.base_url}/wiki/ase#Finnish"
+            fragment = self.source.get_page(url)
+
+            full_page = (EXAMPLES_DIR / "ase.html").read_bytes()
+            self.assertLess(len(fragment) * 2, len(full_page))
+            self.assertEqual(server.server.seen[1]["query"]["section"], ["34"])
+
+            parser = WiktionaryParser(url, source=self.source).parse()
+            self.assertEqual(list(parser.word_types), ["noun"])
+            self.assertEqual(list(parser.kotus_types), ["hame"])
+            # Both API responses were served from the page cache the second time
+            self.assertEqual(len(server.server.seen), 2)
+
+
+class TestStreamingSource(unittest.TestCase):
+    def setUp(self):
+        fetcher.reset_session()
+        fetcher.get_session({"network": DEFAULT_CONFIG["network"]})
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = StreamingSource(cache=PageCache(Path(self.tmp.name)))
+
+    def tearDown(self):
+        fetcher.reset_session()
+        self.tmp.cleanup()
+
+    def test_stops_after_finnish_section(self):
+        with StandInServer(FullPageHandler) as server:
+            url = f"{server.base_url}/wiki/ase"
+            partial = self.source.get_page(url)
+
+            full_page = FullPageHandler.body
+            self.assertLess(len(partial), len(full_page))
+            self.assertIn(b'<h2 id="Galician"', partial)
+            self.assertTrue(full_page.startswith(partial))
+
+            parser = WiktionaryParser(url, source=self.source).parse()
+            self.assertEqual(list(parser.word_types), ["noun"])
+            self.assertEqual(list(parser.kotus_types), ["hame"])
+            self.assertEqual(len(server.server.seen), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for the wiktextract (kaikki.org) JSONL engine, using a small synthetic
+JSONL file.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from click.testing import CliRunner
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from wiktionary_vocab_card.cli import cli
+from wiktionary_vocab_card.entries import create_parser
+from wiktionary_vocab_card.kaikki import KaikkiSource, entry_from_records
+from wiktionary_vocab_card.processor import ContentProcessor
+
+RECORDS = [
+    {
+        "word": "ase",
+        "pos": "noun",
+        "lang": "Finnish",
+        "lang_code": "fi",
+        "senses": [
+            {"glosses": ["weapon, arm"]},
+            {"glosses": ["gun"], "raw_glosses": ["(colloquial) gun"]},
+        ],
+        "inflection_templates": [{"name": "fi-decl-hame", "args": {"1": "as"}}],
+        "forms": [
+            {"form": "no-table-tags", "source": "declension", "tags": ["table-tags"]},
+            {"form": "ase", "source": "declension", "tags": ["nominative", "singular"]},
+            {"form": "aseet", "source": "declension", "tags": ["nominative", "plural"]},
+            {"form": "aseen", "source": "declension", "tags": ["genitive", "singular"]},
+            {"form": "aseiden", "source": "declension", "tags": ["genitive", "plural"]},
+            {
+                "form": "aseitten",
+                "source": "declension",
+                "tags": ["genitive", "plural"],
+            },
+        ],
+    },
+    {"word": "ase", "pos": "noun", "lang": "Estonian", "lang_code": "et"},
+    {
+        "word": "pala",
+        "pos": "noun",
+        "lang_code": "fi",
+        "senses": [{"glosses": ["piece"]}, {"glosses": ["piece", "bit of food"]}],
+        "forms": [{"form": "9/kala", "source": "declension", "tags": ["class"]}],
+    },
+    {
+        "word": "pala",
+        "pos": "verb",
+        "lang_code": "fi",
+        "senses": [{"glosses": ["inflection of palaa"]}],
+        "forms": [
+            {"form": "palan", "source": "conjugation", "tags": ["first-person"]},
+        ],
+    },
+]
+
+
+class TestKaikkiSource(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "kaikki.org-dictionary-Finnish.jsonl"
+        lines = [json.dumps(record, ensure_ascii=False) for record in RECORDS]
+        lines.insert(2, "{not json")
+        self.path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        self.source = KaikkiSource(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_ase(self, entry):
+        self.assertEqual(entry["word_types"], ["noun"])
+        self.assertEqual(entry["kotus_types"], ["hame"])
+        self.assertEqual(entry["definitions"], ["1. weapon, arm\n2. (colloquial) gun"])
+        self.assertEqual(
+            entry["conjugation_tables"][0],
+            "| | singular | plural |\n"
+            "| --- | --- | --- |\n"
+            "| nominative | ase | aseet |\n"
+            "| genitive | aseen | aseiden, aseitten |",
+        )
+
+    def test_lookup_by_scanning(self):
+        self.assertFalse(self.source.index_path.exists())
+        self.assert_ase(self.source.get("https://en.wiktionary.org/wiki/ase#Finnish"))
+        self.assertIsNone(self.source.get("koira"))
+
+    def test_lookup_with_index(self):
+        self.assertEqual(self.source.build_index(), 3)
+        self.assert_ase(self.source.get("ase"))
+
+        entry = self.source.get("pala")
+        self.assertEqual(entry["word_types"], ["noun", "verb"])
+        self.assertEqual(entry["kotus_types"], ["kala"])
+        self.assertEqual(entry["definitions"][0], "1. piece\n2. bit of food")
+        self.assertIn("| palan | first-person |", entry["conjugation_tables"][1])
+
+    def test_word_types_are_named_like_the_html_engine(self):
+        records = [
+            {"word": "iso", "pos": "adj", "senses": [{"glosses": ["big"]}]},
+            {"word": "iso", "pos": "name", "senses": [{"glosses": ["a surname"]}]},
+            {"word": "iso", "pos": "adv", "senses": [{"glosses": ["greatly"]}]},
+        ]
+        entry = entry_from_records("iso", records)
+        self.assertEqual(entry["word_types"], ["adjective", "adverb"])
+        self.assertEqual(entry["definitions"], ["1. big", "1. greatly"])
+
+    def test_stale_index_is_ignored(self):
+        self.source.build_index()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"word": "koira", "pos": "noun", "lang_code": "fi"}))
+        stat = self.path.stat()
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+
+        self.assertEqual(KaikkiSource(self.path).get("koira")["word_types"], ["noun"])
+
+    def test_engine_produces_processor_structure(self):
+        config = {"extraction": {"engine": "kaikki", "kaikki_path": str(self.path)}}
+        parser = create_parser("ase", config).parse()
+
+        content = ContentProcessor(parser, config).process_content()
+        self.assertEqual(content["word"], "ase")
+        self.assert_ase(content)
+
+        with self.assertRaises(LookupError):
+            create_parser("koira", config).parse()
+
+    def test_index_command(self):
+        result = CliRunner().invoke(cli, ["index-kaikki", str(self.path)])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Indexed 3 Finnish records", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for canonical page keys and single-flight request coalescing.
+"""
+
+import sys
+import threading
+import time
+import unicodedata
+import unittest
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from wiktionary_vocab_card.keys import SingleFlight, canonical_key, canonical_url
+
+
+class TestCanonicalKeys(unittest.TestCase):
+    def test_spellings_share_one_key(self):
+        decomposed = unicodedata.normalize("NFD", "yskiä")
+        spellings = [
+            "https://en.wiktionary.org/wiki/yski%C3%A4",
+            "https://en.wiktionary.org/wiki/yskiä#Finnish",
+            "https://en.m.wiktionary.org/wiki/yski%C3%A4",
+            "https://EN.wiktionary.org/w/index.php?title=yski%C3%A4",
+            "http://en.wiktionary.org/wiki/" + decomposed,
+            "yskiä",
+            " yskiä ",
+        ]
+        keys = {canonical_key(spelling) for spelling in spellings}
+        self.assertEqual(len(keys), 1)
+
+        key = keys.pop()
+        self.assertEqual(key.title, "yskiä")
+        self.assertEqual(key.url, "https://en.wiktionary.org/wiki/yski%C3%A4")
+
+    def test_spaces_and_underscores(self):
+        self.assertEqual(
+            canonical_key("olla_hyvä"),
+            canonical_key("https://en.wiktionary.org/wiki/olla hyvä"),
+        )
+        self.assertEqual(canonical_key("olla_hyvä").title, "olla hyvä")
+
+    def test_other_urls_keep_their_host(self):
+        self.assertEqual(
+            canonical_url("http://127.0.0.1:8000/wiki/ase#Finnish"),
+            "http://127.0.0.1:8000/wiki/ase",
+        )
+        api_url = "https://en.wiktionary.org/w/api.php?action=parse&page=ase"
+        self.assertEqual(canonical_url(api_url), api_url)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return "page"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flights.do("ase", slow_fetch))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["page"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_errors_are_shared_and_not_cached(self):
+        flights = SingleFlight()
+
+        def failing():
+            raise ValueError("Finnish section not found")
+
+        with self.assertRaises(ValueError):
+            flights.do("ase", failing)
+        self.assertEqual(flights.do("ase", lambda: "retried"), "retried")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Tests for the packed append-only store and the page cache built on it.
+"""
+
+import multiprocessing
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from click.testing import CliRunner
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from wiktionary_vocab_card.cache import (
+    PackedPageCache,
+    ResultCache,
+    set_page_cache,
+    set_result_cache,
+)
+from wiktionary_vocab_card.cli import cli
+from wiktionary_vocab_card.packed import (
+    CodecResult,
+    PackedStore,
+    benchmark_codecs,
+    pick_codec,
+)
+
+
+def _write_from_process(directory, worker):
+    # Small segments and an eager compactor make the processes race on every
+    # shared structure: the index (including its growth) and the segments
+    store = PackedStore(
+        directory, segment_size=4096, compact_threshold=0.3, compact_min_bytes=1
+    )
+    for round_ in range(3):
+        for n in range(200):
+            store.put(f"w{worker}-{n}", f"{worker}:{round_}:{n}".encode() * 20)
+            store.get(f"w{(worker + 1) % 4}-{n}")
+    store.close()
+
+
+class TestPackedStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+        self.store = PackedStore(self.directory, segment_size=4096)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_put_get_overwrite_delete(self):
+        self.store.put("ase", b"weapon" * 100)
+        self.store.put("pala", b"piece")
+        self.store.put("ase", b"arm")
+
+        self.assertEqual(self.store.get("ase"), b"arm")
+        self.assertEqual(self.store.get("pala"), b"piece")
+        self.assertIsNone(self.store.get("koira"))
+        self.assertEqual(self.store.count, 2)
+        self.assertGreater(self.store.dead_bytes, 0)
+
+        self.assertTrue(self.store.delete("pala"))
+        self.assertFalse(self.store.delete("pala"))
+        self.assertIsNone(self.store.get("pala"))
+        self.assertEqual(self.store.count, 1)
+
+    def test_reopen_and_grow(self):
+        # More keys than the initial index capacity, across many segments
+        for n in range(3000):
+            self.store.put(f"word{n}", f"value {n}".encode() * 20)
+        self.store.close()
+
+        reopened = PackedStore(self.directory, segment_size=4096)
+        self.assertEqual(reopened.count, 3000)
+        self.assertEqual(reopened.get("word2999"), b"value 2999" * 20)
+        self.assertGreater(len(list(self.directory.glob("*.seg"))), 1)
+        self.assertEqual(next(reopened.items())[0], "word0")
+        reopened.close()
+
+    def test_compaction_reclaims_dead_space(self):
+        for round_ in range(5):
+            for n in range(50):
+                self.store.put(f"word{n}", f"{round_}-{n}".encode() * 50)
+        self.store.delete("word0")
+        size_before = sum(p.stat().st_size for p in self.directory.glob("*.seg"))
+
+        self.store.compact()
+
+        size_after = sum(p.stat().st_size for p in self.directory.glob("*.seg"))
+        self.assertLess(size_after, size_before / 3)
+        self.assertEqual(self.store.dead_bytes, 0)
+        self.assertEqual(self.store.get("word7"), b"4-7" * 50)
+        self.assertIsNone(self.store.get("word0"))
+        self.assertEqual(self.store.count, 49)
+
+    def test_background_compaction_with_concurrent_access(self):
+        store = PackedStore(
+            self.directory / "bg",
+            segment_size=2048,
+            compact_threshold=0.3,
+            compact_min_bytes=1,
+        )
+        errors = []
+
+        def writer(offset):
+            try:
+                for round_ in range(20):
+                    for n in range(10):
+                        key = f"w{offset}-{n}"
+                        store.put(key, f"{round_}".encode() * 200)
+                        if store.get(key) is None:
+                            errors.append(key)
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.wait_for_compaction()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(store.count, 40)
+        for i in range(4):
+            self.assertEqual(store.get(f"w{i}-9"), b"19" * 200)
+        store.close()
+
+    def test_compression_and_counters_persist(self):
+        store = PackedStore(self.directory / "zlib", compression="zlib")
+        store.put("ase", b"<td>asetta</td>" * 200)
+        store.get("ase")
+        store.get("koira")
+        store.close()
+
+        reopened = PackedStore(self.directory / "zlib")
+        stats = reopened.stats()
+        self.assertEqual(stats["codec"], "zlib")
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["raw_bytes"], 3000)
+        self.assertLess(stats["stored_bytes"], 300)
+        self.assertEqual(reopened.get("ase"), b"<td>asetta</td>" * 200)
+        reopened.close()
+
+    def test_lru_and_lfu_eviction(self):
+        for policy, survivor in [("lru", "c"), ("lfu", "a")]:
+            store = PackedStore(self.directory / policy, compression="none")
+            for key in "abc":
+                store.put(key, key.encode() * 100)
+            store.get("a")
+            store.get("a")
+            store.get("c")
+            store.get("b")
+
+            # Keep room for a single record
+            self.assertEqual(store.evict(store.live_bytes // 3, policy), 2)
+            self.assertEqual([key for key, _ in store.items()], [survivor])
+            self.assertEqual(store.stats()["evictions"], 2)
+            store.close()
+
+    def test_benchmark_and_pick_codec(self):
+        results = benchmark_codecs([b"<tr><td>talo</td></tr>" * 500])
+        self.assertEqual({r.name for r in results}, {"zlib", "lzma", "none"})
+        self.assertLess(min(r.ratio for r in results), 0.5)
+
+        slow = CodecResult("lzma", 0.1, 5.0, 0.01)
+        fast = CodecResult("zlib", 0.2, 0.01, 0.001)
+        self.assertEqual(pick_codec([slow, fast]), "zlib")
+
+    def test_concurrent_processes(self):
+        self.store.close()
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=_write_from_process, args=(self.directory, i))
+            for i in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+        self.assertEqual([process.exitcode for process in processes], [0] * 4)
+
+        self.store = PackedStore(self.directory, segment_size=4096)
+        self.assertEqual(self.store.count, 800)
+        for i in range(4):
+            for n in range(200):
+                expected = f"{i}:2:{n}".encode() * 20
+                self.assertEqual(self.store.get(f"w{i}-{n}"), expected)
+
+    def test_torn_record_is_a_miss(self):
+        self.store.put("pala", b"piece")
+        self.store.put("ase", b"weapon" * 100)
+        segment = next(self.directory.glob("*.seg"))
+        # A writer that died half way through appending its record
+        with open(segment, "r+b") as f:
+            f.truncate(segment.stat().st_size - 10)
+
+        self.assertIsNone(self.store.get("ase"))
+        self.assertEqual(list(self.store.items()), [("pala", b"piece")])
+        self.store.put("ase", b"arm")
+        self.assertEqual(self.store.get("ase"), b"arm")
+
+    def test_damaged_index_header_is_a_miss(self):
+        self.store.put("ase", b"weapon")
+        with open(self.directory / "index.bin", "r+b") as f:
+            f.write(bytes(16))
+
+        self.assertIsNone(self.store.get("ase"))
+        self.store.put("ase", b"arm")
+        self.assertEqual(self.store.get("ase"), b"arm")
+
+    def test_reader_follows_index_replaced_by_another_writer(self):
+        reader = PackedStore(self.directory, segment_size=4096)
+        self.store.put("ase", b"weapon")
+        self.assertEqual(reader.get("ase"), b"weapon")
+
+        # Growing the index publishes a new file under the reader's mapping
+        for n in range(1000):
+            self.store.put(f"word{n}", b"value")
+        self.assertEqual(reader.get("word999"), b"value")
+        self.assertEqual(reader.count, 1001)
+        reader.close()
+
+
+class TestPackedPageCache(unittest.TestCase):
+    def test_round_trip_and_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PackedPageCache(Path(tmp), max_size=3000)
+            cache.put("https://en.wiktionary.org/wiki/ase", b"<html>ase</html>", {})
+            entry = cache.get("https://en.wiktionary.org/wiki/ase#Finnish")
+            self.assertEqual(entry.body, b"<html>ase</html>")
+            self.assertEqual([e.url for e in cache.iter_entries()], [entry.url])
+
+            # Incompressible bodies push the store past max_size
+            for n in range(10):
+                body = bytes(range(256)) * 2 + str(n).encode()
+                cache.put(f"https://en.wiktionary.org/wiki/w{n}", body, {})
+            self.assertLessEqual(cache.store.live_bytes, 3000)
+            self.assertIsNone(cache.get("https://en.wiktionary.org/wiki/ase"))
+            self.assertIsNotNone(cache.get("https://en.wiktionary.org/wiki/w9"))
+            cache.store.close()
+
+    def test_cli_stats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PackedPageCache(Path(tmp), compression="zlib")
+            cache.put("https://en.wiktionary.org/wiki/ase", b"<p>ase</p>" * 100, {})
+            cache.get("https://en.wiktionary.org/wiki/ase")
+            results = ResultCache(Path(tmp) / "results")
+            try:
+                set_page_cache(cache)
+                set_result_cache(results)
+                result = CliRunner().invoke(cli, ["cache", "stats", "--benchmark"])
+            finally:
+                set_page_cache(None)
+                set_result_cache(None)
+                cache.store.close()
+                results.store.close()
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn("Entries: 1", result.output)
+            self.assertIn("Hits: 1  Misses: 0  (100%)", result.output)
+            self.assertIn("Evictions (lru): 0", result.output)
+            self.assertIn("Best fit:", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Tests for exporting and importing portable cache packs.
+"""
+
+import io
+import json
+import sys
+import tarfile
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from click.testing import CliRunner
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import wiktionary_vocab_card.entries as entries
+from wiktionary_vocab_card.cache import (
+    CacheEntry,
+    PageCache,
+    ResultCache,
+    set_page_cache,
+    set_result_cache,
+)
+from wiktionary_vocab_card.cli import cli
+from wiktionary_vocab_card.entries import EntryStore
+from wiktionary_vocab_card.packs import export_pack, import_pack
+from wiktionary_vocab_card.result import ParseResult
+
+ASE_URL = "https://en.wiktionary.org/wiki/ase"
+PALA_URL = "https://en.wiktionary.org/wiki/pala"
+
+
+def write_pack(path, manifest, members=()):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in [*members, ("manifest.json", json.dumps(manifest).encode())]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+class TestCachePacks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.pack = root / "warm.tar.gz"
+
+        self.source = PageCache(root / "source")
+        self.source.put(ASE_URL, b"<html>ase</html>", {"ETag": '"a1"'})
+        self.source.put(PALA_URL, b"<html>pala</html>")
+        self.source_entries = EntryStore(root / "source.sqlite3")
+        self.source_entries.put_many(
+            [{"word": "ase", "word_types": ["noun"], "revision_id": 7}], "dump"
+        )
+
+        self.target = PageCache(root / "target")
+        self.target_entries = EntryStore(root / "target.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        exported = export_pack(self.pack, self.source, self.source_entries)
+        self.assertEqual((exported.pages, exported.entries), (2, 1))
+
+        imported = import_pack(self.pack, self.target, self.target_entries)
+        self.assertEqual((imported.pages, imported.entries), (2, 1))
+        self.assertEqual(imported.corrupt, [])
+
+        entry = self.target.get("https://en.wiktionary.org/wiki/ase#Finnish")
+        self.assertEqual(entry.body, b"<html>ase</html>")
+        self.assertEqual(entry.etag, '"a1"')
+        self.assertEqual(entry.fetched_at, self.source.get(ASE_URL).fetched_at)
+        self.assertEqual(self.target_entries.get("ase")["revision_id"], 7)
+
+    def test_import_is_idempotent_and_keeps_newer_pages(self):
+        export_pack(self.pack, self.source)
+        import_pack(self.pack, self.target)
+
+        again = import_pack(self.pack, self.target)
+        self.assertEqual((again.pages, again.skipped), (0, 2))
+
+        # A page fetched locally after the pack was made wins
+        self.target.add(CacheEntry(PALA_URL, b"<html>newer</html>"))
+        import_pack(self.pack, self.target)
+        self.assertEqual(self.target.get(PALA_URL).body, b"<html>newer</html>")
+
+    def test_parse_results_round_trip(self):
+        source = ResultCache(Path(self.tmp.name) / "source")
+        target = ResultCache(Path(self.tmp.name) / "target")
+        ase = ParseResult(ASE_URL, "ase", word_types=("noun",), kotus_types=("hame",))
+        pala = ParseResult(PALA_URL, "pala", word_types=("noun", "verb"))
+        source.put(b"<html>ase</html>", 1, ase)
+        source.put(b"<html>pala</html>", 1, pala)
+
+        exported = export_pack(self.pack, self.source, result_cache=source)
+        self.assertEqual(exported.results, 2)
+        imported = import_pack(self.pack, self.target, result_cache=target)
+        self.assertEqual((imported.results, imported.corrupt), (2, []))
+        self.assertEqual(target.get(b"<html>ase</html>", 1), ase)
+
+        again = import_pack(self.pack, self.target, result_cache=target)
+        self.assertEqual(again.results, 0)
+        stats = target.stats()
+        self.assertEqual(stats["entries"], 2)
+        # Checking for existing results is not a lookup
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 0))
+
+        selected = export_pack(
+            self.pack, self.source, words=["pala"], result_cache=source
+        )
+        self.assertEqual(selected.results, 1)
+        for cache in (source, target):
+            cache.store.close()
+
+    def test_export_selected_words(self):
+        stats = export_pack(self.pack, self.source, words=["pala"])
+        self.assertEqual(stats.pages, 1)
+
+        import_pack(self.pack, self.target)
+        self.assertIsNone(self.target.get(ASE_URL))
+        self.assertIsNotNone(self.target.get(PALA_URL))
+
+    def test_checksum_mismatch_is_skipped(self):
+        manifest = {
+            "format": 1,
+            "created": time.time(),
+            "pages": [
+                {
+                    "url": ASE_URL,
+                    "file": "pages/ase.body",
+                    "sha256": "0" * 64,
+                    "fetched_at": time.time(),
+                }
+            ],
+        }
+        write_pack(self.pack, manifest, [("pages/ase.body", b"tampered")])
+
+        stats = import_pack(self.pack, self.target)
+        self.assertEqual(stats.corrupt, ["pages/ase.body"])
+        self.assertIsNone(self.target.get(ASE_URL))
+
+    def test_invalid_manifest(self):
+        page = {"url": ASE_URL, "file": "pages/ase.body", "sha256": "0" * 64}
+        for manifest in [
+            {"format": 1},
+            {"format": 1, "pages": [page]},
+            {"format": 1, "pages": [], "results": {"file": "results.jsonl"}},
+        ]:
+            with self.subTest(manifest=manifest):
+                write_pack(self.pack, manifest)
+                with self.assertRaises(ValueError):
+                    import_pack(self.pack, self.target)
+
+        results = ResultCache(Path(self.tmp.name) / "results")
+        try:
+            set_page_cache(self.target)
+            set_result_cache(results)
+            result = CliRunner().invoke(
+                cli, ["cache", "import", "--no-entries", str(self.pack)]
+            )
+        finally:
+            set_page_cache(None)
+            set_result_cache(None)
+            results.store.close()
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("invalid manifest entry", result.output)
+
+    def test_not_a_pack(self):
+        with tarfile.open(self.pack, "w:gz"):
+            pass
+        with self.assertRaises(ValueError):
+            import_pack(self.pack, self.target)
+
+    def test_cli_round_trip(self):
+        runner = CliRunner()
+        results = ResultCache(Path(self.tmp.name) / "results")
+        try:
+            set_page_cache(self.source)
+            set_result_cache(results)
+            entries._default_store = self.source_entries
+            result = runner.invoke(cli, ["cache", "export", str(self.pack)])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn("Exported 2 pages and 1 entries", result.output)
+
+            set_page_cache(self.target)
+            entries._default_store = self.target_entries
+            result = runner.invoke(cli, ["cache", "import", str(self.pack)])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn("Imported 2 pages and 1 entries", result.output)
+        finally:
+            set_page_cache(None)
+            set_result_cache(None)
+            results.store.close()
+            entries._default_store = None
+
+        self.assertIsNotNone(self.target.get(PALA_URL))
+
+
+if __name__ == "__main__":
+    unittest.main()
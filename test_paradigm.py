@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the structured paradigm model built from inflection tables.
+"""
+
+import json
+import sys
+import unittest
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from wiktionary_vocab_card.paradigm import InflectedForm, Paradigm
+from wiktionary_vocab_card.parser import WiktionaryParser
+from wiktionary_vocab_card.sources import SnapshotSource
+from wiktionary_vocab_card.tables import table_paradigm
+
+EXAMPLES_DIR = Path(__file__).parent / "examples"
+
+DECLENSION = """
+<table class="inflection-table"><tbody>
+<tr><th colspan="4">Inflection of ase (Kotus type 48/hame, no gradation)</th></tr>
+<tr><th colspan="2"></th><th>singular</th><th>plural</th></tr>
+<tr><th colspan="2">genitive</th><td>aseen</td><td>aseiden<br>aseitten</td></tr>
+<tr><th rowspan="2">accusative</th><th>nom.</th><td>ase</td>
+    <td rowspan="2">aseet</td></tr>
+<tr><th>gen.</th><td>aseen</td></tr>
+<tr><th colspan="2">instructive</th><td>—</td><td>asein</td></tr>
+</tbody></table>
+"""
+
+
+def parse_snapshot(word):
+    url = f"https://en.wiktionary.org/wiki/{word}"
+    return WiktionaryParser(url, source=SnapshotSource(EXAMPLES_DIR)).parse()
+
+
+class TestParadigm(unittest.TestCase):
+    def setUp(self):
+        table = BeautifulSoup(DECLENSION, "html.parser").find("table")
+        self.paradigm = table_paradigm(table)
+
+    def test_forms_carry_their_headers(self):
+        self.assertEqual(
+            self.paradigm.title, "Inflection of ase (Kotus type 48/hame, no gradation)"
+        )
+        self.assertEqual(
+            list(self.paradigm.forms()),
+            [
+                InflectedForm(("aseen",), ("genitive",), ("singular",)),
+                InflectedForm(("aseiden", "aseitten"), ("genitive",), ("plural",)),
+                InflectedForm(("ase",), ("accusative", "nom."), ("singular",)),
+                InflectedForm(("aseet",), ("accusative", "nom."), ("plural",)),
+                InflectedForm(("aseen",), ("accusative", "gen."), ("singular",)),
+                InflectedForm(("asein",), ("instructive",), ("plural",)),
+            ],
+        )
+        self.assertEqual(
+            [(slot.row, slot.column) for slot in self.paradigm.find("Aseitten")],
+            [(("genitive",), ("plural",))],
+        )
+
+    def test_json_round_trip(self):
+        data = json.loads(json.dumps(self.paradigm.to_dict()))
+        restored = Paradigm.from_dict(data)
+        self.assertEqual(restored, self.paradigm)
+        self.assertEqual(restored.to_markdown(), self.paradigm.to_markdown())
+        self.assertIn(
+            "| genitive |  | aseen | aseiden, aseitten |", restored.to_markdown()
+        )
+
+    def test_parsed_pages(self):
+        parser = parse_snapshot("asettaa")
+        (paradigm,) = parser.paradigms
+        self.assertEqual((paradigm.kotus_type, paradigm.gradation), ("muistaa", "tt-t"))
+        self.assertEqual(parser.conjugation_tables, [paradigm.to_markdown()])
+        self.assertEqual(
+            paradigm.find("asetin")[0],
+            InflectedForm(
+                ("asetin",),
+                ("1st sing.",),
+                ("indicative mood", "past tense", "positive"),
+            ),
+        )
+
+        (paradigm,) = parse_snapshot("tili").paradigms
+        self.assertEqual((paradigm.kotus_type, paradigm.gradation), ("risti", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Parser tests against the stored pages in examples/.
+
+Every page is parsed from its snapshot, so the tests run offline and always see
+the same HTML.
+"""
+
+import functools
+import hashlib
+import json
+import pickle
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+from bs4 import BeautifulSoup
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import wiktionary_vocab_card.parser as parser_module
+from wiktionary_vocab_card.cache import ResultCache, get_result_cache, set_result_cache
+from wiktionary_vocab_card.generator import MarkdownGenerator
+from wiktionary_vocab_card.html_backends import BACKENDS, available_backends, build_tree
+from wiktionary_vocab_card.parser import (
+    SectionIndex,
+    WiktionaryParser,
+    fastest_backend,
+    resolve_backend,
+    slice_finnish_section,
+)
+from wiktionary_vocab_card.processor import ContentProcessor
+from wiktionary_vocab_card.sources import SnapshotSource
+
+EXAMPLES_DIR = Path(__file__).parent / "examples"
+
+# word: (word types, kotus types, number of definition lists)
+EXPECTED = {
+    "ase": (["noun"], ["hame"], 1),
+    "asettaa": (["verb"], ["muistaa"], 1),
+    "edes": (["adverb"], [], 1),
+    "ehdokas": (["noun"], ["vieras"], 1),
+    "pala": (["noun", "verb"], ["kala"], 2),
+    "saada": (["verb"], ["saada"], 1),
+    "tallessa": (["adverb"], [], 1),
+    "tili": (["noun"], ["risti"], 1),
+    "yskiä": (["verb", "noun"], ["sallia"], 2),
+}
+
+# SHA-256 of the parse results of the pages above, per PARSER_VERSION
+PARSE_DIGESTS = {
+    1: "8867106873201473d665903fc2409a78c3e720b7dbd96adb0c867de6ef47cda3",
+}
+
+
+def parse_snapshot(word, source=None, backend="html.parser"):
+    url = f"https://en.wiktionary.org/wiki/{word}"
+    source = source or SnapshotSource(EXAMPLES_DIR)
+    return WiktionaryParser(url, source=source, backend=backend).parse()
+
+
+def generate_card(parser):
+    config = {"table_folding": True, "file_management": {"check_existing": False}}
+    content = ContentProcessor(parser, config).process_content()
+    return MarkdownGenerator(parser, content, config).generate_card()
+
+
+class TestSnapshotParsing(unittest.TestCase):
+    def test_examples(self):
+        for word, (word_types, kotus_types, definitions) in EXPECTED.items():
+            with self.subTest(word=word):
+                parser = parse_snapshot(word)
+                self.assertEqual(parser.word, word)
+                self.assertEqual(list(parser.word_types), word_types)
+                self.assertEqual(list(parser.kotus_types), kotus_types)
+                self.assertEqual(len(parser.definitions), definitions)
+                self.assertTrue(parser.definitions[0].startswith("1. "))
+
+    def test_section_index(self):
+        page = (EXAMPLES_DIR / "tili.html").read_bytes()
+        soup = BeautifulSoup(page, "html.parser")
+        section = SectionIndex(soup.find("h2", {"id": "Finnish"}))
+        self.assertEqual(section.end.get("id"), "Maltese")
+        # The next language's definitions are not part of the index
+        self.assertNotIn(section.end.find_next("ol"), section.lists)
+
+        headers = {h.get_text().strip(): p for p, h in section.headers("h3")}
+        position = headers["Noun"]
+        self.assertIs(section.first_after("lists", position), section.lists[0])
+        self.assertIsNone(section.first_after("tables", position, before=position))
+
+    def test_slice_finnish_section(self):
+        page = b'<h2 id="English">English</h2><p>en</p><h2 id="Finnish">Finnish</h2>'
+        self.assertEqual(
+            slice_finnish_section(page + b"<p>fi</p><h2 id='Hungarian'>"),
+            b'<h2 id="Finnish">Finnish</h2><p>fi</p>',
+        )
+        self.assertEqual(slice_finnish_section(page + b"<p>fi</p>")[-9:], b"<p>fi</p>")
+
+        # Ambiguous markers fall back to parsing the whole page
+        self.assertIsNone(slice_finnish_section(b"<p>no section</p>"))
+        self.assertIsNone(slice_finnish_section(page + page))
+        self.assertIsNone(slice_finnish_section(b"<!-- " + page + b" -->"))
+        self.assertIsNone(slice_finnish_section(page + b"<script>'<h2>'</script>"))
+
+    def test_sliced_parse_matches_full_parse(self):
+        class FullPage:
+            def get_page(self, url):
+                # A second Finnish marker defeats slicing
+                page = SnapshotSource(EXAMPLES_DIR).get_page(url)
+                return page + b'<h2 id="Finnish"></h2>'
+
+        def tree_size(word, source):
+            url = f"https://en.wiktionary.org/wiki/{word}"
+            parser = WiktionaryParser(url, source=source, backend="html.parser")
+            parser.fetch_page()
+            return len(list(parser.soup.descendants))
+
+        for word in ["pala", "saada"]:
+            with self.subTest(word=word):
+                self.assertLess(
+                    tree_size(word, SnapshotSource(EXAMPLES_DIR)),
+                    tree_size(word, FullPage()),
+                )
+                sliced = parse_snapshot(word)
+                full = parse_snapshot(word, FullPage())
+                self.assertEqual(sliced.definitions, full.definitions)
+                self.assertEqual(sliced.conjugation_tables, full.conjugation_tables)
+                self.assertEqual(sliced.revision_id, full.revision_id)
+
+    def test_archive_source(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive_path = Path(tmp) / "snapshots.zip"
+            with zipfile.ZipFile(archive_path, "w") as archive:
+                archive.write(EXAMPLES_DIR / "yskiä.html", "pages/yskiä.html")
+
+            parser = parse_snapshot("yski%C3%A4", SnapshotSource(archive_path))
+            self.assertEqual(parser.word, "yskiä")
+            self.assertEqual(list(parser.kotus_types), ["sallia"])
+
+    def test_archive_is_opened_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive_path = Path(tmp) / "snapshots.tar.gz"
+            with tarfile.open(archive_path, "w:gz") as archive:
+                for word in ["ase", "pala", "tili"]:
+                    archive.add(EXAMPLES_DIR / f"{word}.html", f"pages/{word}.html")
+
+            source = SnapshotSource(archive_path)
+            with patch("tarfile.open", wraps=tarfile.open) as opened:
+                for word in ["ase", "pala", "tili", "ase"]:
+                    page = source.get_page(f"https://en.wiktionary.org/wiki/{word}")
+                    self.assertEqual(page, (EXAMPLES_DIR / f"{word}.html").read_bytes())
+            source.close()
+            self.assertEqual(opened.call_count, 1)
+
+    def test_parse_result(self):
+        url = "https://en.wiktionary.org/wiki/asettaa"
+        parser = WiktionaryParser(url, source=SnapshotSource(EXAMPLES_DIR))
+        result = parser.parse()
+
+        # The tree is released once the content is extracted
+        self.assertIsNone(parser.soup)
+        self.assertEqual(parser.word_types, {"verb": None})
+
+        self.assertEqual(result.word_types, ("verb",))
+        with self.assertRaises(AttributeError):
+            result.word = "muu"
+
+        restored = pickle.loads(pickle.dumps(result))
+        self.assertEqual(restored, result)
+        self.assertEqual(restored.conjugation_tables, result.conjugation_tables)
+
+    def test_result_cache(self):
+        class ChangingPage:
+            body = (EXAMPLES_DIR / "pala.html").read_bytes()
+
+            def get_page(self, url):
+                return self.body
+
+        source = ChangingPage()
+        url = "https://en.wiktionary.org/wiki/pala"
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(Path(tmp))
+
+            def parse():
+                parser = WiktionaryParser(url, source=source, result_cache=cache)
+                return parser.parse()
+
+            result = parse()
+            self.assertEqual(cache.stats()["entries"], 1)
+
+            # A hit is served without building a tree
+            with patch.object(parser_module, "build_tree") as build:
+                self.assertEqual(parse(), result)
+            build.assert_not_called()
+
+            # A changed page or a new parser version is parsed again
+            source.body += b"<!-- edited -->"
+            self.assertEqual(parse(), result)
+            with patch.object(parser_module, "PARSER_VERSION", -1):
+                self.assertEqual(parse(), result)
+            self.assertEqual(cache.stats()["entries"], 3)
+            self.assertEqual(cache.stats()["hits"], 1)
+            cache.store.close()
+
+    def test_result_cache_has_its_own_budget(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            settings = {"path": tmp, "max_size_mb": 200, "results_max_size_mb": 2}
+            try:
+                set_result_cache(None)
+                cache = get_result_cache({"cache": settings})
+                self.assertEqual(cache.max_size, 2 * 1024 * 1024)
+                cache.store.close()
+
+                set_result_cache(None)
+                settings["results"] = False
+                self.assertIsNone(get_result_cache({"cache": settings}))
+            finally:
+                set_result_cache(None)
+
+    def test_changed_parse_results_bump_parser_version(self):
+        results = [parse_snapshot(word).to_dict() for word in EXPECTED]
+        data = json.dumps(results, ensure_ascii=False, sort_keys=True)
+        self.assertEqual(
+            hashlib.sha256(data.encode("utf-8")).hexdigest(),
+            PARSE_DIGESTS.get(parser_module.PARSER_VERSION),
+            "parse() output changed: bump PARSER_VERSION so cached results are"
+            " not reused, and record the new digest in PARSE_DIGESTS",
+        )
+
+    def test_missing_snapshot(self):
+        with self.assertRaises(FileNotFoundError):
+            parse_snapshot("nonexistent")
+
+
+class TestParserBackends(unittest.TestCase):
+    def test_backends_produce_identical_cards(self):
+        expected = {word: generate_card(parse_snapshot(word)) for word in EXPECTED}
+        original_slice = parser_module.slice_finnish_section
+
+        for backend in BACKENDS[1:]:
+            if backend not in available_backends():
+                continue
+            for sliced in [True, False]:
+                if not sliced:
+                    parser_module.slice_finnish_section = lambda content: None
+                try:
+                    for word, card in expected.items():
+                        with self.subTest(backend=backend, sliced=sliced, word=word):
+                            parser = parse_snapshot(word, backend=backend)
+                            self.assertEqual(generate_card(parser), card)
+                finally:
+                    parser_module.slice_finnish_section = original_slice
+
+    def test_filtered_tree(self):
+        page = (EXAMPLES_DIR / "pala.html").read_bytes()
+        full = build_tree(page, "html.parser")
+        filtered = build_tree(page, "html.parser", filtered=True)
+        self.assertLess(
+            len(list(filtered.descendants)), len(list(full.descendants)) / 2
+        )
+        # Only the elements the parser reads are built, side by side
+        self.assertLessEqual(
+            {child.name for child in filtered.children},
+            {"div", "h2", "h3", "h4", "h5", "ol", "table"},
+        )
+        self.assertIsNone(filtered.find("script"))
+
+        expected = {word: generate_card(parse_snapshot(word)) for word in EXPECTED}
+        unfiltered = functools.partial(build_tree, filtered=False)
+        with patch.object(parser_module, "build_tree", unfiltered):
+            for word, card in expected.items():
+                with self.subTest(word=word):
+                    self.assertEqual(generate_card(parse_snapshot(word)), card)
+
+    def test_resolve_backend(self):
+        self.assertIn(fastest_backend(), available_backends())
+        self.assertEqual(resolve_backend("auto"), fastest_backend())
+        self.assertEqual(resolve_backend("html.parser"), "html.parser")
+        with self.assertLogs("wiktionary_vocab_card.parser", "WARNING"):
+            self.assertEqual(resolve_backend("html5lib"), fastest_backend())
+
+
+if __name__ == "__main__":
+    unittest.main()
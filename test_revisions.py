@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Tests for revision tracking and the refresh workflow.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from click.testing import CliRunner
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from test_fetcher import StandInHandler, StandInServer
+from wiktionary_vocab_card import fetcher, utils
+from wiktionary_vocab_card.cache import (
+    PageCache,
+    ResultCache,
+    set_page_cache,
+    set_result_cache,
+)
+from wiktionary_vocab_card.cli import cli
+from wiktionary_vocab_card.config import DEFAULT_CONFIG
+from wiktionary_vocab_card.file_manager import FileManager
+from wiktionary_vocab_card.keys import PageKey
+from wiktionary_vocab_card.revisions import (
+    RevisionStore,
+    check_cards,
+    query_revisions,
+    regenerate_card,
+    revalidate_card,
+)
+from wiktionary_vocab_card.sources import SnapshotSource
+from wiktionary_vocab_card.utils import file_lock
+
+EXAMPLES_DIR = Path(__file__).parent / "examples"
+
+CONFIG = {
+    "custom_text": "",
+    "table_folding": True,
+    "output": {"create_directories": True, "backup_existing": False},
+    "file_management": {"check_existing": False},
+}
+
+OLD_CARD = """# ase
+#noun #flashcards
+https://en.wiktionary.org/wiki/ase
+# Articles
+- article - aseet kuntoon #military
+??
+# noun
+old definition
++++"""
+
+
+class QueryApiHandler(StandInHandler):
+    """api.php answering action=query with revid = length of the title."""
+
+    def do_GET(self):
+        titles = parse_qs(urlsplit(self.path).query)["titles"][0].split("|")
+        self.server.seen.append({"titles": titles})
+        pages = [
+            (
+                {"title": t, "missing": True}
+                if t == "missing"
+                else {"title": t, "revisions": [{"revid": len(t)}]}
+            )
+            for t in titles
+        ]
+        body = json.dumps({"query": {"pages": pages}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestQueryRevisions(unittest.TestCase):
+    def setUp(self):
+        fetcher.reset_session()
+        network = dict(DEFAULT_CONFIG["network"], requests_per_second=0)
+        fetcher.get_session({"network": network})
+
+    def tearDown(self):
+        fetcher.reset_session()
+
+    def test_titles_are_batched(self):
+        with StandInServer(QueryApiHandler) as server:
+            site = server.base_url.split("://")[1]
+            keys = [PageKey(site, f"word{i}", "http") for i in range(60)]
+            keys.append(PageKey(site, "missing", "http"))
+
+            revisions = query_revisions(keys)
+
+            self.assertEqual([len(r["titles"]) for r in server.server.seen], [50, 11])
+            self.assertEqual(revisions[keys[0]], 5)
+            self.assertIsNone(revisions[keys[-1]])
+
+
+class TestRefresh(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = RevisionStore(Path(self.tmp.name) / "revisions.json")
+        # Cards generated through the CLI record into the default store
+        revisions = patch(
+            "wiktionary_vocab_card.revisions.REVISIONS_FILE", self.store.path
+        )
+        revisions.start()
+        self.addCleanup(revisions.stop)
+        self.results = ResultCache(Path(self.tmp.name) / "results")
+        set_result_cache(self.results)
+        self.card_path = Path(self.tmp.name) / "ase.md"
+        self.card_path.write_text(OLD_CARD, encoding="utf-8")
+        self.file_manager = FileManager(CONFIG)
+
+    def tearDown(self):
+        set_result_cache(None)
+        self.results.store.close()
+        self.tmp.cleanup()
+
+    def test_only_changed_cards_are_reported(self):
+        self.store.set("https://en.wiktionary.org/wiki/ase#Finnish", 84173227)
+        current = {PageKey("en.wiktionary.org", "ase"): 84173227}
+
+        with patch(
+            "wiktionary_vocab_card.revisions.query_revisions", return_value=current
+        ):
+            cards = check_cards([self.card_path], self.file_manager, self.store)
+        self.assertEqual(len(cards), 1)
+        self.assertFalse(cards[0].changed)
+
+        current[PageKey("en.wiktionary.org", "ase")] = 84200000
+        with patch(
+            "wiktionary_vocab_card.revisions.query_revisions", return_value=current
+        ):
+            cards = check_cards([self.card_path], self.file_manager, self.store)
+        self.assertTrue(cards[0].changed)
+
+    def test_regenerate_keeps_articles(self):
+        with patch(
+            "wiktionary_vocab_card.revisions.query_revisions",
+            return_value={PageKey("en.wiktionary.org", "ase"): 84173227},
+        ):
+            card = check_cards([self.card_path], self.file_manager, self.store)[0]
+        self.assertTrue(
+            card.changed, "Cards without a recorded revision count as changed"
+        )
+
+        regenerate_card(
+            card, SnapshotSource(EXAMPLES_DIR), CONFIG, self.file_manager, self.store
+        )
+
+        updated = self.card_path.read_text(encoding="utf-8")
+        self.assertIn("- article - aseet kuntoon #military", updated)
+        self.assertIn("title: Conjugation Table", updated)
+        self.assertNotIn("old definition", updated)
+        self.assertEqual(self.store.get(card.url), 84173227)
+
+    def test_revalidate_rewrites_only_changed_cards(self):
+        url = "https://en.wiktionary.org/wiki/ase"
+        source = SnapshotSource(EXAMPLES_DIR)
+
+        self.store.set(url, 84173227)
+        self.assertFalse(
+            revalidate_card(
+                url, self.card_path, source, CONFIG, self.file_manager, self.store
+            )
+        )
+        self.assertIn("old definition", self.card_path.read_text(encoding="utf-8"))
+
+        self.store.set(url, 1)
+        self.assertTrue(
+            revalidate_card(
+                url, self.card_path, source, CONFIG, self.file_manager, self.store
+            )
+        )
+        updated = self.card_path.read_text(encoding="utf-8")
+        self.assertNotIn("old definition", updated)
+        self.assertIn("- article - aseet kuntoon #military", updated)
+        self.assertEqual(self.store.get(url), 84173227)
+
+    def test_generate_with_max_stale_uses_cache_and_revalidates_later(self):
+        url = "https://en.wiktionary.org/wiki/ase"
+        cache = PageCache(Path(self.tmp.name) / "cache", ttl=0)
+        cache.put(url, (EXAMPLES_DIR / "ase.html").read_bytes())
+        output = Path(self.tmp.name) / "new" / "ase.md"
+
+        try:
+            set_page_cache(cache)
+            with patch(
+                "wiktionary_vocab_card.cli.revalidate_in_background"
+            ) as background, patch("wiktionary_vocab_card.fetcher.fetch") as fetch:
+                result = CliRunner().invoke(
+                    cli,
+                    ["generate", "ase", "--max-stale", "30d", "-o", str(output)],
+                )
+        finally:
+            set_page_cache(None)
+            fetcher.reset_session()
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue(output.exists())
+        fetch.assert_not_called()
+        background.assert_called_once_with("ase", output, None)
+
+        result = CliRunner().invoke(cli, ["generate", "ase", "--max-stale", "soon"])
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("Invalid duration", result.output)
+
+    def test_stores_sharing_a_file_keep_each_others_revisions(self):
+        # Two processes each holding a RevisionStore on the same file
+        other = RevisionStore(self.store.path)
+        self.assertIsNone(self.store.get("https://en.wiktionary.org/wiki/ase"))
+        other.set("https://en.wiktionary.org/wiki/pala", 2)
+        self.store.set("https://en.wiktionary.org/wiki/ase", 1)
+
+        saved = json.loads(self.store.path.read_text(encoding="utf-8"))
+        self.assertEqual(sorted(saved.values()), [1, 2])
+
+    def test_file_lock_without_fcntl(self):
+        class Msvcrt:
+            """Byte-range locks of one file shared by all its handles, as on Windows"""
+
+            LK_UNLCK, LK_NBLCK = 0, 2
+            locked = set()
+
+            @classmethod
+            def locking(cls, fd, mode, nbytes):
+                inode = os.fstat(fd).st_ino
+                if mode == cls.LK_UNLCK:
+                    cls.locked.discard(inode)
+                elif inode in cls.locked:
+                    raise OSError("Resource deadlock avoided")
+                else:
+                    cls.locked.add(inode)
+
+        path = self.store.path.with_suffix(".lock")
+        with patch.object(utils, "fcntl", None), patch.object(
+            utils, "msvcrt", Msvcrt, create=True
+        ):
+            with file_lock(path) as held:
+                self.assertTrue(held)
+                with file_lock(path, blocking=False) as other:
+                    self.assertFalse(other)
+            with file_lock(path, blocking=False) as held:
+                self.assertTrue(held)
+
+
+if __name__ == "__main__":
+    unittest.main()
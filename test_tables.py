@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for laying out inflection tables and rendering them as Markdown.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from wiktionary_vocab_card.html_backends import available_backends, build_tree
+from wiktionary_vocab_card.paradigm import grid_to_markdown
+from wiktionary_vocab_card.parser import WiktionaryParser
+from wiktionary_vocab_card.sources import SnapshotSource
+from wiktionary_vocab_card.tables import html_table_to_markdown, table_grid
+
+EXAMPLES_DIR = Path(__file__).parent / "examples"
+
+SPANS = """
+<table class="inflection-table"><tbody>
+<tr><th colspan="2"></th><th>singular</th><th>plural</th></tr>
+<tr><th colspan="2">nominative</th><td>ase</td><td>aseet</td></tr>
+<tr><th rowspan="2">accusative</th><th>nom.</th><td>ase</td>
+    <td rowspan="2">aseet</td></tr>
+<tr><th>gen.</th><td>aseen</td></tr>
+<tr><th colspan="2">comitative</th><td colspan="2">
+  see <table><tr><td>aseineni</td></tr></table> below</td></tr>
+</tbody></table>
+"""
+
+
+def parse_table(html):
+    return BeautifulSoup(html, "html.parser").find("table")
+
+
+class TestTableGrid(unittest.TestCase):
+    def test_rowspan_and_colspan(self):
+        self.assertEqual(
+            table_grid(parse_table(SPANS)),
+            [
+                ["", "", "singular", "plural"],
+                ["nominative", "", "ase", "aseet"],
+                ["accusative", "nom.", "ase", "aseet"],
+                ["", "gen.", "aseen", ""],
+                ["comitative", "", "see below", ""],
+            ],
+        )
+
+    def test_layout_does_not_modify_the_tree(self):
+        table = parse_table(SPANS)
+        before = str(table)
+        html_table_to_markdown(table)
+        self.assertEqual(str(table), before)
+        self.assertIsNotNone(table.find("table"))
+
+    def test_markdown_drops_empty_rows_and_columns(self):
+        grid = [
+            ["", "", "", ""],
+            ["case", "", "sing.", "a|b"],
+            ["", "", "", ""],
+            ["nom.", "", "talo", ""],
+        ]
+        self.assertEqual(
+            grid_to_markdown(grid),
+            "| case | sing. | a\\|b |\n| --- | --- | --- |\n| nom. | talo |  |",
+        )
+
+    def test_backends_lay_out_alike(self):
+        expected = table_grid(parse_table(SPANS))
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                table = build_tree(SPANS.encode(), backend).find("table")
+                self.assertEqual(table_grid(table), expected)
+
+    def test_verb_table_rowspans(self):
+        url = "https://en.wiktionary.org/wiki/asettaa"
+        parser = WiktionaryParser(url, source=SnapshotSource(EXAMPLES_DIR))
+        table = parser.parse().conjugation_tables[0]
+        # The 3rd infinitive heads six rows; its cases stay in the second column
+        self.assertIn("| 3rd | inessive | asettamassa | — |", table)
+        self.assertIn("|  | elative | asettamasta | — |", table)
+        self.assertIn("| negative | asettamaton |", table)
+
+
+if __name__ == "__main__":
+    unittest.main()